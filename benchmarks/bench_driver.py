@@ -0,0 +1,258 @@
+"""
+Benchmarks of the driver's overhead and scaling.
+
+The workflows are zero-cost components, so only the driver (and DAKOTA) is
+measured.  Needs OpenMDAO and pyDAKOTA::
+
+    python benchmarks/bench_driver.py --json driver.json
+    python benchmarks/bench_driver.py callback configure --quick
+    python benchmarks/bench_driver.py --json new.json --compare old.json
+
+callback
+    Per-evaluation overhead of ``dakota_callback``, for ``pydakdriver``
+    (also with ``timing`` enabled) and for the ``DakotaBase`` in
+    ``archived_driver.py``.
+configure
+    ``configure_input`` time against the number of parameters and special
+    distributions, for the first (compiling) and a repeated (patching) call.
+throughput
+    Evaluations per second of complete sampling, parameter study and CONMIN
+    runs.
+
+Run from the top of the repository, or with dakota_driver installed.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'src'))
+
+from openmdao.main.api import Assembly, Component, set_as_top
+from openmdao.main.datatypes.api import Float
+
+from dakota_driver import archived_driver
+from dakota_driver.driver import pydakdriver
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class Zero(Component):
+    """ Zero-cost quadratic, counting its executions. """
+
+    x1 = Float(0., iotype='in')
+    x2 = Float(0., iotype='in')
+    f = Float(iotype='out')
+
+    executions = 0
+
+    def execute(self):
+        Zero.executions += 1
+        self.f = (self.x1 - 1) ** 2 + (self.x2 - 1) ** 2
+
+
+class Wide(Component):
+    """ Zero-cost component with `n` inputs ``x0``... and output ``f``. """
+
+    f = Float(iotype='out')
+
+    def __init__(self, n):
+        super(Wide, self).__init__()
+        for i in range(n):
+            self.add_trait('x%d' % i, Float(0., iotype='in'))
+
+    def execute(self):
+        pass
+
+
+def _assembly(driver, comp):
+    """ Return a top-level assembly running `comp` with `driver`. """
+    top = set_as_top(Assembly())
+    top.add('comp', comp)
+    top.add('driver', driver)
+    driver.workflow.add('comp')
+    return top
+
+
+def bench_callback(n_evals=10000, repeat=5):
+    """ Seconds per ``dakota_callback`` call, new and archived drivers. """
+    results = {}
+    cv = np.array([0.3, 0.7])
+    asv = np.array([1])
+
+    driver = pydakdriver(name='bench_callback')
+    driver.add_method('sampling', method_options={'samples': 10})
+    archived = archived_driver.DakotaBase()
+    for name, drv in (('pydakdriver', driver), ('archived', archived)):
+        _assembly(drv, Zero())
+        drv.add_parameter('comp.x1', low=-2, high=2)
+        drv.add_parameter('comp.x2', low=-2, high=2)
+        drv.add_objective('comp.f')
+
+    driver.configure_input()
+    driver._reset_results()
+    driver._open_run(False)
+    try:
+        for name, drv in (('pydakdriver', driver), ('archived', archived)):
+            times = timeit.repeat(lambda: drv.dakota_callback(cv=cv, asv=asv),
+                                  number=n_evals, repeat=repeat)
+            results[name] = dict(seconds_per_eval=min(times) / n_evals,
+                                 n_evals=n_evals, repeat=repeat)
+    finally:
+        driver._close_run()
+
+    driver.timing = True
+    driver._open_run(False)
+    try:
+        times = timeit.repeat(lambda: driver.dakota_callback(cv=cv, asv=asv),
+                              number=n_evals, repeat=repeat)
+        results['pydakdriver_timed'] = dict(
+            seconds_per_eval=min(times) / n_evals, n_evals=n_evals,
+            repeat=repeat)
+    finally:
+        driver._close_run()
+    results['ratio'] = results['pydakdriver']['seconds_per_eval'] / \
+                       results['archived']['seconds_per_eval']
+    return results
+
+
+def bench_configure(sizes=(10, 100, 1000, 10000)):
+    """
+    Seconds for ``configure_input`` with `size` parameters, half of them
+    normal distributions, compiling and then patching.
+    """
+    results = {}
+    for size in sizes:
+        driver = pydakdriver(name='bench_configure')
+        driver.add_method('sampling', method_options={'samples': 10},
+                          response_type='r')
+        _assembly(driver, Wide(size))
+        start = _clock()
+        for i in range(0, size, 2):
+            driver.add_parameter('comp.x%d' % i, low=-1, high=1)
+        for i in range(1, size, 2):
+            driver.add_special_distribution('comp.x%d' % i, 'normal',
+                                            mean=0., std_dev=1.)
+        driver.add_objective('comp.f')
+        setup = _clock() - start
+
+        start = _clock()
+        driver.configure_input()
+        compile_time = _clock() - start
+        start = _clock()
+        driver.configure_input()
+        patch_time = _clock() - start
+        results[str(size)] = dict(setup=setup, compile=compile_time,
+                                  patch=patch_time)
+    return results
+
+
+def bench_throughput(samples=2000, partitions=40, quick=False):
+    """ Evaluations per second of complete DAKOTA runs. """
+    if quick:
+        samples, partitions = samples // 10, partitions // 4
+    studies = (
+        ('sampling', 'sampling',
+         dict(samples=samples, sample_type='lhs', seed=1234), {}),
+        ('multidim_parameter_study', 'multidim_parameter_study',
+         dict(partitions='%d %d' % (partitions, partitions)), {}),
+        ('conmin', 'conmin_frcg',
+         dict(max_iterations=100, convergence_tolerance=1e-8),
+         dict(gradients='numerical')),
+    )
+    results = {}
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.chdir(tmp)
+    try:
+        for name, method, options, kwargs in studies:
+            driver = pydakdriver(name='bench_' + name)
+            driver.add_method(method, method_options=options, **kwargs)
+            top = _assembly(driver, Zero())
+            driver.stdout = name + '.out'
+            driver.stderr = name + '.err'
+            driver.tabular_graphics_data = False
+            driver.add_parameter('comp.x1', low=-2, high=2, start=-1.)
+            driver.add_parameter('comp.x2', low=-2, high=2, start=1.5)
+            driver.add_objective('comp.f')
+
+            Zero.executions = 0
+            start = _clock()
+            top.run()
+            seconds = _clock() - start
+            results[name] = dict(seconds=seconds, evaluations=Zero.executions,
+                                 evaluations_per_second=
+                                 Zero.executions / seconds)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+    return results
+
+
+BENCHMARKS = ('callback', 'configure', 'throughput')
+
+
+def _compare(new, old, path=()):
+    """ Yield ``(path, new, old)`` for numbers in both result trees. """
+    for key, value in new.items():
+        if key not in old:
+            continue
+        if isinstance(value, dict):
+            for item in _compare(value, old[key], path + (key,)):
+                yield item
+        elif isinstance(value, (int, float)) and old[key]:
+            yield path + (key,), value, old[key]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('benchmarks', nargs='*', default=list(BENCHMARKS),
+                        help='benchmarks to run, from %s' % (BENCHMARKS,))
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller problems, for a quick check')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results file to compare with')
+    args = parser.parse_args(argv)
+
+    results = dict(meta=dict(python=platform.python_version(),
+                             numpy=np.__version__,
+                             platform=platform.platform(),
+                             time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                             quick=args.quick))
+    for name in args.benchmarks:
+        if name == 'callback':
+            results[name] = bench_callback(1000 if args.quick else 10000)
+        elif name == 'configure':
+            sizes = (10, 100, 1000) if args.quick else (10, 100, 1000, 10000)
+            results[name] = bench_configure(sizes)
+        elif name == 'throughput':
+            results[name] = bench_throughput(quick=args.quick)
+        else:
+            parser.error('unknown benchmark %r' % name)
+        print(name, json.dumps(results[name], indent=2, sort_keys=True))
+
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as inp:
+            old = json.load(inp)
+        old.pop('meta', None)
+        for path, value, before in _compare(results, old):
+            print('%-50s %12.4g %12.4g  x%.2f'
+                  % ('.'.join(path), value, before, value / before))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Cold-start import time of dakota_driver.
+
+Each measurement imports the module in a fresh interpreter, so nothing is
+cached between runs.  Also reports whether MPI or pyDAKOTA were loaded, since
+importing the driver shouldn't need either::
+
+    python benchmarks/bench_import.py --repeat 20 --json import.json
+    python benchmarks/bench_import.py --limit 2.0   # exit 1 if slower
+
+Run from the top of the repository, or with dakota_driver installed.
+"""
+from __future__ import print_function
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+# modules the driver should only load when a run needs them
+HEAVY = ('mpi4py', 'mpi4py.MPI', 'dakota')
+
+_CODE = '''\
+import sys, time
+start = time.time()
+import %s
+print(repr((time.time() - start,
+            sorted(name for name in %r if name in sys.modules))))
+'''
+
+
+def time_import(module, repeat=10):
+    """
+    Return the import times of `module` over `repeat` fresh interpreters and
+    the heavy modules it loaded.
+    """
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       os.pardir, 'src')
+    env['PYTHONPATH'] = os.pathsep.join(
+        [src] + [path for path in [env.get('PYTHONPATH')] if path])
+    times = []
+    loaded = set()
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c',
+                                       _CODE % (module, HEAVY)], env=env)
+        last = out.decode().strip().splitlines()[-1]
+        seconds, heavy = ast.literal_eval(last)
+        times.append(seconds)
+        loaded.update(heavy)
+    return sorted(times), sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('modules', nargs='*',
+                        default=['dakota_driver', 'dakota_driver.driver'])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--limit', type=float,
+                        help='fail if a median import time exceeds this')
+    args = parser.parse_args(argv)
+
+    results = {}
+    failed = False
+    for module in args.modules:
+        times, loaded = time_import(module, args.repeat)
+        median = times[len(times) // 2]
+        results[module] = dict(min=times[0], median=median, max=times[-1],
+                               repeat=args.repeat, heavy_modules=loaded)
+        print('%-24s min %7.3fs  median %7.3fs  max %7.3fs  loads %s'
+              % (module, times[0], median, times[-1],
+                 ', '.join(loaded) or 'nothing heavy'))
+        if loaded or (args.limit is not None and median > args.limit):
+            failed = True
+
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Evaluation cache keyed by the continuous variables and active set vector.
+
+Entries are kept in least-recently-used order in memory and appended to a
+journal file on disk as they are added, so a later run (or a run restarted
+after being killed) can pick up every evaluation already completed.
+Evaluations known only to a few significant digits, such as those read
+from DAKOTA's tabular output, can be seeded and are matched at that
+precision.
+"""
+import collections
+import os
+
+import numpy as np
+from six.moves import cPickle as pickle
+
+__all__ = ['EvaluationCache']
+
+
+class EvaluationCache(object):
+    """
+    LRU cache of ``(fns, fnGrads)`` results.
+
+    `path` is the journal file, if empty the cache lives in memory only.
+    `max_size` caps the number of entries, `digits` is the number of decimal
+    places `cv` is rounded to when building keys.  `context` (bytes) is part
+    of every key, it identifies whatever else the evaluations depend on.
+    """
+
+    def __init__(self, path='', max_size=10000, digits=12):
+        self.path = path
+        self.max_size = max_size
+        self.digits = digits
+        self.context = b''
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._seeded = {}
+        self._precision = None
+        self._journal = None
+        self._records = 0
+
+        if path:
+            if os.path.exists(path):
+                self._load()
+            self.open()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, cv, asv):
+        """ Return the cache key for `cv` and `asv`. """
+        # adding 0. maps -0. onto 0.
+        cv = np.round(np.asarray(cv, dtype=float), self.digits) + 0.
+        return self.context + cv.tobytes(), tuple(int(a) for a in asv)
+
+    def seeded_key(self, cv, asv):
+        """ Return the key of seeded entries for `cv` and `asv`. """
+        cv = np.array([float('%.*g' % (self._precision, value))
+                       for value in cv]) + 0.
+        return self.context + cv.tobytes(), tuple(int(a) for a in asv)
+
+    def get(self, cv, asv):
+        """ Return the cached ``(fns, fnGrads)`` or None, updating counters. """
+        key = self.key(cv, asv)
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            value = None
+            if self._seeded:
+                value = self._seeded.get(self.seeded_key(cv, asv))
+            if value is None:
+                self.misses += 1
+                return None
+        self._insert(key, value)
+        self.hits += 1
+        return value
+
+    def seed(self, cv, asv, fns, fnGrads, precision):
+        """
+        Add an evaluation whose `cv` is only known to `precision` significant
+        digits, matching requests that agree to as many.  Seeded entries
+        aren't journaled and all must have the same `precision`.
+        """
+        if self._seeded and precision != self._precision:
+            raise ValueError('seeded entries must have the same precision')
+        self._precision = precision
+        self._seeded[self.seeded_key(cv, asv)] = (list(fns), list(fnGrads))
+
+    def put(self, cv, asv, fns, fnGrads):
+        """ Add an evaluation, evicting the least recently used if full. """
+        key = self.key(cv, asv)
+        value = (list(fns), list(fnGrads))
+        self._insert(key, value)
+        if self._journal is not None:
+            pickle.dump((key, value), self._journal, pickle.HIGHEST_PROTOCOL)
+            self._journal.flush()
+            self._records += 1
+            if self._records > 2 * self.max_size:
+                self._compact()
+
+    def clear(self):
+        """ Drop all entries and reset the counters. """
+        self._entries.clear()
+        self._seeded.clear()
+        self.hits = self.misses = 0
+        if self._journal is not None:
+            self._compact()
+
+    def open(self):
+        """ Open the journal file for appending, again after :meth:`close`. """
+        if self.path and self._journal is None:
+            self._journal = open(self.path, 'ab')
+
+    def close(self):
+        """ Close the journal file, entries are kept in memory. """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _insert(self, key, value):
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load(self):
+        """
+        Replay the journal.  A truncated final record is cut off, so that
+        records appended afterwards can be read back.
+        """
+        with open(self.path, 'rb') as inp:
+            good = 0
+            while True:
+                try:
+                    key, value = pickle.load(inp)
+                except (EOFError, IndexError, ValueError,
+                        pickle.UnpicklingError):
+                    break
+                self._insert(key, value)
+                self._records += 1
+                good = inp.tell()
+        if os.path.getsize(self.path) > good:
+            with open(self.path, 'r+b') as out:
+                out.truncate(good)
+
+    def _compact(self):
+        """ Rewrite the journal with only the live entries. """
+        self._journal.close()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as out:
+            for item in self._entries.items():
+                pickle.dump(item, out, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, self.path)
+        self._records = len(self._entries)
+        self._journal = None
+        self.open()
@@ -0,0 +1,96 @@
+"""
+Confidence intervals of running statistics, to stop a sampling study once
+its statistics are known well enough.
+
+The intervals are large-sample normal approximations.  For `n` samples
+with standard deviation `s` the half-widths are ``z s / sqrt(n)`` for the
+mean, ``z s / sqrt(2 (n - 1))`` for the standard deviation and
+``z sqrt(p (1 - p) / n) / f(x_p)`` for the `p` quantile, with the density
+``f`` at the quantile taken from a normal fit.  They are only trusted
+from a minimum number of samples on: a few identical samples (of a clipped
+or constant response) would otherwise have a zero-width interval.
+"""
+import collections
+import math
+
+__all__ = ['ConvergenceMonitor', 'confidence_interval', 'normal_quantile']
+
+
+def normal_quantile(p):
+    """ Inverse of the standard normal distribution function. """
+    lo, hi = -10., 10.
+    for _ in range(64):
+        mid = (lo + hi) / 2.
+        if 0.5 * (1. + math.erf(mid / math.sqrt(2.))) < p:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2.
+
+
+def confidence_interval(stats, statistic, confidence=0.95):
+    """
+    Return ``(estimate, half_width)`` of `statistic` of the
+    :class:`RunningStats` `stats`.  `statistic` is ``'mean'``,
+    ``'std_dev'`` or a percentile tracked by `stats`.
+    """
+    n = stats.count
+    if statistic == 'mean':
+        estimate = stats.mean
+    elif statistic == 'std_dev':
+        estimate = stats.std_dev if n > 1 else float('nan')
+    else:
+        estimate = stats.percentile(statistic)
+    if n < 2:
+        return estimate, float('inf')
+
+    z = normal_quantile(0.5 + confidence / 2.)
+    s = stats.std_dev
+    if s == 0.:
+        return estimate, 0.
+    if statistic == 'mean':
+        return estimate, z * s / math.sqrt(n)
+    if statistic == 'std_dev':
+        return estimate, z * s / math.sqrt(2. * (n - 1))
+    p = statistic / 100.
+    z_p = normal_quantile(p)
+    density = math.exp(-z_p * z_p / 2.) / (s * math.sqrt(2. * math.pi))
+    return estimate, z * math.sqrt(p * (1. - p) / n) / density
+
+
+class ConvergenceMonitor(object):
+    """
+    Decides whether `statistics` of responses are converged: each response
+    has at least `min_samples` samples and the half-width of each confidence
+    interval is at most ``rtol * abs(estimate) + atol``.
+    """
+
+    def __init__(self, statistics=('mean',), confidence=0.95, rtol=0.01,
+                 atol=0., min_samples=30):
+        self.statistics = tuple(statistics)
+        self.confidence = confidence
+        self.rtol = rtol
+        self.atol = atol
+        self.min_samples = min_samples
+
+    def intervals(self, results):
+        """
+        Return ``{response: {statistic: (estimate, half_width)}}`` for the
+        dictionary of :class:`RunningStats` `results`.
+        """
+        return collections.OrderedDict(
+            (name, collections.OrderedDict(
+                (statistic, confidence_interval(stats, statistic,
+                                                self.confidence))
+                for statistic in self.statistics))
+            for name, stats in results.items())
+
+    def converged(self, results):
+        """ True if every interval of `results` is within tolerance. """
+        if any(stats.count < self.min_samples for stats in results.values()):
+            return False
+        for intervals in self.intervals(results).values():
+            for estimate, half_width in intervals.values():
+                if not half_width <= self.rtol * abs(estimate) + self.atol:
+                    return False
+        return True
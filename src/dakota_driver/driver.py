@@ -8,11 +8,16 @@ DAKOTA results.
 """
 #from openmdao.util.record_util import create_local_meta
 from numpy import array
-import re
-from mpi4py.MPI import COMM_WORLD as world
+import os
+import shutil
+import subprocess
+import tempfile
+from distutils.spawn import find_executable
 import collections
+import copy
+import hashlib
+import itertools
 
-from dakota import DakotaInput, run_dakota
 from six import iteritems, itervalues
 
 #from openmdao.drivers.predeterminedruns_driver import PredeterminedRunsDriver
@@ -27,53 +32,295 @@ from openmdao.main.interfaces import IHasParameters, IHasIneqConstraints, \
 from openmdao.main.driver import Driver
 from openmdao.util.decorators import add_delegate
 import numpy as np
+
+from dakota_driver.cache import EvaluationCache
+from dakota_driver.convergence import ConvergenceMonitor
+from dakota_driver.workdir import WorkDirectories
+from dakota_driver.failures import OK, FAILED, TIMED_OUT, EvaluationFailure, \
+                                   EvaluationTimeout, time_limit
+from dakota_driver.fd import FiniteDifference
+from dakota_driver.layout import VariableLayout, element_names, split_element
+from dakota_driver.partial import PartialExecution
+from dakota_driver.recorder import EvaluationRecorder
+from dakota_driver.registry import VariableRegistry
+from dakota_driver.stats import RunningStats
+from dakota_driver.timing import EvaluationTimer
+
 __all__ = ['DakotaCONMIN', 'DakotaMultidimStudy', 'DakotaVectorStudy',
            'DakotaGlobalSAStudy', 'DakotaOptimizer', 'DakotaBase']
 
 _SET_AT_RUNTIME = "SPECIFICATION DECLARED BUT NOT DEFINED"
 
+# markers in the compiled input for values patched in on every run
+_INITIAL_POINT = '@initial_point@'
+_LOWER_BOUNDS = '@lower_bounds@'
+_UPPER_BOUNDS = '@upper_bounds@'
+# likewise, including the parameters with special distributions
+_ALL_INITIAL_POINT = '@all_initial_point@'
+_ALL_LOWER_BOUNDS = '@all_lower_bounds@'
+_ALL_UPPER_BOUNDS = '@all_upper_bounds@'
+
+# evaluation_scheduling values and the DAKOTA interface keywords they map to
+_SCHEDULING = {'master': 'dedicated master', 'static': 'peer static'}
+
+# evaluation_processes values
+_PROCESSES = ('pool', 'population')
+
+
+def _flat(value, size):
+    """ `value` as `size` floats, a scalar is repeated. """
+    return np.zeros(size) + np.ravel(value)
+
+
+def _format(chunks):
+    """ Space separated values of the arrays `chunks`. """
+    if not chunks:
+        return ''
+    return ' '.join(repr(value) for value in np.concatenate(chunks).tolist())
+
+
+
+# environment variables set by common MPI launchers (Open MPI, MPICH/Hydra,
+# PMIx, MVAPICH)
+_MPI_LAUNCHER_VARS = ('OMPI_COMM_WORLD_SIZE', 'PMI_SIZE', 'PMIX_RANK',
+                      'MV2_COMM_WORLD_SIZE')
+
+
+def _pydakota():
+    """
+    Return the pyDAKOTA module.  It's imported on first use so importing
+    this module stays cheap and doesn't need DAKOTA to be loadable.
+    """
+    import dakota
+    return dakota
+
+
+class _InputSpec(object):
+    """
+    Sections of the input as specified, attributes like those of pyDAKOTA's
+    ``DakotaInput``, which is only made (importing pyDAKOTA) once the input
+    is configured.
+    """
+
+    def __init__(self, **sections):
+        self.__dict__.update(sections)
+
+
+def _scratch_dir():
+    """ Directory for short-lived files, in memory where possible. """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+# significant digits of the values in DAKOTA's tabular output
+_TABULAR_PRECISION = 10
+
+# numbers the runs of this process, see DakotaBase.run_id
+_RUN_NUMBERS = itertools.count(1)
+
+# methods whose evaluations don't depend on each other, so they can be
+# handed to the driver in blocks and run concurrently
+_INDEPENDENT_METHODS = ('sampling', 'fsu_quasi_mc', 'list_parameter_study',
+                        'vector_parameter_study', 'multidim_parameter_study',
+                        'centered_parameter_study', 'soga', 'moga')
+
 
 @add_delegate(HasParameters, HasObjectives)
 #class DakotaBase(PredeterminedRunsDriver):
 class DakotaBase(Driver):
     """
-    Base class for common DAKOTA operations, adds :class:`DakotaInput` instance.
-    The ``method`` and ``responses`` sections of `input` must be set
+    Base class for common DAKOTA operations, adds the `input` specification
+    a :class:`DakotaInput` is configured from.  The ``method`` and ``responses`` sections of `input` must be set
     directly.  :meth:`set_variables` is typically used to set the ``variables``
     section.
     """
 
     implements(IHasParameters, IHasObjectives)
 
-    output = 'normal',
+    output = 'normal'
     #output = Enum('normal', iotype='in', desc='Output verbosity',
     #              values=('silent', 'quiet', 'normal', 'verbose', 'debug'))
     stdout = ''
     stderr = ''
     tabular_graphics_data = True
-            
+    # number of evaluations DAKOTA may hand the driver in one callback,
+    # 0 keeps the one-evaluation-per-callback interface
+    batch_size = 0
+    # number of local worker processes for independent evaluations
+    evaluation_concurrency = 1
+    # 'pool' evaluates on daemonic workers forked once per run, 'population'
+    # forks a process for each evaluation, in a directory of its own made
+    # as the workdir options say, so inner drivers of the workflow may
+    # evaluate concurrently themselves (see population.py)
+    evaluation_processes = 'pool'
+    # reuse results for repeated (cv, asv) requests, journaled to cache_file
+    evaluation_cache = False
+    cache_file = ''
+    cache_size = 10000
+    cache_digits = 12
+    # replay evaluations from restart_file and the driver's journal of
+    # completed evaluations, named after the driver, instead of redoing them
+    dakota_hotstart = False
+    restart_file = 'dakota.rst'
+    # also write the input to <name>.in, for debugging
+    write_input_file = False
+    # percentiles tracked for each response in `results`
+    result_percentiles = (5., 50., 95.)
+    # directory for a binary columnar log of evaluations (see recorder.py),
+    # a compact replacement for tabular_graphics_data on large studies.
+    # Rows are saved every evaluation_log_chunk evaluations, or once
+    # evaluation_log_flush seconds have passed, bounding what a killed run
+    # loses
+    evaluation_log = ''
+    evaluation_log_chunk = 10000
+    evaluation_log_flush = 60.
+    record_gradients = False
+    # compute numerical gradients in the driver, evaluating the whole finite
+    # difference stencil at once (see fd.py), and hand them to DAKOTA as
+    # analytic gradients
+    fd_gradients = False
+    interval_type = 'forward'
+    fd_gradient_step_size = 1e-6
+    # likewise for Hessians, from a second-order stencil shared with the
+    # gradient stencil where the step sizes agree.  Workflows have no
+    # analytic Hessians, those DAKOTA asks for are always differenced.
+    fd_hessians = False
+    fd_hessian_step_size = 1e-4
+    # split the MPI communicator into this many evaluation groups, each
+    # running its own copy of the workflow (0 leaves this to DAKOTA).  Each
+    # rank only sees its group's evaluations, so `results` is rank-local
+    # (none on a dedicated master) and adaptive_sampling can't be used
+    evaluation_groups = 0
+    # 'master' dedicates one rank to handing out evaluations, 'static' has
+    # every group evaluate a fixed share of each batch
+    evaluation_scheduling = 'static'
+    # run DAKOTA under MPI, False runs serially without needing mpi4py.  If
+    # None, MPI is used if a communicator was given, mpi4py is already
+    # loaded or the process was started by an MPI launcher.
+    use_mpi = None
+    # record where the time goes in `timer` (see timing.py)
+    timing = False
+    # sequential Monte Carlo: run a sampling study in batches of
+    # adaptive_batch samples, each with a new seed, until the confidence
+    # intervals of adaptive_statistics ('mean', 'std_dev' or percentiles
+    # from result_percentiles) of every response are within adaptive_rtol
+    # of the estimate plus adaptive_atol, from adaptive_min_samples on, or
+    # adaptive_max_samples (default the method's samples) have run (see
+    # convergence.py).  Each batch is a DAKOTA run of its own, with
+    # sample_type 'lhs' the batches are each stratified, not stratified
+    # together as one larger design would be.
+    adaptive_sampling = False
+    adaptive_batch = 100
+    adaptive_max_samples = 0
+    adaptive_statistics = ('mean',)
+    adaptive_confidence = 0.95
+    adaptive_rtol = 0.01
+    adaptive_atol = 0.
+    adaptive_min_samples = 30
+    # skip workflow components none of whose upstream parameters changed
+    # since the last evaluation, keeping their outputs (see partial.py)
+    partial_execution = False
+    # run only the workflow components upstream of the responses DAKOTA's
+    # active set vector asks for (see partial.py)
+    asv_pruning = False
+    # evaluations that raise are retried evaluation_retries times, then
+    # evaluation_failure decides: 'abort' ends the run, 'nan' answers NaN and
+    # 'fail' also signals DAKOTA a failure, handled as failure_capture says
+    # (e.g. 'recover NaN' or 'continuation').  Each attempt may take
+    # evaluation_timeout seconds (0 for no limit), hung pool workers are
+    # killed.  Failures are recorded in evaluation_log (see failures.py).
+    evaluation_failure = 'abort'
+    evaluation_retries = 0
+    evaluation_timeout = 0
+    failure_capture = ''
+    # run each evaluation in a directory of its own, under a run directory
+    # created in workdir_root (e.g. '/dev/shm', default the temporary
+    # directory) and populated from workdir_template (a directory or a list
+    # of files), copied or, with workdir_link, symlinked.  workdir_cleanup
+    # is 'always', 'success' (keep the directories of failed evaluations)
+    # or 'keep' (the last workdir_keep, per process) (see workdir.py)
+    workdir = False
+    workdir_root = ''
+    workdir_template = ''
+    workdir_link = False
+    workdir_cleanup = 'always'
+    workdir_keep = 10
+    # name the files of each run (stdout, stderr, the input and tabular
+    # graphics files, evaluation_log) '<path>.<run_id>', so concurrent or
+    # nested studies don't overwrite each other's.  DAKOTA itself runs in
+    # directory 'dakota.<run_id>', which keeps its restart file and any other
+    # files it writes.  For a hotstart the restart file is copied from and
+    # back to restart_file.  workdir_cleanup and workdir_keep say which of
+    # these directories are removed after their run
+    unique_paths = False
+    tabular_graphics_file = 'dakota_tabular.dat'
+
 
     def __init__(self):
         super(DakotaBase, self).__init__()
 
-        # allow for special variable distributions
-        self.special_distribution_variables = []
-        self.clear_special_variables()
+        # variables with special distributions
+        self.special_variables = VariableRegistry()
  
         self.configured = None
-        # Set baseline input, don't touch 'interface'.
-        self.input = DakotaInput(environment=[],
-                                 method=[],
-                                 model=['single'],
-                                 variables=[],
-                                 responses=[])
+        self._compiled_signature = None
+        self._compiled_input = None
+        self._dakota_input = None
+        self._pool = None
+        self.cache = None
+        # RunningStats for each response ('<name>[<i>]' for each element of
+        # array responses), collected during the run from the evaluations of
+        # this rank (see evaluation_groups)
+        self.results = collections.OrderedDict()
+        self.recorder = None
+        self._eval_count = 0
+        self._fd_base = None
+        # number of variables -> [(parameter, key into cv, element indices,
+        # size)] and gradient column order, see _build_setters()
+        self._setters = {}
+        self._gradient_orders = {}
+        self._layouts = {}
+        # layout of the cv evaluations receive, the innermost block's
+        self._evaluated_layout = None
+        # PartialExecution of the current run, if partial_execution or
+        # asv_pruning is set
+        self._partial = None
+        # component runs skipped by partial_execution or asv_pruning in the
+        # last run
+        self.skipped_executions = 0
+        # responses gathered during a run, see _gather_plan()
+        self._gather = None
+        # WorkDirectories of the current run, if workdir is set
+        self._workdirs = None
+        # evaluations of earlier batches while sampling adaptively
+        self._sequence_offset = None
+        # confidence intervals and whether they converged, after an
+        # adaptive sampling run
+        self.convergence = None
+        self.converged = None
+        # EvaluationTimer of the last run, if `timing` is enabled
+        self.timer = None
+        # '<name>.<pid>.<run number>' of the current or last run
+        self.run_id = ''
+        # directory DAKOTA runs in with unique_paths, and the one the run
+        # was started from, where evaluations run
+        self._run_dir = None
+        self._start_dir = None
+        # run directories kept with workdir_cleanup 'keep'
+        self._kept_run_dirs = collections.deque()
+        # Set baseline input, 'interface' is left to pyDAKOTA.
+        self.input = _InputSpec(environment=[],
+                                method=[],
+                                model=['single'],
+                                variables=[],
+                                responses=[])
 
     def check_config(self, strict=False):
         """ Verify valid configuration. """
         super(DakotaBase, self).check_config(strict=strict)
 
         parameters = self.get_parameters()
-        if not parameters and not self.special_distribution_variables:
+        if not parameters and not self.special_variables:
             self.raise_exception('No parameters, run aborted', ValueError)
 
         objectives = self.get_objectives()
@@ -91,42 +338,413 @@ class DakotaBase(Driver):
         if not parameters:
             self.raise_exception('No parameters, run aborted', ValueError)
 
+        inp = self._dakota_input
+        self.run_id = '%s.%d.%d' % (self.name, os.getpid(),
+                                    next(_RUN_NUMBERS))
         if not self.methods:
             raise ValueError('Method not set')
-        if not self.input.variables:
+        if not inp.variables:
             self.raise_exception('Variables not set', ValueError)
-        if not self.input.responses:
+        if not inp.responses:
             self.raise_exception('Responses not set', ValueError)
+        if self.evaluation_failure not in ('abort', 'nan', 'fail'):
+            self.raise_exception("evaluation_failure must be 'abort', 'nan'"
+                                 " or 'fail'", ValueError)
 
-        for i, line in enumerate(self.input.environment):
+        inp.environment = [line for line in inp.environment
+                           if 'tabular_graphics_file' not in line]
+        for i, line in enumerate(inp.environment):
             if 'tabular_graphics_data' in line:
                 if not self.tabular_graphics_data:
-                    self.input.environment[i] = \
+                    inp.environment[i] = \
                         line.replace('tabular_graphics_data', '')
                 break
         else:
+            i = len(inp.environment)
             if self.tabular_graphics_data:
-                self.input.environment.append('tabular_graphics_data')
-
-        infile = self.name+ '.in'
-        self.input.write_input(infile, data=self)
-        #self.input.write_input(infile, data=self, other_data=self.other_model)
-        #from openmdao.core.mpi_wrap import MPI
-        from mpi4py import MPI
-        run_dakota(infile, use_mpi=True, mpi_comm = self.mpi_comm, stdout=self.stdout, stderr=self.stderr, restart=0)
-        #if MPI:
-        #    if self.mpi_comm:
-        #       run_dakota(infile, use_mpi=True, mpi_comm = self.mpi_comm, stdout=self.stdout, stderr=self.stderr, restart=self.dakota_hotstart)
-        #    else:
-        #       run_dakota(infile, use_mpi=True, stdout=self.stdout, stderr=self.stderr, restart=self.dakota_hotstart)
-        #try:
-        #    run_dakota(infile, stdout=self.stdout, stderr=self.stderr)
-        #except Exception:
-        #    print sys.exc_info()
-        #    exc_type, exc_value, exc_traceback = sys.exc_info()
-        #    raise type('%s' % exc_type), exc_value, exc_traceback
-
-           # self.reraise_exception()
+                inp.environment.append('tabular_graphics_data')
+        if self.unique_paths and self.tabular_graphics_data:
+            tabular_file = os.path.abspath(
+                self._run_path(self.tabular_graphics_file))
+            inp.environment.insert(i + 1, "  tabular_graphics_file = '%s'"
+                                          % tabular_file)
+
+        batch_size = self.batch_size
+        dakota_async = self.evaluation_concurrency > 1 and \
+                       self._independent_evaluations()
+        if dakota_async:
+            batch_size = batch_size or self.evaluation_concurrency
+        # finite difference stencils use the pool whatever the method
+        use_pool = dakota_async or \
+                   ((self.fd_gradients or self.fd_hessians) and
+                    self.evaluation_concurrency > 1)
+        if use_pool and self.evaluation_processes not in _PROCESSES:
+            self.raise_exception('evaluation_processes must be one of %s,'
+                                 ' not %r' % (', '.join(_PROCESSES),
+                                              self.evaluation_processes),
+                                 ValueError)
+
+        inp.interface = [line for line in inp.interface
+                         if not line.strip().startswith(
+                             ('batch', 'asynchronous', 'evaluation_servers',
+                              'evaluation_scheduling',
+                              'processors_per_evaluation',
+                              'failure_capture'))]
+        if dakota_async:
+            inp.interface.append(
+                '  asynchronous evaluation_concurrency = %d'
+                % self.evaluation_concurrency)
+        if batch_size:
+            inp.interface.append('  batch size = %d' % batch_size)
+        if self.evaluation_groups:
+            inp.interface.extend(self._group_lines())
+        if self.failure_capture:
+            inp.interface.append('  failure_capture %s' % self.failure_capture)
+
+        input_file = self._run_path(self.name + '.in')
+        if self.write_input_file:
+            inp.write_input(input_file, data=self)
+
+        # Unless kept, the input goes through a private scratch file so
+        # concurrent runs and MPI ranks don't share a path.
+        kwargs = {}
+        scratch = None
+        run_dakota = _pydakota().run_dakota
+        if self.write_input_file:
+            infile = input_file
+        else:
+            handle, scratch = tempfile.mkstemp(prefix=self.run_id + '_',
+                                               suffix='.in',
+                                               dir=_scratch_dir())
+            os.close(handle)
+            inp.write_input(scratch, data=self)
+            infile = scratch
+
+        if self._use_mpi():
+            kwargs.update(use_mpi=True, mpi_comm=self.mpi_comm)
+
+        hotstart = self.dakota_hotstart
+        stdout = self._run_path(self.stdout)
+        stderr = self._run_path(self.stderr)
+        if self.unique_paths:
+            infile, stdout, stderr = [path and os.path.abspath(path)
+                                      for path in (infile, stdout, stderr)]
+        self._open_run(use_pool)
+        success = False
+        try:
+            if self.unique_paths:
+                self._enter_run_dir(hotstart)
+            run_dakota(infile, stdout=stdout, stderr=stderr,
+                       restart=1 if hotstart else 0, **kwargs)
+            success = True
+        finally:
+            if self._run_dir is not None:
+                self._leave_run_dir(success)
+            self._close_run()
+            if scratch is not None:
+                os.remove(scratch)
+
+    def _enter_run_dir(self, hotstart):
+        """
+        Make the directory DAKOTA runs in current, seeding its restart file
+        from `restart_file` for a hotstart.  Evaluations change back to the
+        directory the run was started from.
+        """
+        path = os.path.abspath(self._run_path('dakota'))
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        if hotstart and os.path.exists(self.restart_file):
+            shutil.copy2(self.restart_file, os.path.join(path, 'dakota.rst'))
+        self._start_dir = os.getcwd()
+        self._run_dir = path
+        os.chdir(path)
+
+    def _leave_run_dir(self, success):
+        """
+        Change back from the directory DAKOTA ran in, copying its restart
+        file to `restart_file` for a hotstart, and clean it up as
+        `workdir_cleanup` says.
+        """
+        path = self._run_dir
+        os.chdir(self._start_dir)
+        self._run_dir = self._start_dir = None
+        restart = os.path.join(path, 'dakota.rst')
+        if self.dakota_hotstart and os.path.exists(restart):
+            # renamed into place, concurrent runs may copy theirs too
+            tmp = '%s.%s' % (self.restart_file, self.run_id)
+            shutil.copy2(restart, tmp)
+            os.rename(tmp, self.restart_file)
+        cleanup = self.workdir_cleanup
+        if cleanup == 'always' or (cleanup == 'success' and success):
+            shutil.rmtree(path, ignore_errors=True)
+        elif cleanup == 'keep':
+            kept = self._kept_run_dirs
+            kept.append(path)
+            while len(kept) > self.workdir_keep:
+                shutil.rmtree(kept.popleft(), ignore_errors=True)
+
+    def _use_mpi(self):
+        """ True if DAKOTA should be run under MPI, see `use_mpi`. """
+        if self.use_mpi is not None:
+            return bool(self.use_mpi)
+        return getattr(self, 'mpi_comm', None) is not None or \
+               bool(self.evaluation_groups) or \
+               'mpi4py.MPI' in sys.modules or \
+               any(name in os.environ for name in _MPI_LAUNCHER_VARS)
+
+    def _mpi_comm(self):
+        """ Return the communicator DAKOTA runs on. """
+        comm = getattr(self, 'mpi_comm', None)
+        if comm is None:
+            from mpi4py.MPI import COMM_WORLD as comm
+        return comm
+
+    def _group_lines(self):
+        """ Interface lines splitting the communicator into groups. """
+        scheduling = self.evaluation_scheduling
+        if scheduling not in _SCHEDULING:
+            self.raise_exception("evaluation_scheduling must be one of %s,"
+                                 " not %r" % (sorted(_SCHEDULING), scheduling),
+                                 ValueError)
+        groups = self.evaluation_groups
+        ranks = self._mpi_comm().Get_size()
+        if scheduling == 'master':
+            ranks -= 1
+        if groups > ranks:
+            self.raise_exception('%d evaluation groups need at least %d'
+                                 ' evaluating ranks, there are %d'
+                                 % (groups, groups, ranks), ValueError)
+        return ['  evaluation_servers = %d' % groups,
+                '  evaluation_scheduling %s' % _SCHEDULING[scheduling],
+                '  processors_per_evaluation = %d' % (ranks // groups)]
+
+    def _rank_path(self, path):
+        """
+        `path`, made unique to this rank when running in evaluation groups,
+        since each group evaluates (and records) separately.
+        """
+        if path and self.evaluation_groups:
+            comm = self._mpi_comm()
+            if comm.Get_size() > 1:
+                return '%s.%d' % (path, comm.Get_rank())
+        return path
+
+    def _run_path(self, path):
+        """ `path` of this run, made unique if `unique_paths` is set. """
+        if path and self.unique_paths:
+            return '%s.%s' % (path, self.run_id)
+        return path
+
+    def _open_run(self, use_pool):
+        """ Set up the cache, recorder and pool used during a run. """
+        hotstart = self.dakota_hotstart
+        replay = False
+        if (self.evaluation_cache or hotstart) and self.cache is None:
+            cache_file = self.cache_file
+            if hotstart and not cache_file:
+                cache_file = self.name + '.rst.cache'
+            cache_file = self._rank_path(cache_file)
+            self.cache = EvaluationCache(cache_file, self.cache_size,
+                                         self.cache_digits)
+            replay = hotstart
+        if self.cache is not None:
+            self.cache.open()
+            # results kept from earlier runs only match the same context
+            self.cache.context = self._cache_context()
+        if replay:
+            self._replay_restart()
+
+        self._eval_count = 0
+        self._fd_base = None
+        self._gather = self._gather_plan()
+        if self.evaluation_log and self.recorder is None:
+            layout = self._evaluated_layout or self._parameter_layout()
+            self.recorder = EvaluationRecorder(
+                self._run_path(self._rank_path(self.evaluation_log)),
+                len(layout), len(self.results), self.evaluation_log_chunk,
+                gradients=self.record_gradients,
+                descriptors=layout.descriptors(),
+                responses=list(self.results),
+                flush_interval=self.evaluation_log_flush)
+
+        self._partial = None
+        if self.partial_execution or self.asv_pruning:
+            self._partial = self._partial_execution()
+            self._partial.instrument()
+
+        self.timer = None
+        if self.timing:
+            self.timer = EvaluationTimer()
+            self.timer.instrument(self.workflow.__iter__())
+            self.timer.start()
+
+        self._workdirs = None
+        if self.workdir:
+            self._workdirs = WorkDirectories(
+                self.workdir_root, self.name, self.workdir_template,
+                self.workdir_link, self.workdir_cleanup, self.workdir_keep)
+
+        if use_pool:
+            if self.evaluation_processes == 'population':
+                from dakota_driver.population import PopulationPool
+                self._pool = PopulationPool(
+                    self, self.evaluation_concurrency,
+                    (1 + self.evaluation_retries) * self.evaluation_timeout)
+            else:
+                from dakota_driver.pool import EvaluationPool
+                self._pool = EvaluationPool(
+                    self, self.evaluation_concurrency,
+                    (1 + self.evaluation_retries) * self.evaluation_timeout)
+
+    def _close_run(self):
+        """ Release what :meth:`_open_run` set up. """
+        self._gather = None
+        if self.cache is not None:
+            self.cache.close()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self.recorder is not None and self._sequence_offset is None:
+            self.recorder.close()
+            self.recorder = None
+        if self.timer is not None:
+            self.timer.restore()
+            self._logger.debug('timing:\n%s', self.timer.summary())
+        if self._partial is not None:
+            self._partial.restore()
+            self.skipped_executions = self._partial.skipped
+            self._logger.debug('partial execution: %d component runs,'
+                               ' %d skipped', self._partial.executed,
+                               self._partial.skipped)
+            self._partial = None
+        if self._workdirs is not None:
+            self._workdirs.close()
+            self._logger.debug('evaluation directories in %s',
+                               self._workdirs.path)
+            self._workdirs = None
+
+    def _partial_execution(self):
+        """
+        Return a :class:`PartialExecution` of the workflow, knowing the
+        targets of each variable of every configured `cv` layout and the
+        variables each response reads.
+        """
+        list_connections = getattr(self.parent, 'list_connections', None)
+        connections = None
+        if list_connections is not None:
+            connections = list_connections(show_passthrough=True)
+        partial = PartialExecution(self.workflow.__iter__(), connections,
+                                   track_changes=self.partial_execution)
+
+        parameters = self.get_parameters()
+        targets = {}
+        for name, param in parameters.items():
+            paths = getattr(param, 'targets', None)
+            targets[name] = list(paths) if paths is not None else [name]
+        layouts = self._layouts or {self.total_parameters():
+                                    self._parameter_layout()}
+        for layout in layouts.values():
+            partial.set_targets([targets[name] for name in layout.owners()])
+
+        if self.asv_pruning:
+            responses = []
+            for expr in self._get_gather()[0]:
+                paths = self._referenced_paths(expr)
+                responses.extend([paths] * getattr(expr, 'size', 1))
+            partial.set_responses(responses)
+        return partial
+
+    def _cache_context(self):
+        """
+        Return a digest of the workflow's inputs that are neither parameters
+        nor fed by workflow components, which evaluations depend on besides
+        `cv` (such as those an enclosing driver sets, directly or through
+        the assembly's inputs).
+        """
+        components = list(self.workflow.__iter__())
+        names = set(comp.name for comp in components)
+        targets = set()
+        for name, param in self.get_parameters().items():
+            paths = getattr(param, 'targets', None)
+            targets.update(paths if paths is not None else [name])
+        # inputs connected from outside the workflow aren't transferred
+        # until their component runs, their sources hold the new values
+        sources = {}
+        list_connections = getattr(self.parent, 'list_connections', None)
+        if list_connections is not None:
+            for src, dst in list_connections(show_passthrough=True):
+                if src.split('.', 1)[0] in names:
+                    targets.add(dst)
+                else:
+                    sources[dst] = src
+        targets = set(path.split('[', 1)[0] for path in targets)
+
+        digest = hashlib.md5()
+        for comp in components:
+            list_inputs = getattr(comp, 'list_inputs', None)
+            if list_inputs is None:
+                continue
+            for name in sorted(list_inputs()):
+                path = '%s.%s' % (comp.name, name)
+                if path in targets:
+                    continue
+                if path in sources:
+                    value = self.parent.get(sources[path])
+                else:
+                    value = comp.get(name)
+                try:
+                    text = np.round(np.asarray(value, dtype=float),
+                                    self.cache_digits).tobytes()
+                except (TypeError, ValueError):
+                    text = repr(value).encode('utf-8')
+                digest.update(path.encode('utf-8'))
+                digest.update(text)
+        return digest.digest()
+
+    @staticmethod
+    def _referenced_paths(expr):
+        """ Variable paths response `expr` reads, None if not known. """
+        get_paths = getattr(expr, 'get_referenced_varpaths', None)
+        if get_paths is None:
+            return None
+        paths = list(get_paths())
+        if getattr(expr, 'pcomp_name', None):
+            paths.append(expr.pcomp_name)
+        return paths
+
+    def _replay_restart(self):
+        """
+        Seed `cache` with the evaluations recorded in DAKOTA's restart file,
+        converted to tabular form by ``dakota_restart_util``.  The tabular
+        values are rounded, so they only match requests to that precision.
+        """
+        util = find_executable('dakota_restart_util')
+        if not util or not os.path.exists(self.restart_file):
+            return
+
+        n_vars = len(self._evaluated_layout or self._parameter_layout())
+        n_fns = len(self._get_expressions())
+        handle, tabular = tempfile.mkstemp(suffix='.dat')
+        os.close(handle)
+        try:
+            with open(os.devnull, 'w') as devnull:
+                subprocess.check_call([util, 'to_tabular', self.restart_file,
+                                       tabular], stdout=devnull)
+            with open(tabular) as inp:
+                inp.readline()  # header
+                for line in inp:
+                    try:
+                        row = [float(val)
+                               for val in line.split()[-(n_vars + n_fns):]]
+                    except ValueError:
+                        continue
+                    self.cache.seed(row[:n_vars], [1] * n_fns, row[n_vars:],
+                                    [], _TABULAR_PRECISION)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            self._logger.warning("Can't replay restart file %s: %s",
+                                 self.restart_file, exc)
+        finally:
+            os.remove(tabular)
 
     def dakota_callback(self, **kwargs):
         """
@@ -162,320 +780,822 @@ class DakotaBase(Driver):
         currEvalId current evaluation ID number
         ========== ==============================================
 
+        If ``cv`` holds a block of evaluations (one row per evaluation) the
+        call is handed to :meth:`dakota_batch_callback`.
+        """
+        timer = self.timer
+        if timer is not None:
+            timer.enter_callback()
+        if self._run_dir is not None:
+            os.chdir(self._start_dir)
+        try:
+            cv = kwargs['cv']
+            asv = kwargs['asv']
+
+            if np.ndim(cv) == 2:
+                return self.dakota_batch_callback(**kwargs)
+
+            fns, fnGrads, fnHessians, status = self._respond(cv, asv)
+            self._complete_evaluation(kwargs.get('currEvalId'), cv, asv,
+                                      fns, fnGrads, status)
+            retval = dict(fns=np.asarray(fns, dtype=float),
+                          fnGrads=array(fnGrads))
+            if len(fnHessians):
+                retval['fnHessians'] = array(fnHessians)
+            if status != OK and self.evaluation_failure == 'fail':
+                retval['failure'] = status
+            self._logger.debug('returning %s', retval)
+            return retval
+        finally:
+            if self._run_dir is not None:
+                os.chdir(self._run_dir)
+            if timer is not None:
+                timer.leave_callback()
+
+    def dakota_batch_callback(self, **kwargs):
+        """
+        Return stacked responses for a block of evaluations.  `kwargs` has
+        the same keys as for :meth:`dakota_callback`, but ``cv`` is a 2-D
+        array with one row per evaluation and ``asv`` and ``currEvalId``
+        have one entry per row.  The returned ``fns`` has shape
+        ``(n_evals, n_functions)``, with rows in ``currEvalId`` order and
+        zeros where a row's ``asv`` doesn't request the value.  Failed
+        evaluations are answered with NaN rows and, if `evaluation_failure`
+        is ``'fail'``, the status of each row in ``failure``.
+
+        If every component in the workflow declares ``vectorized = True``
+        and no derivatives are requested, the whole block is set as NumPy
+        arrays and the workflow runs once.  Otherwise the evaluations are
+        run one after another, or concurrently on the local process pool
+        when `evaluation_concurrency` is greater than one.
+        """
+        cvs = np.atleast_2d(np.asarray(kwargs['cv'], dtype=float))
+        asvs = np.asarray(kwargs['asv'], dtype=int).reshape(len(cvs), -1)
+        ids = kwargs.get('currEvalId')
+        if ids is not None:
+            ids = np.asarray(ids).reshape(len(cvs))
+            order = np.argsort(ids, kind='mergesort')
+            cvs, asvs, ids = cvs[order], asvs[order], ids[order]
+        else:
+            ids = np.arange(self._eval_count + 1,
+                            self._eval_count + 1 + len(cvs))
+
+        if self._vectorized_workflow() and not (asvs & 6).any():
+            values = self._evaluate_vectorized(cvs)
+            for eval_id, cv, asv, fns in zip(ids, cvs, asvs, values):
+                self._complete_evaluation(eval_id, cv, asv,
+                                          fns[(asv & 1) != 0], [])
+            values[(asvs & 1) == 0] = 0.
+            retval = dict(fns=values)
+        else:
+            if self._pool is not None and not self._fd_requested(asvs):
+                results = []
+                for cv, asv, (fns, fnGrads, status) in \
+                        zip(cvs, asvs, self._pool_evaluate(cvs, asvs)):
+                    if status != OK:
+                        fns, fnGrads = self._failed_result(cv, asv)
+                    results.append((fns, fnGrads, [], status))
+            else:
+                results = [self._respond(cv, asv)
+                           for cv, asv in zip(cvs, asvs)]
+            values = np.zeros(asvs.shape)
+            statuses = np.zeros(len(cvs), dtype=int)
+            for row, (eval_id, cv, asv, (fns, fnGrads, fnHessians, status)) \
+                    in enumerate(zip(ids, cvs, asvs, results)):
+                self._complete_evaluation(eval_id, cv, asv, fns, fnGrads,
+                                          status)
+                values[row, (asv & 1) != 0] = fns
+                statuses[row] = status
+            retval = dict(fns=values)
+            if statuses.any() and self.evaluation_failure == 'fail':
+                retval['failure'] = statuses
+            shape = (asvs.shape[1], cvs.shape[1])
+            if any(len(g) for f, g, h, s in results):
+                retval['fnGrads'] = array([g if len(g) else np.zeros(shape)
+                                           for f, g, h, s in results])
+            if any(len(h) for f, g, h, s in results):
+                shape += (cvs.shape[1],)
+                retval['fnHessians'] = array([h if len(h) else np.zeros(shape)
+                                              for f, g, h, s in results])
+        retval['currEvalId'] = ids
+
+        self._logger.debug('returning %s', retval)
+        return retval
+
+    def _respond(self, cv, asv):
+        """
+        Answer one request, returning ``(fns, fnGrads, fnHessians, status)``,
+        with driver-side derivatives if enabled.  A failed evaluation is
+        answered with NaN.
+        """
+        try:
+            if self._fd_requested(asv):
+                return self._fd_evaluate(cv, asv) + (OK,)
+            fns, fnGrads = self._cached_evaluate(cv, asv)
+        except EvaluationFailure as exc:
+            fns, fnGrads = self._failed_result(cv, asv)
+            return fns, fnGrads, [], exc.status
+        if (self.fd_gradients or self.fd_hessians) and \
+           (np.asarray(asv) & 1).all():
+            self._fd_base = (np.array(cv, dtype=float),
+                             np.array(fns, dtype=float))
+        return fns, fnGrads, [], OK
+
+    @staticmethod
+    def _failed_result(cv, asv):
+        """ NaN ``(fns, fnGrads)`` answering `asv`. """
+        asv = np.asarray(asv)
+        fns = np.full(int(((asv & 1) != 0).sum()), np.nan)
+        fnGrads = []
+        if (asv & 2).any():
+            fnGrads = np.full((len(asv), len(cv)), np.nan)
+        return fns, fnGrads
+
+    def _fd_requested(self, asv):
+        """ True if `asv` requests derivatives the driver differences. """
+        asv = np.asarray(asv)
+        return bool((self.fd_gradients and (asv & 2).any()) or
+                    (asv & 4).any())
+
+    def _fd_evaluate(self, cv, asv):
         """
-        cv = kwargs['cv']
-        asv = kwargs['asv']
-        dvv = kwargs['dvv']
-        av_labels = kwargs['av_labels']
+        Answer `asv` at `cv` with finite difference gradients and Hessians.
+        Every stencil point is evaluated in one block.  The gradient reuses
+        the Hessian stencil when the step sizes agree, and the values at `cv`
+        are reused from the last evaluation if it was at the same point.
+        """
+        timer = self.timer
+        if timer is not None:
+            start = timer.clock()
+        cv = np.asarray(cv, dtype=float)
+        asv = np.asarray(asv)
+        fd_grads = self.fd_gradients and (asv & 2).any()
+        fd_hessians = (asv & 4).any()
+        grad = FiniteDifference(self.fd_gradient_step_size, self.interval_type)
+        hess = FiniteDifference(self.fd_hessian_step_size, 'central')
+        shared = fd_grads and fd_hessians and \
+                 grad.step_size == hess.step_size
+
+        blocks = []
+        if fd_hessians:
+            hess_points = hess.hessian_stencil(cv)
+            blocks.append(hess_points)
+        if fd_grads and not shared:
+            blocks.append(grad.stencil(cv))
+
+        base = self._fd_base
+        need_base = fd_hessians or (asv & 1).any() or \
+                    (fd_grads and grad.needs_base)
+        new_base = need_base and \
+                   (base is None or not np.array_equal(base[0], cv))
+        if new_base:
+            blocks.insert(0, cv[np.newaxis])
+        values = self._evaluate_values(np.vstack(blocks), len(asv))
+        if timer is not None:
+            evaluated = timer.clock()
+        if new_base:
+            base = self._fd_base = (cv, values[0])
+            values = values[1:]
+        f0 = base[1] if need_base else None
+
+        fnHessians = []
+        if fd_hessians:
+            n_points = len(hess_points)
+            fnHessians = hess.hessian(cv, f0, values[:n_points])
+            fnHessians[(asv & 4) == 0] = 0.
+            if not shared:
+                values = values[n_points:]
+
+        fnGrads = []
+        if fd_grads:
+            fnGrads = grad.gradient(cv, f0, values)
+            fnGrads[(asv & 2) == 0] = 0.
+        if timer is not None:
+            timer.add_stencil(evaluated - start, timer.clock() - evaluated)
 
+        if not fd_grads and (asv & 2).any():
+            fnGrads = self._cached_evaluate(cv, asv & 2)[1]
 
-        self.set_parameters(cv)
-        self.run_iteration()
+        fns = list(f0[(asv & 1) != 0]) if need_base else []
+        return fns, fnGrads, fnHessians
 
-        expressions = self.get_objectives().values()
+    def _evaluate_values(self, cvs, n_fns):
+        """
+        Return the ``(n_evals, n_fns)`` values of all functions at the rows
+        of `cvs`, evaluated on the pool or in one pass if possible.
+        """
+        if self._vectorized_workflow():
+            return self._evaluate_vectorized(cvs)
+        asvs = np.ones((len(cvs), n_fns), dtype=int)
+        if self._pool is not None:
+            results = self._pool_evaluate(cvs, asvs)
+            for fns, fnGrads, status in results:
+                if status != OK:
+                    raise EvaluationFailure(status, 'stencil evaluation'
+                                                    ' failed')
+        else:
+            results = [self._cached_evaluate(cv, asv)
+                       for cv, asv in zip(cvs, asvs)]
+        return np.array([result[0] for result in results], dtype=float)
+
+    def _cached_evaluate(self, cv, asv):
+        """ :meth:`_attempt` unless the result is already in `cache`. """
+        cache = self.cache
+        if cache is None:
+            return self._attempt(cv, asv)
+        result = cache.get(cv, asv)
+        if result is None:
+            result = self._attempt(cv, asv)
+            cache.put(cv, asv, *result)
+        return result
+
+    def _attempt(self, cv, asv):
+        """
+        :meth:`_evaluate` with up to `evaluation_retries` retries, each
+        limited to `evaluation_timeout` seconds.  If every attempt fails the
+        last exception is raised if `evaluation_failure` is ``'abort'``,
+        else :class:`EvaluationFailure`.
+        """
+        retries = self.evaluation_retries
+        timeout = self.evaluation_timeout
+        if not retries and not timeout and self.evaluation_failure == 'abort':
+            return self._evaluate(cv, asv)
+
+        for attempt in range(retries + 1):
+            try:
+                with time_limit(timeout):
+                    return self._evaluate(cv, asv)
+            except Exception as exc:
+                self._logger.warning('evaluation at %s failed (attempt %d of'
+                                     ' %d): %s', cv, attempt + 1, retries + 1,
+                                     exc)
+                if attempt == retries:
+                    if self.evaluation_failure == 'abort':
+                        raise
+                    raise EvaluationFailure(
+                        TIMED_OUT if isinstance(exc, EvaluationTimeout)
+                        else FAILED, str(exc))
+
+    def _pool_task(self, cv, asv):
+        """ Run by pool workers, returns ``(fns, fnGrads, status)``. """
+        try:
+            return self._attempt(cv, asv) + (OK,)
+        except EvaluationFailure as exc:
+            return None, None, exc.status
+
+    def _pool_evaluate(self, cvs, asvs):
+        """
+        Evaluate the rows missing from `cache` on the process pool, returning
+        ``(fns, fnGrads, status)`` for each row.
+        """
+        cache = self.cache
+        results = [None] * len(cvs)
+        if cache is not None:
+            results = [cache.get(cv, asv) for cv, asv in zip(cvs, asvs)]
+            results = [result + (OK,) if result is not None else None
+                       for result in results]
+        todo = [i for i, result in enumerate(results) if result is None]
+        if todo:
+            new = self._pool.map(cvs[todo], asvs[todo])
+            for i, result in zip(todo, new):
+                status = result[2]
+                if status == OK and cache is not None:
+                    cache.put(cvs[i], asvs[i], *result[:2])
+                elif status == TIMED_OUT and \
+                     self.evaluation_failure == 'abort':
+                    raise EvaluationTimeout('evaluation at %s timed out'
+                                            % cvs[i])
+                results[i] = result
+        return results
+
+    def _independent_evaluations(self):
+        """
+        True if every configured method has independent evaluations, by its
+        type.  Blocks after the first start with a ``method`` keyword.
+        """
+        blocks = [[]]
+        for line in self.methods:
+            key = line.split(None, 1)[0] if line.strip() else ''
+            if key == 'method':
+                blocks.append([])
+            elif key:
+                blocks[-1].append(key)
+        blocks = [keys for keys in blocks if keys]
+        return bool(blocks) and \
+               all(any(key in _INDEPENDENT_METHODS for key in keys)
+                   for keys in blocks)
+
+    def _reset_results(self):
+        """
+        Start new statistics for each function, that is each element of
+        the responses, as DAKOTA's active set vector has an entry for each.
+        """
+        names = list(self.get_objectives())
+        if hasattr(self, 'get_eq_constraints'):
+            names.extend(self.get_eq_constraints())
+        if hasattr(self, 'get_ineq_constraints'):
+            names.extend(self.get_ineq_constraints())
+        sizes = [getattr(expr, 'size', 1) for expr in self._get_expressions()]
+        self.results = collections.OrderedDict(
+            (element, RunningStats(self.result_percentiles))
+            for name, size in zip(names, sizes)
+            for element in element_names(name, size))
+
+    def _complete_evaluation(self, eval_id, cv, asv, fns, fnGrads,
+                             status=OK):
+        """
+        Add the function values of an evaluation to `results` and record it
+        in the evaluation log.  `fns` holds only the active entries of `asv`,
+        `fnGrads` is empty or has a row per function.  Failed evaluations
+        (`status` not OK) are only recorded.
+        """
+        self._eval_count += 1
+        if status == OK:
+            values = iter(fns)
+            for stats, active in zip(self.results.values(), asv):
+                if active & 1:
+                    stats.add(next(values))
+
+        recorder = self.recorder
+        if recorder is not None:
+            asv = np.asarray(asv)
+            row = np.full(len(asv), np.nan)
+            row[(asv & 1) != 0] = fns
+            grads = None
+            if len(fnGrads):
+                grads = np.array(fnGrads, dtype=float)
+                grads[(asv & 2) == 0] = np.nan
+            if eval_id is None:
+                eval_id = self._eval_count
+            if self._sequence_offset:
+                eval_id += self._sequence_offset
+            recorder.record(eval_id, cv, row, grads, status)
+
+    def _get_expressions(self):
+        """ Return objective and constraint expressions in DAKOTA order. """
+        expressions = list(self.get_objectives().values())
         if hasattr(self, 'get_eq_constraints'):
             expressions.extend(self.get_eq_constraints().values())
         if hasattr(self, 'get_ineq_constraints'):
             expressions.extend(self.get_ineq_constraints().values())
+        return expressions
+
+    def _vectorized_workflow(self):
+        """ True if every workflow component accepts array inputs. """
+        comps = list(self.workflow.__iter__())
+        return bool(comps) and \
+               all(getattr(comp, 'vectorized', False) for comp in comps)
 
-        fns = []
+    def _evaluate_vectorized(self, cvs):
+        """
+        Set each parameter to its column(s) of `cvs`, run the workflow once
+        and return the ``(n_evals, n_functions)`` responses.  Each phase is
+        timed in `timer` if `timing`.
+        """
+        timer = self.timer
+        if timer is None:
+            if self._partial is not None:
+                self._partial.reset()
+            self._set_cv(cvs)
+            self._run_workflow()
+            return self._block_values(len(cvs))
+
+        clock = timer.clock
+        start = clock()
+        if self._partial is not None:
+            self._partial.reset()
+        self._set_cv(cvs)
+        set_done = clock()
+        self._run_workflow()
+        run_done = clock()
+        values = self._block_values(len(cvs))
+        end = clock()
+        timer.add_block(len(cvs), set_done - start, run_done - set_done,
+                        end - run_done, 0., end - start)
+        return values
+
+    def _block_values(self, n_evals):
+        """ Return the ``(n_evals, n_functions)`` responses of a block. """
+        scope = self.parent
+        columns = []
+        for evaluate in self._get_gather()[1]:
+            val = np.asarray(evaluate(scope), dtype=float)
+            columns.append(val.reshape(n_evals, -1))
+        return np.hstack(columns)
+
+    def _evaluate(self, cv, asv):
+        """
+        Run a single evaluation at `cv`, returning the function values
+        requested by `asv` as a list and, if any gradients are requested, the
+        ``(n_functions, n_vars)`` gradient array (else an empty list).  Each
+        phase is timed in `timer` if `timing`.
+        """
+        timer = self.timer
+        if timer is None:
+            if self._partial is not None:
+                self._partial.update(cv, asv)
+            self._set_cv(cv)
+            self._run_workflow()
+            plan = self._get_gather()
+            fns = self._function_values(plan, asv)
+            fnGrads = []
+            if (np.asarray(asv) & 2).any():
+                fnGrads = self._gradients(plan[0], asv, len(cv))
+            return fns, fnGrads
+
+        clock = timer.clock
+        start = clock()
+        if self._partial is not None:
+            self._partial.update(cv, asv)
+        self._set_cv(cv)
+        set_done = clock()
+        self._run_workflow()
+        run_done = clock()
+        plan = self._get_gather()
+        fns = self._function_values(plan, asv)
+        values_done = clock()
         fnGrads = []
-        for i, expr in enumerate(expressions):
-            if asv[i] & 1:
-                val = expr.evaluate(self.parent)
-                if isinstance(val, list):
-                    fns.extend(val)
-                else:
-                    fns.append(val)
-            if asv[i] & 2:
-               val = expr.evaluate_gradient(self.parent)
-               fnGrads.append(val)
-               # self.raise_exception('Gradients not supported yet',
-               #                      NotImplementedError)
-            if asv[i] & 4:
-                self.raise_exception('Hessians not supported yet',
-                                     NotImplementedError)
-
-        retval = dict(fns=array(fns), fnGrads = array(fnGrads))
-        self._logger.debug('returning %s', retval)
-        return retval
+        if (np.asarray(asv) & 2).any():
+            fnGrads = self._gradients(plan[0], asv, len(cv))
+        end = clock()
+        timer.add_evaluation(set_done - start, run_done - set_done,
+                             values_done - run_done, end - values_done,
+                             end - start)
+        return fns, fnGrads
+
+    def _run_workflow(self):
+        """ Run the workflow, in a directory of its own if `workdir`. """
+        if self._workdirs is None:
+            self.run_iteration()
+        else:
+            with self._workdirs.evaluation():
+                self.run_iteration()
+
+    def _set_cv(self, cv):
+        """
+        Set the parameters to `cv`, or to the columns of a 2-D `cv`.  Each
+        parameter is set from a view of `cv`, split as precomputed by
+        :meth:`_build_setters`.
+        """
+        cv = np.asarray(cv)
+        setters = self._setters.get(cv.shape[-1])
+        if setters is None:
+            setters = self._parameter_setters()
+        scope = self.parent
+        columns = cv if cv.ndim == 1 else cv.T
+        for param, key, indices, size in setters:
+            if indices is None:
+                value = columns[key]
+            else:
+                value = np.empty((size,) + cv.shape[:-1])
+                value.T[...] = param.evaluate(scope)
+                value[indices] = columns[key]
+            param.set(value if cv.ndim == 1 else value.T, scope)
 
+    def _parameter_setters(self):
+        """ Setters for `cv` holding all parameters in parameter order. """
+        parameters = self.get_parameters()
+        sizes = self._parameter_sizes(parameters)
+        return [(parameters[name], key, indices, sizes[name])
+                for name, (key, indices) in
+                self._parameter_layout().keys.items()]
+
+    def _parameter_layout(self):
+        """ Layout of `cv` holding all parameters in parameter order. """
+        parameters = self.get_parameters()
+        sizes = self._parameter_sizes(parameters)
+        return VariableLayout([(name, None if sizes[name] == 1 else i)
+                               for name in parameters
+                               for i in range(sizes[name])], sizes)
+
+    @staticmethod
+    def _parameter_sizes(parameters):
+        """ Number of elements of each of `parameters`. """
+        return dict((name, getattr(param, 'size', 1))
+                    for name, param in parameters.items())
+
+    def _build_setters(self, layouts):
+        """
+        Precompute how the `cv` of each variables block in `layouts` is split
+        among the parameters, and the order of its gradient columns.
+        """
+        parameters = self.get_parameters()
+        sizes = self._parameter_sizes(parameters)
+        self._setters = {sum(sizes.values()): self._parameter_setters()}
+        self._layouts = {sum(sizes.values()): self._parameter_layout()}
+        self._gradient_orders = {}
+        self._evaluated_layout = layouts[-1] if layouts else \
+                                 self._layouts[sum(sizes.values())]
+        # the cv of an evaluation only tells blocks apart by its size
+        for i, layout in enumerate(layouts):
+            for other in layouts[:i]:
+                if len(other) == len(layout) and \
+                   other.descriptors() != layout.descriptors():
+                    self.raise_exception(
+                        'evaluated variables blocks %s and %s have the same'
+                        ' size' % (other.descriptors(), layout.descriptors()),
+                        ValueError)
+            self._layouts[len(layout)] = layout
+            self._setters[len(layout)] = [
+                (parameters[name], key, indices, sizes[name])
+                for name, (key, indices) in layout.keys.items()]
+            self._gradient_orders[len(layout)] = \
+                layout.permutation(list(parameters), sizes)
+
+    def _gather_plan(self):
+        """
+        Return how responses are gathered: the response expressions, their
+        bound ``evaluate`` methods, the slot of each in a preallocated
+        values buffer (an index, or a slice for array constraints) and the
+        buffer.
+        """
+        expressions = self._get_expressions()
+        sizes = [getattr(expr, 'size', 1) for expr in expressions]
+        ends = np.cumsum(sizes).tolist()
+        slots = [end - 1 if size == 1 else slice(end - size, end)
+                 for size, end in zip(sizes, ends)]
+        evaluators = [expr.evaluate for expr in expressions]
+        return expressions, evaluators, slots, np.empty(sum(sizes))
+
+    def _get_gather(self):
+        """ The plan of the current run, or a new one outside runs. """
+        return self._gather or self._gather_plan()
+
+    def _function_values(self, plan, asv):
+        """
+        Return the array of response values requested by `asv`, gathered
+        as compiled in `plan` (see :meth:`_gather_plan`).  Hessians are
+        differenced by :meth:`_fd_evaluate`.
+        """
+        expressions, evaluators, slots, buffer = plan
+        asv = np.asarray(asv)
+        scope = self.parent
+        for evaluate, slot in zip(evaluators, slots):
+            if (asv[slot] & 1).any():
+                buffer[slot] = evaluate(scope)
+        return buffer[(asv & 1) != 0]
+
+    def _gradients(self, expressions, asv, n_vars):
+        """
+        Return the gradients of `expressions` as a ``(n_functions, n_vars)``
+        array.  Only the rows requested by `asv` are computed, the rest are
+        zero.  The Jacobian of all requested rows is computed in one call.
+        """
+        rows = np.flatnonzero(np.asarray(asv) & 2)
+        fnGrads = np.zeros((len(expressions), n_vars))
+        active = [expressions[i] for i in rows]
+        if all(getattr(expr, 'pcomp_name', None) for expr in active):
+            outputs = ['%s.out0' % expr.pcomp_name for expr in active]
+            grads = self.calc_gradient(outputs=outputs, return_format='array')
+        else:
+            grads = []
+            for expr in active:
+                grad = expr.evaluate_gradient(self.parent)
+                if isinstance(grad, dict):
+                    grad = self._gradient_row(expr, grad)
+                grads.append(np.ravel(grad))
+        # columns are in parameter order, DAKOTA's are in cv order
+        order = self._gradient_orders.get(n_vars)
+        grads = np.reshape(grads, (len(rows), -1))
+        fnGrads[rows] = grads if order is None else grads[:, order]
+        return fnGrads
+
+    def _gradient_row(self, expr, grad):
+        """
+        Return `grad`, the derivatives of `expr` keyed by the variables it
+        reads, in parameter order, summed over the targets of each parameter.
+        Only expressions of parameters alone can be differentiated this way.
+        """
+        row = []
+        used = set()
+        for name, param in self.get_parameters().items():
+            paths = getattr(param, 'targets', None) or [name]
+            size = getattr(param, 'size', 1)
+            values = np.zeros(size)
+            for path in paths:
+                if path in grad:
+                    values += np.ravel(grad[path])
+                    used.add(path)
+                elif size > 1:
+                    for i, element in enumerate(element_names(path, size)):
+                        if element in grad:
+                            values[i] += grad[element]
+                            used.add(element)
+            row.extend(values)
+        others = sorted(set(grad) - used)
+        if others:
+            self.raise_exception("can't differentiate '%s', it reads %s,"
+                                 " which are not parameters"
+                                 % (getattr(expr, 'text', expr),
+                                    ', '.join(others)), ValueError)
+        return row
 
-        #print 'av_labs are ',av_labels , ' and cv is ', cv; quit()
-        #self._logger.debug('cv %s', cv)
-        #self._logger.debug('asv %s', asv)
-
-        #dvlist = [s for s in self.special_distribution_variables if s not in self.array_desvars]
-        #if True: #self.array_desvars:
-        #    for i, var  in enumerate(av_labels):
-        #        if var in self.root.unknowns._dat.keys(): self.set_desvar(var, cv[i])
-        #        elif re.findall("(.*)\[(.*)\]", var)[0][0] in self.root.unknowns._dat.keys(): 
-        #            #print 'setting ',re.findall("(.*)\[(.*)\]", var)[0][0], int(re.findall("(.*)\[(.*)\]", var)[0][1]), ' as ', cv[i]
-        #            self.set_desvar(re.findall("(.*)\[(.*)\]", var)[0][0], cv[i], index=[int(re.findall("(.*)\[(.*)\]", var)[0][1])])
-        #else:
-        #    dvl = dvlist + self._desvars.keys() +  self.special_distribution_variables
-        #    #dvl = dvlist + self._desvars.keys() 
-        #    for i  in range(len(cv)):
-        #        if dvl[i] in self.root.unknowns._dat.keys(): self.set_desvar(dvl[i], cv[i])
-        #        #self.set_desvar(dvl[i], cv[i])
-        #        elif re.findall("(.*)\[(.*)\]", dvl[i])[0][0] in self.root.unknowns._dat.keys(): 
-        #            self.set_desvar(re.findall("(.*)\[(.*)\]", dvl[i])[0][0], cv[i], index=[int(re.findall("(.*)\[(.*)\]", dvl[i])[0][1])])
-        #system = self.root
-        #metadata = self.metadata  = create_local_meta(None, 'pydakrun%d'%world.Get_rank())
-        #system.ln_solver.local_meta = metadata
-        #self.iter_count += 1
-        #update_local_meta(metadata, (self.iter_count,))
-        #self.root.solve_nonlinear()
-
-            #system.solve_nonlinear(metadata=metadata)
-        #self.recorders.record_iteration(system, metadata)
-
-        #expressions = self.get_objectives().values()[0].tolist()#.update(self.get_constraints())
-        #cons = self.get_constraints()
-        #for c in cons:
-        #       #expressions.append(-1*c)
-        #       expressions.append(-1*self.get_constraints()[con])
-
-        #expressions = []
-        #for key in self.get_objectives():
-        #   expressions += list(self.get_objectives()[key])
-        #for con in self.get_constraints().values():
-        #    for c in con:
-        #       expressions.append(-1*c)
-
-
-        #fns = []
-        #fnGrads = []
-
-        #for i in range(len(asv)):
-        #    val = expressions[i]
-
-        #    if asv[i] & 1 or asv[i]==0:
-        #       fns.extend([val])
-        #    if asv[i] & 2:
-        #       objs = self.get_objectives().keys()
-        #       gvars = []
-        #       gvars_list = [] # we need to strip the descriptors of the [n] index
-        #       gindexes = {} # then keep only the indexes of interest for each desvar
-        #       seen = set()
-        #       print kwargs['av_labels']  
-        #       vars_for_grads = kwargs['av_labels']
-        #       for var in vars_for_grads:
-        #           if var in self.root.unknowns._dat.keys(): gvars.append(var)
-        #           else:
-        #               vname = re.findall("(.*)\[(.*)\]", var)[0][0]
-        #               if vname not in self.root.unknowns._dat.keys(): 
-        #                   raise ValueError("%s not in desvars"%vname)
-        #               if vname not in seen:
-        #                   seen.add(vname)
-        #                   gvars_list.append(vname)
-        #               ind = int(re.findall("(.*)\[(.*)\]", var)[0][1])
-        #               if vname not in gindexes:
-        #                   gindexes[vname] = [ind]
-        #               else: gindexes[vname].append(ind)
-#
-#               # only supporting one objective for now. I'll have to find out more about 
-#               # the ASV structure before continuing.
-#               for gvar in gvars_list:
-#                   print gvars_list
-#                   print 'gvar ', gvar
-#                   grad = self._prob.calc_gradient([gvar], self.get_objectives().keys())[0]
-#                   for ind in gindexes[gvar]:
-#                       print '  index ', ind
-#                       fnGrads.append(grad[ind])
-#               for gvar in gvars:
-#                   grad = self._prob.calc_gradient([gvar], self.get_objectives().keys())[0]
-#                   fnGrads.extend(grad)
-#               fnGrads = np.array([fnGrads])
-#                   #print 'hey. grad is ', grad ; quit()
-#               #for lab in kwargs['av_labels']:
-#                  #fnGrads.extend([val])
-#            #fnGrads.append([val])
-#            # self.raise_exception('Gradients not supported yet',
-#            #                      NotImplementedError)
-#            if asv[i] & 4:
-#               self.raise_exception('Hessians not supported yet',
-#                                     NotImplementedError)
-#
-#        retval = dict(fns=array(fns), fnGrads = array(fnGrads))
-#       # print 'asv was ',asv
-#       # print 'returning ',retval
-#        #self._logger.debug('returning %s', retval)
-#        return retval
-#
     # We fully configure the input just before running the analysis as the user is liable to set
     # several aspects of the optimization problem after calling pydakdriver.
-    # We only set the variables and responses blocks here, as the other input blocks are not dependant on
-    # additional configurations to the analysis.
+    # The structure of the input is compiled once and cached, repeated runs only patch the current
+    # initial point, bounds and run-time settings into the compiled template.
     def configure_input(self):
-        """ Configures input specification, must be overridden. """
+        """
+        Configures input specification.  The ``method``, ``model`` and
+        ``responses`` specifications in `input` are left untouched, the
+        result is stored as the :class:`DakotaInput` used by :meth:`run_dakota`.
+        """
+        self._add_special_parameters()
+        signature = self._input_signature()
+        if signature != self._compiled_signature:
+            self._compiled_input = self._compile_input()
+            self._compiled_signature = signature
+        self._dakota_input = self._patch_input(self._compiled_input)
+        self._build_setters(self._compiled_input['layouts'])
+        self.configured = 1
+
+    def _add_special_parameters(self):
+        """ Make sure every special distribution variable is a parameter. """
+        parameters = self.get_parameters()
+        for var in self._special_parameters():
+            if var not in parameters:
+                if var in self.special_variables:
+                    self.add_parameter(var, low=-99999999., high=99999999.)
+                else:
+                    self.add_parameter(var)
+                parameters = self.get_parameters()
+
+    def _special_parameters(self):
+        """
+        Return the set of parameters given special distributions, for array
+        elements ``x[i]`` that's the array ``x``.
+        """
+        return set(var.split('[', 1)[0] if var.endswith(']') else var
+                   for var in self.special_variables)
 
+    def _input_signature(self):
+        """ Return everything the structure of the compiled input depends on. """
+        parameters = self.get_parameters()
+        return (tuple(parameters),
+                tuple(getattr(param, 'size', 1) for param in parameters.values()),
+                tuple(self.get_objectives()),
+                tuple(self.input.environment),
+                repr(self.input.method),
+                repr(self.input.model),
+                repr(self.input.responses),
+                repr(getattr(self.input, 'n_objectives', None)),
+                repr(getattr(self, 'custom_variables_blocks', None)),
+                self.fd_gradients, self.fd_hessians,
+                self.special_variables.signature())
+
+    @staticmethod
+    def _spec_blocks(spec):
+        """ Return `spec` as a list of OrderedDicts, one per block. """
+        if isinstance(spec, dict):
+            return [spec]
+        return [spec_block if isinstance(spec_block, dict)
+                else collections.OrderedDict([(spec_block, '')])
+                for spec_block in spec]
+
+    def _driver_derivatives(self, block):
+        """
+        Responses `block` with the numerical derivatives the driver computes
+        declared analytic.
+        """
+        replace = {}
+        dakota_fd = ()
+        if self.fd_gradients and 'numerical_gradients' in block:
+            replace['numerical_gradients'] = 'analytic_gradients'
+            dakota_fd += ('method_source dakota', 'interval_type',
+                          'fd_gradient_step_size')
+        if self.fd_hessians and 'numerical_hessians' in block:
+            replace['numerical_hessians'] = 'analytic_hessians'
+            dakota_fd += ('no_hessians', 'fd_hessian_step_size')
+        if not replace:
+            return block
+        result = collections.OrderedDict()
+        for key, value in block.items():
+            if key in replace:
+                result[replace[key]] = ''
+            elif key not in dakota_fd:
+                result[key] = value
+        return result
+
+    def _compile_input(self):
+        """
+        Build the input template.  Lines holding values that change between
+        runs contain markers or :data:`_SET_AT_RUNTIME` and are filled in by
+        :meth:`_patch_input`.
+        """
+        methods = self._spec_blocks(self.input.method)
+        models = copy.deepcopy(self._spec_blocks(self.input.model))
+        responses = copy.deepcopy(self._spec_blocks(self.input.responses))
+        if self.fd_gradients or self.fd_hessians:
+            responses = [self._driver_derivatives(block)
+                         for block in responses]
+        n_objectives = getattr(self.input, 'n_objectives', [])
+        objectives = list(self.get_objectives())
+        special = self._special_parameters()
 
         # CONFIGURE VARIABLES
 
-        # Find regular parameters
-        parameters = []  # [ [name, value], ..]
-        dvars = self.get_parameters()
-        dvar_values = self.eval_parameters(dtype=None)
-        self.reg_params = parameters
-        for n, param in enumerate(dvars):
-           # if len(dvars[param]) == 1:
-                parameters.append([param, dvar_values[0]])
-           # else:
-           #     for i, val in enumerate(dvars[param]):
-           #         parameters.append([param + '[' + str(i) + ']', val])
-           #         self.array_desvars.append(param + '[' + str(i) + ']')
-
-        self.input.reg_variables.append('continuous_design = %s' % len(parameters))
-
-        secondaryV = False
-        
-        for i in range(len(self.input.model)):
-           if 'secondary_variable_mapping' in self.input.model[i]: secondaryV=True
-        if parameters: 
-            state_params = []
-            for param in parameters:
-                if param not in self.special_distribution_variables: state_params.append(param)
-            if state_params: self.input.state_variables.append('continuous_state = %s' % len(state_params))
-
-        initial = []  # initial points of regular paramters
-        for val in  self.eval_parameters():
-        #for val in self.get_desvars().values():
-        #    if isinstance(val, collections.Iterable):
-        #        initial.extend(val)
-        #    else:
-                initial.append(val)
-        self.input.reg_variables.append(
-            '  initial_point %s' % ' '.join(str(s) for s in initial))
-        if initial: self.input.state_variables.append(
-            '  initial_state %s' % ' '.join(str(s) for s in initial))
-        lbounds = self.get_lower_bounds(dtype=None)
-        #lbounds = []
-        #for val in  self.eval_parameters():
-            #if not isinstance(val.lower, collections.Iterable):
-            #    lbounds.extend(val["lower"] for _ in range(val['size']))
-            #else:
-            #    lbounds.extend(val.lower())
-        ubounds = self.get_upper_bounds(dtype=None)
-        #ubounds = []
-        #for val in  self.eval_parameters():
-        #for val in self._desvars.values():
-            #if not isinstance(val["upper"], collections.Iterable):
-            #    ubounds.extend(val["upper"]  for _ in range(val['size']))
-            #else:
-        #        ubounds.extend(val.upper())
-        self.input.reg_variables.extend([
-            '  lower_bounds %s' % ' '.join(str(bnd) for bnd in lbounds),
-            '  upper_bounds %s' % ' '.join(str(bnd) for bnd in ubounds)])
-        if lbounds and state_params:
-               self.input.state_variables.extend([
-            '  lower_bounds %s' % ' '.join(str(bnd) for bnd in lbounds),
-            '  upper_bounds %s' % ' '.join(str(bnd) for bnd in ubounds)])
-
-        names = [s[0] for s in parameters]
-        self.input.reg_variables.append(
-            '  descriptors  %s' % ' '.join("'" + str(nam) + "'" for nam in names))
-        if names and state_params:
-            self.input.state_variables.append(
-            '  descriptors  %s' % ' '.join("'" + str(nam) + "'" for nam in names))
+        # Find regular parameters, arrays are one variable per element
+        parameters = self.get_parameters()
+        sizes = self._parameter_sizes(parameters)
+        names = [name for name in parameters if name not in special]
+        elements = [element for name in names
+                    for element in element_names(name, sizes[name])]
+        descriptors = ' '.join("'%s'" % element for element in elements)
+        regular = [(name, None if sizes[name] == 1 else i)
+                   for name in names for i in range(sizes[name])]
+
+        # Nested models mapping the design variables onto the means of the
+        # uncertain ones (secondary_variable_mapping left '') need the
+        # parameters with special distributions among the design variables
+        map_means = any(models[i].get('secondary_variable_mapping') == ''
+                        for i in range(len(models)))
+        if map_means:
+            design_names = list(parameters)
+            markers = (_ALL_INITIAL_POINT, _ALL_LOWER_BOUNDS,
+                       _ALL_UPPER_BOUNDS)
+        else:
+            design_names = names
+            markers = (_INITIAL_POINT, _LOWER_BOUNDS, _UPPER_BOUNDS)
+        design_elements = [element for name in design_names
+                           for element in element_names(name, sizes[name])]
+        design_descriptors = ' '.join("'%s'" % element
+                                      for element in design_elements)
+        design = [(name, None if sizes[name] == 1 else i)
+                  for name in design_names for i in range(sizes[name])]
+
+        reg_variables = [
+            'continuous_design = %s' % len(design_elements),
+            '  initial_point %s' % markers[0],
+            '  lower_bounds %s' % markers[1],
+            '  upper_bounds %s' % markers[2],
+            '  descriptors  %s' % design_descriptors]
+
+        state_variables = []
+        if names:
+            state_variables = [
+                'continuous_state = %s' % len(elements),
+                '  initial_state %s' % _INITIAL_POINT,
+                '  lower_bounds %s' % _LOWER_BOUNDS,
+                '  upper_bounds %s' % _UPPER_BOUNDS,
+                '  descriptors  %s' % descriptors]
 
         # Add special distributions cases
-        for var in self.special_distribution_variables:
-            if var in parameters: self.remove_parameter(var)
-            if ']' in var:
-               if int(re.findall("(.*)\[(.*)\]", var)[0][1])==0 and re.findall("(.*)\[(.*)\]", var)[0][0] not in self._desvars.keys():
-                   self.add_parameter(re.findall("(.*)\[(.*)\]", var)[0][0])
-            else: self.add_parameter(var, low=-99999999., high=99999999.)
-        if self.normal_descriptors:
-            # print(self.normal_means) ; quit()
-            self.input.uncertain_variables.extend([
-                'normal_uncertain =  %s' % len(self.normal_means),
-                '  means  %s' % ' '.join(self.normal_means),
-                '  std_deviations  %s' % ' '.join(self.normal_std_devs),
-                "  descriptors  '%s'" % "' '".join(self.normal_descriptors),
-                '  lower_bounds = %s' % ' '.join(self.normal_lower_bounds),
-                '  upper_bounds = %s' % ' '.join(self.normal_upper_bounds)
-            ])
-        if self.lognormal_descriptors:
-            self.input.uncertain_variables.extend([
-                'lognormal_uncertain = %s' % len(self.lognormal_means),
-                '  means  %s' % ' '.join(self.lognormal_means),
-                '  std_deviations  %s' % ' '.join(self.lognormal_std_devs),
-                "  descriptors  '%s'" % "' '".join(self.lognormal_descriptors)
-            ])
-        if self.exponential_descriptors:
-            self.input.uncertain_variables.extend([
-                'exponential_uncertain = %s' % len(self.exponential_descriptors),
-                '  betas  %s' % ' '.join(self.exponential_betas),
-                "  descriptors ' %s'" % "' '".join(self.exponential_descriptors)
-            ])
-        if self.beta_descriptors:
-            self.input.uncertain_variables.extend([
-                'beta_uncertain = %s' % len(self.beta_descriptors),
-                '  betas = %s' % ' '.join(self.beta_betas),
-                '  alphas = %s' % ' '.join(self.beta_alphas),
-                "  descriptors = '%s'" % "' '".join(self.beta_descriptors),
-                '  lower_bounds = %s' % ' '.join(self.beta_lower_bounds),
-                '  upper_bounds = %s' % ' '.join(self.beta_upper_bounds)
-            ])
-        if self.gamma_descriptors:
-            self.input.uncertain_variables.extend([
-                'beta_uncertain = %s' % len(self.gamma_descriptors),
-                '  betas = %s' % ' '.join(self.gamma_betas),
-                '  alphas = %s' % ' '.join(self.gamma_alphas),
-                "  descriptors = '%s'" % "' '".join(self.gamma_descriptors)
-            ])
-        if self.weibull_descriptors:
-            self.input.uncertain_variables.extend([
-                'weibull_uncertain = %s' % len(self.weibull_descriptors),
-                '  betas  %s' % ' '.join(self.weibull_betas),
-                '  alphas  %s' % ' '.join(self.weibull_alphas),
-                "  descriptors  '%s'" % "' '".join(self.weibull_descriptors)
-            ])
-
+        uncertain_variables = self.special_variables.variables_block()
+        uncertain = [(element, None) if element in parameters
+                     else split_element(element)
+                     for element in self.special_variables.block_names()]
 
         # CONFIGURE VARIABLES, METHOD, MODEL
-        for i in range(len(self.input.responses)):
-            if i !=0: self.input.variables.append('\nvariables\n')
-            self.input.variables.append("id_variables = 'vars%d'"%(i+1))
-            if 'variable_options' in self.input.responses[i]:
-               self.input.variables.append(self.input.responses[i]['variable_options'])
-               del self.input.responses[i]['variable_options']
-            if 'var_types' not in self.input.responses[i]:
-               if 'objective_functions' in self.input.responses[i]:
-                   self.input.variables.append("\n".join(self.input.reg_variables))
-               elif 'response_functions' in self.input.responses[i]:
-                   self.input.variables.append("\n".join(self.input.uncertain_variables + self.input.state_variables))
-               else: raise ValueError("could not find response or objective in repsonse block %d %s")%(i, '\n'.join(self.input.responses[i]))
+        variables = []
+        layouts = []  # the cv of each block, None where not known
+        for i in range(len(responses)):
+            if i !=0: variables.append('\nvariables\n')
+            variables.append("id_variables = 'vars%d'"%(i+1))
+            if 'variable_options' in responses[i]:
+               variables.append(responses[i].pop('variable_options'))
+            if 'var_types' not in responses[i]:
+               if 'objective_functions' in responses[i]:
+                   variables.append("\n".join(reg_variables))
+                   layouts.append(design)
+               elif 'response_functions' in responses[i] or \
+                    'num_response_functions' in responses[i]:
+                   variables.append("\n".join(uncertain_variables + state_variables))
+                   layouts.append(uncertain + regular)
+               else: raise ValueError("could not find response or objective in repsonse block %d %s"%(i, '\n'.join(responses[i])))
             else:
-               for vartype in self.input.responses[i]['var_types']:
+               layout = {}
+               for vartype in responses[i].pop('var_types'):
                    if vartype=='uncertain':
-                     self.input.variables.append("\n".join(self.input.uncertain_variables))
+                     variables.append("\n".join(uncertain_variables))
+                     layout['uncertain'] = uncertain
                    elif vartype=='design':
-                     self.input.variables.append("\n".join(self.input.reg_variables))
+                     variables.append("\n".join(reg_variables))
+                     layout['design'] = design
                    elif vartype=='state':
-                     self.input.variables.append("\n".join(self.input.state_variables))
+                     variables.append("\n".join(state_variables))
+                     layout['state'] = regular
                    elif vartype=='custom':
-                     if self.custom_variables_blocks[i]: self.input.variables.append("\n".join(self.custom_variables_blocks[i]))
+                     layout['custom'] = None
+                     if self.custom_variables_blocks[i]: variables.append("\n".join(self.custom_variables_blocks[i]))
                      else: raise ValueError("variable_block not specified but custom variables requested")
                    else: raise ValueError("%s variable type is not supported"%vartype)
-               del self.input.responses[i]['var_types']
-                       
-        objectives = self.get_objectives()
-        temp_list = []
-        for i in range(len(self.input.method)):
-          for key in self.input.method[i]:
-                temp_list.append("%s  %s"%(key, self.input.method[i][key]))
-        self.methods = temp_list
-        self.input.method = temp_list
-
-        self.input.environment.append("method_pointer 'meth1'")
+               # DAKOTA orders design, uncertain then state variables
+               layouts.append(None if 'custom' in layout else
+                              sum((layout.get(kind, []) for kind in
+                                   ('design', 'uncertain', 'state')), []))
+
+        runtime = []  # (section, line index, key) of values set at runtime
+        method = []
+        for block in methods:
+          for key in block:
+                if block[key] == _SET_AT_RUNTIME: runtime.append(('method', len(method), key))
+                method.append("%s  %s"%(key, block[key]))
+        self.methods = method
+
+        environment = list(self.input.environment)
+        environment.append("method_pointer 'meth1'")
 
         # Deal with variable mapping
-        #cons = []
-        #for con in self.get_constraints():
-        #    for c in self.get_constraints()[con]:
-        #        cons.append(-1 * c)
         cons = []
 
         secondary_responses = [[0] + [0 for _ in range(len(cons))] for __ in range(len(cons))]
@@ -483,177 +1603,257 @@ class DakotaBase(Driver):
         for i in range(len(cons)):
             secondary_responses[i][j + 1] = 1
             j += 1
-        notnormps = [p[0] for p in parameters]
-        for x in self.reg_params:
-            if x[0] in notnormps: notnormps.remove(x[0])
-        names = [s[0] for s in parameters]
-        conlist = []
-        #for c in self.get_constraints():
-        #    conlist.extend(self.get_constraints()[c])
-        temp_list = []
+        model = []
         vm = None
-        for i in range(len(self.input.model)):
-          for key in self.input.model[i]:
-                temp_list.append("%s  %s"%(key, self.input.model[i][key]))
+        for i in range(len(models)):
+          skip = set()
+          for key in models[i]:
+                if key in skip: continue
+                model.append("%s  %s"%(key, models[i][key]))
                 if key == 'nested':
-                        vect = [0] *( self.input.n_objectives[i] + len(cons))
+                        vect = [0] *( n_objectives[i] + len(cons))
                         maps = []
-                        for j in range(self.input.n_objectives[i]):
+                        for j in range(n_objectives[i]):
                             s = vect
                             s[j] = 1
                             maps.append(s)
-                        if "primary_response_mapping" not in self.input.model[i]:
+                        if "primary_response_mapping" not in models[i]:
                             vm = "primary_response_mapping "+\
                              "\n".join(" ".join(" ".join([str(a), str(a)]) for a in  s) for s in maps)
                         else: vm = " "
                 if vm:
-                   temp_list.append(vm)
-                   if "primary_variable_mapping" not in self.input.model[i]: temp_list.append("primary_variable_mapping %s"%" ".join("'" + str(nam) + "'" for nam in names))
-                   if cons: 
-                       if "secondary_response_mapping" not in self.input.model[i]:
-                            temp_list.append("secondary_response_mapping \n%s" % " \n".join( " ".join( " ".join([str(s), str(s)]) for s in secondary_responses[i]) for i in range(len(cons))))
-                   if "secondary_variable_mapping" in self.input.model[i] and self.input.model[i]["secondary_variable_mapping"]=="":
-                       del self.input.model[i]["secondary_variable_mapping"]
-                       temp_list.append("secondary_variable_mapping %s"%" ".join("'mean'" if nam in self.special_distribution_variables else "''" for nam in names))
+                   model.append(vm)
+                   if "primary_variable_mapping" not in models[i]: model.append("primary_variable_mapping %s"%design_descriptors)
+                   if cons:
+                       if "secondary_response_mapping" not in models[i]:
+                            model.append("secondary_response_mapping \n%s" % " \n".join( " ".join( " ".join([str(s), str(s)]) for s in secondary_responses[i]) for i in range(len(cons))))
+                   if "secondary_variable_mapping" in models[i] and models[i]["secondary_variable_mapping"]=="":
+                       skip.add("secondary_variable_mapping")
+                       model.append("secondary_variable_mapping %s"%" ".join("'mean'" if name in special else "''" for name, index in design))
                    vm = 0
-        self.input.model = temp_list
-        temp_list = []
-        for i in range(len(self.input.responses)):
-            if 'objective_functions' in self.input.responses[i]:
-                self.input.responses[i]['nonlinear_inequality_constraints'] = len(cons)
-            if 'response_functions' in self.input.responses[i]:
-                self.input.responses[i]["response_functions"] = self.input.n_objectives[i] + len(cons)
-            for key in self.input.responses[i]:
-                #temp_list.append(key)
-                if self.input.responses[i][key] or self.input.responses[i][key]==0:
-                    temp_list.append(str(key) + '  '+str(self.input.responses[i][key]))
-                else: temp_list.append(key)
-        self.input.responses = temp_list
 
-        self.configured = 1
+        response_lines = []
+        for i in range(len(responses)):
+            if 'objective_functions' in responses[i]:
+                responses[i]['nonlinear_inequality_constraints'] = len(cons)
+            if 'response_functions' in responses[i]:
+                responses[i]["response_functions"] = n_objectives[i] + len(cons)
+            # UQ() leaves the responses to the objectives
+            if responses[i].get('num_response_functions') == _SET_AT_RUNTIME:
+                responses[i]['num_response_functions'] = \
+                    len(objectives) + len(cons)
+            if responses[i].get('response_descriptors') == _SET_AT_RUNTIME:
+                responses[i]['response_descriptors'] = \
+                    ' '.join("'%s'" % name for name in objectives)
+            for key in responses[i]:
+                if responses[i][key] == _SET_AT_RUNTIME: runtime.append(('responses', len(response_lines), key))
+                if responses[i][key] or responses[i][key]==0:
+                    response_lines.append(str(key) + '  '+str(responses[i][key]))
+                else: response_lines.append(key)
+
+        # only the blocks of models that aren't nested are evaluated
+        nested = [i for i in range(len(models)) if 'nested' in models[i]]
+        return dict(environment=environment, method=method, model=model,
+                    variables=variables, responses=response_lines,
+                    runtime=runtime, map_means=map_means,
+                    layouts=[VariableLayout(layout, sizes)
+                             for i, layout in enumerate(layouts)
+                             if layout is not None and i not in nested])
+
+    def _patch_input(self, template):
+        """
+        Return a :class:`DakotaInput` from `template` with the current
+        initial point, bounds and run-time values filled in.
+        """
+        special = self._special_parameters()
+        # initial points, lower and upper bounds of the regular parameters
+        # and, if design variables map onto means, of every parameter
+        regular = ([], [], [])
+        every = ([], [], [])
+        for name, param in self.get_parameters().items():
+            if name in special and not template['map_means']:
+                continue
+            size = getattr(param, 'size', 1)
+            values = (_flat(param.evaluate(self.parent), size),
+                      _flat(param.low, size), _flat(param.high, size))
+            for chunks, value in zip(every, values):
+                chunks.append(value)
+            if name not in special:
+                for chunks, value in zip(regular, values):
+                    chunks.append(value)
+        markers = list(zip((_INITIAL_POINT, _LOWER_BOUNDS, _UPPER_BOUNDS,
+                            _ALL_INITIAL_POINT, _ALL_LOWER_BOUNDS,
+                            _ALL_UPPER_BOUNDS),
+                           [_format(chunks) for chunks in regular + every]))
+
+        variables = []
+        for line in template['variables']:
+            if '@' in line:
+                for marker, text in markers:
+                    line = line.replace(marker, text)
+            variables.append(line)
+
+        sections = dict(method=list(template['method']),
+                        responses=list(template['responses']))
+        for section, i, key in template['runtime']:
+            if hasattr(self, key):
+                sections[section][i] = '%s  %s' % (key, getattr(self, key))
+
+        DakotaInput = _pydakota().DakotaInput
+        return DakotaInput(environment=list(template['environment']),
+                           method=sections['method'],
+                           model=list(template['model']),
+                           variables=variables,
+                           responses=sections['responses'])
 
     # This is the entry point to initialize the analysis run
     def execute(self):
         """ Write DAKOTA input and run. """
+        if self.adaptive_sampling:
+            self._run_adaptive()
+            return
         self.configure_input() 
         #self._prob = problem
         #if not self.configured: self.configure_input(problem) # this limits configuration to one time
+        self._reset_results()
         self.run_dakota()
 
+    def _run_adaptive(self):
+        """
+        Run the sampling study in batches, each with a new seed, until the
+        statistics in `results` converge (see `adaptive_sampling`).
+        """
+        if self.evaluation_groups:
+            # groups would test convergence on their own samples, and could
+            # disagree on how many runs to start
+            self.raise_exception('adaptive_sampling needs the statistics of'
+                                 ' every evaluation, it can\'t be used with'
+                                 ' evaluation_groups', ValueError)
+        self.configure_input()
+        method = self._dakota_input.method
+        max_samples = self.adaptive_max_samples or \
+                      self._method_option(method, 'samples', int, 0)
+        if max_samples < 1:
+            self.raise_exception('adaptive_sampling needs adaptive_max_samples'
+                                 ' or samples', ValueError)
+        for statistic in self.adaptive_statistics:
+            if statistic not in ('mean', 'std_dev') and \
+               statistic not in self.result_percentiles:
+                self.raise_exception('%s is not a tracked statistic'
+                                     % (statistic,), ValueError)
+        # whole rounds of the evaluation pool
+        concurrency = max(self.evaluation_concurrency, 1)
+        batch = max(self.adaptive_batch, 1)
+        batch = -(-batch // concurrency) * concurrency
+        seed = self._method_option(method, 'seed', int,
+                                   getattr(self, 'seed', None))
+        if not isinstance(seed, int):
+            seed = 1
+        monitor = ConvergenceMonitor(self.adaptive_statistics,
+                                     self.adaptive_confidence,
+                                     self.adaptive_rtol, self.adaptive_atol,
+                                     self.adaptive_min_samples)
+
+        self._reset_results()
+        self.converged = False
+        self._sequence_offset = 0
+        samples = 0
+        try:
+            while samples < max_samples and not self.converged:
+                n_samples = min(batch, max_samples - samples)
+                self.configure_input()
+                inp = self._dakota_input
+                inp.method = self._sampling_method(inp.method, n_samples,
+                                                   seed)
+                self.run_dakota()
+                self._sequence_offset += self._eval_count
+                samples += n_samples
+                seed += 1
+                self.convergence = monitor.intervals(self.results)
+                self.converged = monitor.converged(self.results)
+                self._logger.debug('%d samples, converged: %s',
+                                   samples, self.converged)
+        finally:
+            self._sequence_offset = None
+            if self.recorder is not None:
+                self.recorder.close()
+                self.recorder = None
+
+    @staticmethod
+    def _method_option(method, key, convert, default=None):
+        """
+        Value of option `key` in the lines of the `method` section, passed
+        through `convert`, or `default` if not set or not convertible.
+        """
+        for line in method:
+            words = line.split()
+            if len(words) == 2 and words[0] == key:
+                try:
+                    return convert(words[1])
+                except ValueError:
+                    break
+        return default
+
+    @staticmethod
+    def _sampling_method(method, samples, seed):
+        """ Lines of the `method` section set to `samples` and `seed`. """
+        keys = [line.split(None, 1)[0] if line.strip() else ''
+                for line in method]
+        if keys.count('sampling') != 1 or 'method' in keys:
+            raise ValueError('adaptive_sampling needs a single sampling'
+                             ' method')
+        values = collections.OrderedDict([('samples', samples),
+                                          ('seed', seed)])
+        lines = [('%s  %s' % (key, values[key]) if key in values else line)
+                 for key, line in zip(keys, method)]
+        at = keys.index('sampling') + 1
+        for key, value in values.items():
+            if key not in keys:
+                lines.insert(at, '%s  %s' % (key, value))
+        return lines
+
 # ---------------------------  special distribution magic ---------------------- #
  
+    @property
+    def special_distribution_variables(self):
+        """ Names of the variables with special distributions. """
+        return self.special_variables.names
+
     def clear_special_variables(self):
-       for var in self.special_distribution_variables:
-          try: self.remove_parameter(var)
-          except AttributeError:
-             pass
-       self.special_distribution_variables = []
-
-       self.normal_means = []
-       self.special_distribution_variables = []
-
-       self.normal_means = []
-       self.normal_std_devs = []
-       self.normal_descriptors = []
-       self.normal_lower_bounds = []
-       self.normal_upper_bounds = []
-   
-       self.lognormal_means= []
-       self.lognormal_std_devs = []
-       self.lognormal_descriptors = []
-   
-       self.exponential_betas = []
-       self.exponential_descriptors = []
-   
-       self.beta_betas = []
-       self.beta_alphas = []
-       self.beta_descriptors = []
-       self.beta_lower_bounds = []
-       self.beta_upper_bounds = []
-
-       self.gamma_alphas = []
-       self.gamma_betas = []
-       self.gamma_descriptors = []
-
-       self.weibull_alphas = []
-       self.weibull_betas = []
-       self.weibull_descriptors = []
+        """ Remove all special distribution variables. """
+        for var in self.special_variables:
+            try: self.remove_parameter(var)
+            except AttributeError:
+                pass
+        self.special_variables.clear()
 
     # adds a probability variable. This concept is unique to pydakdriver.
     def add_special_distribution(self, var, dist, alpha = _SET_AT_RUNTIME, beta = _SET_AT_RUNTIME, 
                                  mean = _SET_AT_RUNTIME, std_dev = _SET_AT_RUNTIME,
                                  lower_bounds = _SET_AT_RUNTIME, upper_bounds = _SET_AT_RUNTIME ):
-        def check_set(option):
-            if option == _SET_AT_RUNTIME: raise ValueError("INCOMPLETE DEFINITION FOR VARIABLE "+str(var))
-
-        varlist = [] # handles array entries
-        if dist == 'normal':
-            check_set(std_dev)
-            check_set(mean)
-           # check_set(lower_bounds)
-           # check_set(upper_bounds)
-          #  self.normal_lower_bounds.append(str(lower_bounds))
-          #  self.normal_upper_bounds.append(str(upper_bounds))
-            if True:#str(type(mean)) in ['int', 'str']:
-               self.normal_means.append(str(mean))
-               self.normal_std_devs.append(str(std_dev))
-               self.normal_descriptors.append(var)
-               self.normal_lower_bounds.append(str(lower_bounds))
-               self.normal_upper_bounds.append(str(upper_bounds))
-            else:
-               self.normal_means.extend(str(m) for m in mean)
-               self.normal_std_devs.extend(str(s) for s in std_dev)
-               for i in range(len(mean)): 
-                   self.normal_descriptors.append(var+"[%d]"%i)
-                   varlist.append(var+"[%d]"%i)
-               self.normal_lower_bounds.extend(str(l) for l in lower_bounds)
-               self.normal_upper_bounds.extend(str(u) for u in upper_bounds)
-               
-               
-        elif dist == 'lognormal':
-            check_set(std_dev)
-            check_set(mean)
-            self.lognormal_means.append(str(mean))
-            self.lognormal_std_devs.append(str(std_dev))
-            self.lognormal_descriptors.append(descriptor)
-               
-        elif dist == 'exponential':
-            check_set(beta)
-            check_set(descriptor)
-            self.exponential_betas.append(str(beta))
-            self.exponential_descriptors.append(descriptor)
-
-        elif dist == 'beta':
-            check_set(beta)
-            check_set(alpha)
-            check_set(lower_bounds)
-            check_set(upper_bounds)
-
-            self.beta_betas.append(str(beta))
-            self.beta_alphas.append(str(alpha))
-            self.beta_descriptors.append(var)
-            self.beta_lower_bounds.append(str(lower_bounds))
-            self.beta_upper_bounds.append(str(upper_bounds))
-            
-        elif dist == "gamma":
-            check_set(beta)
-            check_set(alpha)
-
-            self.gamma_alphas.append(str(alpha))
-            self.gamma_betas.append(str(beta))
-            self.gamma_descriptors.append(var)
-
-            self.weibull_betas.append(str(beta))
-            self.weibull_descriptors.append(var)
-       
-        else: 
-            raise ValueError(str(dist)+" is not a defined distribution")
-
-        if varlist:
-          for var in varlist:
-            self.special_distribution_variables.append(var)
+        """
+        Give `var` the distribution `dist` (normal, lognormal, exponential,
+        beta, gamma or weibull).  If the distribution parameters are arrays,
+        `var` is an array and each element ``var[i]`` gets the i'th values.
+        """
+        parameters = dict(alpha=alpha, beta=beta, mean=mean, std_dev=std_dev,
+                          lower_bounds=lower_bounds, upper_bounds=upper_bounds)
+        parameters = dict((name, value) for name, value in parameters.items()
+                          if value is not _SET_AT_RUNTIME)
+        sizes = set(np.size(value) for value in parameters.values()
+                    if np.ndim(value))
+        if sizes:
+            names = ['%s[%d]' % (var, i) for i in range(max(sizes))]
         else:
-            self.special_distribution_variables.append(var)
+            names = [var]
+        self.special_variables.add_many(names, dist, **parameters)
+
+    def add_special_distributions(self, names, dist, **parameters):
+        """
+        Give each of `names` the distribution `dist`, each of `parameters` is
+        one value for all of them or a sequence with a value for each.
+        """
+        self.special_variables.add_many(names, dist, **parameters)
 
 ################################################################################
 ########################## Hierarchical Driver ################################
@@ -668,11 +1868,8 @@ class pydakdriver(DakotaBase):
         #self.input.responses = collections.OrderedDict()
         if comm: self.mpi_comm = comm
         else: self.mpi_comm = None
-        self.input.uncertain_variables = []
-        self.input.state_variables = []
         self.methods = []
         self.input.model = []
-        self.input.reg_variables = []
         self.input.n_objectives = []
 
         # default definitions for set_variables
@@ -683,7 +1880,6 @@ class pydakdriver(DakotaBase):
         self.uniform = False
         self.need_bounds = True
 
-        self.dakota_hotstart = False
         # allow arrays to be desvars
         self.array_desvars = []
 
@@ -798,19 +1994,28 @@ class pydakdriver(DakotaBase):
          self.input.responses['fd_gradient_step_size'] = self.fd_gradient_step_size
 
     def numerical_gradients(self, method_source='dakota'):
-         for key in self.input.responses:
-             if key == 'no_gradients': self.input.responses.pop(key)
-         self.input.responses['numerical_gradients'] = ''
-         if method_source=='dakota':self.input.responses['method_source dakota']=''
+         """
+         Request numerical gradients.  With `method_source` 'driver' they are
+         computed by the driver, see `fd_gradients`.
+         """
+         if method_source == 'driver': self.fd_gradients = True
+         for block in self._spec_blocks(self.input.responses):
+             block.pop('no_gradients', None)
+             block['numerical_gradients'] = ''
+             if method_source=='dakota':block['method_source dakota']=''
+             block['interval_type'] = ''
+             block['fd_gradient_step_size'] = self.fd_gradient_step_size
          self.interval_type = 'forward'
-         self.input.responses['interval_type'] = ''
-         self.input.responses['fd_gradient_step_size'] = self.fd_gradient_step_size
 
-    def hessians(self):
-         self.input.responses['numerical_hessians']=''
-         for key in self.input.responses:
-             if key == 'no_hessians':
-                  self.input.responses.pop(key)
+    def hessians(self, method_source='dakota'):
+         """
+         Request numerical Hessians.  With `method_source` 'driver' they are
+         computed by the driver, see `fd_hessians`.
+         """
+         if method_source == 'driver': self.fd_hessians = True
+         for block in self._spec_blocks(self.input.responses):
+             block.pop('no_hessians', None)
+             block['numerical_hessians']=''
          # todo: Create Hessian default with options
 
     def Optimization(self,opt_type='optpp_newton', interval_type = 'forward', surrogate_model=False, ouu=False, compromise=False, sub_sample_type='polynomial_chaos' ):
@@ -0,0 +1,54 @@
+"""
+Handling of evaluations that raise or hang.
+
+Each evaluation ends with a status, recorded in the evaluation log so the
+failed ones can be found (``log['cv'][log['status'] != OK]``) and rerun
+later, finished evaluations being replayed from the evaluation cache.
+"""
+import contextlib
+import signal
+import threading
+
+__all__ = ['OK', 'FAILED', 'TIMED_OUT', 'EvaluationFailure',
+           'EvaluationTimeout', 'time_limit']
+
+# evaluation status codes
+OK = 0
+FAILED = 1
+TIMED_OUT = 2
+
+
+class EvaluationTimeout(Exception):
+    """ An evaluation took longer than its time limit. """
+
+
+class EvaluationFailure(Exception):
+    """ An evaluation failed, after any retries, with `status`. """
+
+    def __init__(self, status, message=''):
+        super(EvaluationFailure, self).__init__(message)
+        self.status = status
+
+
+def _alarm(signum, frame):
+    raise EvaluationTimeout('evaluation timed out')
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    """
+    Raise :class:`EvaluationTimeout` in the block if it runs longer than
+    `seconds`.  Only enforced in the main thread of platforms with
+    ``signal.setitimer``, and only while Python code is running.
+    """
+    if not seconds or not hasattr(signal, 'setitimer') or \
+       not isinstance(threading.current_thread(), threading._MainThread):
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
@@ -0,0 +1,101 @@
+"""
+Finite difference gradients and Hessians from stencils evaluated as one block.
+
+Every perturbed point around `x` is built up front, so the driver can run
+the whole stencil concurrently (on the evaluation pool, or in one pass of a
+vectorized workflow) instead of DAKOTA requesting one point per callback.
+"""
+import numpy as np
+
+__all__ = ['FiniteDifference']
+
+
+class FiniteDifference(object):
+    """
+    Gradients by `interval_type` (``'forward'`` or ``'central'``) differences,
+    Hessians by second-order differences.
+    As for DAKOTA's ``fd_gradient_step_size``, `step_size` is relative to
+    ``|x|``, it is used as an absolute step where ``|x| < 1``.
+    """
+
+    def __init__(self, step_size=1e-6, interval_type='forward'):
+        if interval_type not in ('forward', 'central'):
+            raise ValueError("interval_type must be 'forward' or 'central',"
+                             " not %r" % interval_type)
+        self.step_size = float(step_size)
+        self.interval_type = interval_type
+
+    @property
+    def needs_base(self):
+        """ True if the gradient uses the function values at `x`. """
+        return self.interval_type == 'forward'
+
+    def steps(self, x):
+        """ Step taken in each variable at `x`. """
+        return self.step_size * np.maximum(np.abs(np.asarray(x, float)), 1.)
+
+    def stencil(self, x):
+        """ Return the ``(n_points, n_vars)`` points to evaluate around `x`. """
+        x = np.asarray(x, dtype=float)
+        offsets = np.diag(self.steps(x))
+        if self.interval_type == 'forward':
+            return x + offsets
+        return np.vstack((x + offsets, x - offsets))
+
+    def gradient(self, x, f0, values):
+        """
+        Return the ``(n_functions, n_vars)`` gradient at `x` from the values
+        `f0` at `x` and the ``(n_points, n_functions)`` `values` at the
+        points of :meth:`stencil`.
+        """
+        steps = self.steps(x)[:, np.newaxis]
+        values = np.asarray(values, dtype=float)
+        n_vars = len(steps)
+        if self.interval_type == 'forward':
+            return ((values[:n_vars] - np.asarray(f0, dtype=float)) / steps).T
+        return ((values[:n_vars] - values[n_vars:2 * n_vars])
+                / (2 * steps)).T
+
+    def hessian_stencil(self, x):
+        """
+        Return the points to evaluate around `x` for :meth:`hessian`:
+        ``x + h_i``, ``x - h_i``, then ``x + h_i + h_j``, ``x + h_i - h_j``,
+        ``x - h_i + h_j`` and ``x - h_i - h_j`` for each ``i < j``.
+        The leading rows are those of :meth:`stencil`, so a gradient with the
+        same step can be taken from the same values.
+        """
+        x = np.asarray(x, dtype=float)
+        offsets = np.diag(self.steps(x))
+        i, j = np.triu_indices(len(x), 1)
+        return np.vstack((x + offsets, x - offsets,
+                          x + offsets[i] + offsets[j],
+                          x + offsets[i] - offsets[j],
+                          x - offsets[i] + offsets[j],
+                          x - offsets[i] - offsets[j]))
+
+    def hessian(self, x, f0, values):
+        """
+        Return the ``(n_functions, n_vars, n_vars)`` Hessian at `x` from the
+        values `f0` at `x` and the `values` at the points of
+        :meth:`hessian_stencil`.  Cross terms use the central four-point
+        difference, as accurate as the diagonal's.
+        """
+        steps = self.steps(x)
+        n_vars = len(steps)
+        f0 = np.asarray(f0, dtype=float)
+        values = np.asarray(values, dtype=float)
+        plus = values[:n_vars]
+        minus = values[n_vars:2 * n_vars]
+        n_pairs = n_vars * (n_vars - 1) // 2
+        pairs = values[2 * n_vars:].reshape(4, n_pairs, -1)
+
+        hess = np.empty((f0.size, n_vars, n_vars))
+        diag = np.arange(n_vars)
+        hess[:, diag, diag] = \
+            ((plus - 2 * f0 + minus) / (steps ** 2)[:, np.newaxis]).T
+        i, j = np.triu_indices(n_vars, 1)
+        cross = ((pairs[0] - pairs[1] - pairs[2] + pairs[3])
+                 / (4 * steps[i] * steps[j])[:, np.newaxis]).T
+        hess[:, i, j] = cross
+        hess[:, j, i] = cross
+        return hess
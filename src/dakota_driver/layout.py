@@ -0,0 +1,96 @@
+"""
+Layout of DAKOTA's continuous variables.
+
+DAKOTA passes the values of the variables of a block in one array, ``cv``:
+design variables first, then uncertain variables (grouped by distribution)
+and then state variables.  A :class:`VariableLayout` is built once, when
+the input is compiled, and records which part of ``cv`` belongs to each
+parameter, so an evaluation sets each array parameter from a view of
+``cv`` rather than element by element.
+"""
+import collections
+
+import numpy as np
+
+__all__ = ['VariableLayout', 'element_names', 'split_element']
+
+
+def element_names(name, size):
+    """ DAKOTA descriptors of the elements of parameter `name`. """
+    if size == 1:
+        return [str(name)]
+    return ['%s[%d]' % (name, i) for i in range(size)]
+
+
+def split_element(descriptor):
+    """ Return ``(name, index)`` of ``name[index]``, or ``(descriptor, None)``. """
+    if descriptor.endswith(']') and '[' in descriptor:
+        name, index = descriptor[:-1].rsplit('[', 1)
+        return name, int(index)
+    return descriptor, None
+
+
+class VariableLayout(object):
+    """
+    Where the values of each parameter are in ``cv``.  `elements` are the
+    ``(parameter, index)`` of each variable in ``cv`` order, `index` is None
+    for scalars.  `sizes` maps parameters to their number of elements.
+    """
+
+    def __init__(self, elements, sizes):
+        self.size = len(elements)
+        self.elements = list(elements)
+        positions = collections.OrderedDict()
+        for position, (name, index) in enumerate(elements):
+            positions.setdefault(name, []).append((position, index))
+
+        # name -> (key into cv, element indices or None)
+        self.keys = collections.OrderedDict()
+        for name, items in positions.items():
+            cv_index = np.array([position for position, index in items])
+            indices = [index for position, index in items]
+            if indices == [None]:
+                self.keys[name] = (int(cv_index[0]), None)
+            elif indices == list(range(sizes[name])) and \
+                    cv_index[-1] - cv_index[0] == len(cv_index) - 1:
+                self.keys[name] = (slice(int(cv_index[0]),
+                                         int(cv_index[-1]) + 1), None)
+            else:
+                self.keys[name] = (cv_index, np.array(indices))
+
+    def __len__(self):
+        return self.size
+
+    def owners(self):
+        """ The parameter of each variable in ``cv``. """
+        owners = [None] * self.size
+        positions = np.arange(self.size)
+        for name, (key, indices) in self.keys.items():
+            for position in np.atleast_1d(positions[key]).tolist():
+                owners[position] = name
+        return owners
+
+    def descriptors(self):
+        """ The name of each variable in ``cv``, ``name[index]`` for elements. """
+        return [name if index is None else '%s[%d]' % (name, index)
+                for name, index in self.elements]
+
+    def permutation(self, names, sizes):
+        """
+        Return the index into the concatenated elements of `names` of each
+        variable in ``cv``, or None if that's the same order.
+        """
+        offsets = {}
+        offset = 0
+        for name in names:
+            offsets[name] = offset
+            offset += sizes[name]
+        order = np.empty(self.size, dtype=int)
+        for name, (key, indices) in self.keys.items():
+            if indices is None:
+                indices = np.arange(sizes[name]) if isinstance(key, slice) \
+                          else 0
+            order[key] = offsets[name] + indices
+        if offset == self.size and (order == np.arange(self.size)).all():
+            return None
+        return order
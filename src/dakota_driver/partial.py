@@ -0,0 +1,170 @@
+"""
+Partial re-execution of a workflow between evaluations.
+
+The parameters each evaluation sets reach only some of the workflow's
+components, directly or through connections.  Given the connections of the
+assembly, :class:`PartialExecution` finds the components downstream of each
+variable in ``cv``, and skips the components none of whose upstream
+variables changed since they last ran, keeping their outputs.  In an OUU
+study the components depending only on design variables then run once per
+inner study rather than once per sample.
+
+Likewise, the components upstream of each response are found, and when
+DAKOTA's active set vector asks for only some responses the components
+none of them depend on are skipped too.  The components needed for each
+active set pattern are worked out once and cached.
+"""
+import collections
+
+import numpy as np
+
+__all__ = ['PartialExecution']
+
+
+class PartialExecution(object):
+    """
+    Skips runs of `components` (in workflow order) that no requested
+    response needs or, if `track_changes`, whose inputs haven't changed.
+    `connections` are the ``(source, destination)`` paths of the assembly,
+    None if unknown, in which case every component depends on every
+    variable and every response on every component.
+    """
+
+    def __init__(self, components, connections, track_changes=True):
+        self.components = list(components)
+        self.names = [comp.name for comp in self.components]
+        self.track_changes = track_changes
+        self._index = dict((name, i) for i, name in enumerate(self.names))
+        self._graph = None
+        self._reverse = None
+        if connections is not None:
+            self._graph = collections.defaultdict(set)
+            self._reverse = collections.defaultdict(set)
+            for src, dst in connections:
+                src, dst = self._node(src), self._node(dst)
+                self._graph[src].add(dst)
+                self._reverse[dst].add(src)
+        self._masks = {}
+        self._upstream = None
+        self._needed = {}
+        self._last = None
+        self._dirty = np.ones(len(self.names), dtype=bool)
+        self._run = np.ones(len(self.names), dtype=bool)
+        self._instrumented = []
+        self.executed = 0
+        self.skipped = 0
+
+    def _node(self, path):
+        """ The component `path` belongs to, else `path` itself. """
+        name = path.split('.', 1)[0].split('[', 1)[0]
+        return name if name in self._index else path
+
+    def _reachable(self, paths, graph):
+        """ Boolean mask of the components reached from `paths`. """
+        mask = np.zeros(len(self.names), dtype=bool)
+        if graph is None or paths is None:
+            mask[:] = paths is None or bool(paths)
+            return mask
+        todo = [self._node(path) for path in paths]
+        seen = set(todo)
+        while todo:
+            node = todo.pop()
+            if node in self._index:
+                mask[self._index[node]] = True
+            for next_node in graph.get(node, ()):
+                if next_node not in seen:
+                    seen.add(next_node)
+                    todo.append(next_node)
+        return mask
+
+    def downstream(self, paths):
+        """ Boolean mask of the components depending on any of `paths`. """
+        return self._reachable(paths, self._graph)
+
+    def upstream(self, paths):
+        """
+        Boolean mask of the components any of `paths` depend on, all of
+        them if `paths` is None.
+        """
+        return self._reachable(paths, self._reverse)
+
+    def set_targets(self, targets):
+        """
+        Set the paths each variable of ``cv`` sets, `targets` has a list of
+        paths for each variable.
+        """
+        masks = np.array([self.downstream(paths) for paths in targets],
+                         dtype=bool).reshape(len(targets), len(self.names))
+        self._masks[len(targets)] = masks
+
+    def set_responses(self, responses):
+        """
+        Set the paths each response (each entry of the active set vector)
+        reads, `responses` has a list of paths, or None if not known, for
+        each response.
+        """
+        self._upstream = np.array(
+            [self.upstream(paths) for paths in responses],
+            dtype=bool).reshape(len(responses), len(self.names))
+        self._needed = {}
+
+    def needed(self, asv):
+        """ Boolean mask of the components the responses in `asv` need. """
+        upstream = self._upstream
+        if asv is None or upstream is None or len(asv) != len(upstream):
+            return np.ones(len(self.names), dtype=bool)
+        active = np.asarray(asv) != 0
+        key = active.tobytes()
+        mask = self._needed.get(key)
+        if mask is None:
+            mask = self._needed[key] = upstream[active].any(axis=0)
+        return mask
+
+    def update(self, cv, asv=None):
+        """ Decide which components run for the evaluation at `cv`. """
+        cv = np.array(cv, dtype=float)
+        last = self._last
+        masks = self._masks.get(cv.shape[-1])
+        if not self.track_changes or last is None or masks is None or \
+           last.shape != cv.shape:
+            self._dirty[:] = True
+        else:
+            self._dirty |= masks[cv != last].any(axis=0)
+        self._last = cv
+        self._run = self._dirty & self.needed(asv)
+
+    def reset(self):
+        """ Run every component on the next evaluation. """
+        self._last = None
+        self._dirty[:] = True
+        self._run[:] = True
+
+    def instrument(self):
+        """ Make the components' runs skippable, until :meth:`restore`. """
+        for i, comp in enumerate(self.components):
+            self._instrumented.append((comp, comp.__dict__.get('run')))
+            comp.run = self._skippable(comp.run, i)
+
+    def restore(self):
+        """ Remove what :meth:`instrument` added. """
+        for comp, run in reversed(self._instrumented):
+            if run is None:
+                del comp.run
+            else:
+                comp.run = run
+        self._instrumented = []
+
+    def _skippable(self, run, i):
+        def skippable_run(*args, **kwargs):
+            if self._run[i]:
+                self.executed += 1
+                try:
+                    result = run(*args, **kwargs)
+                except Exception:
+                    # outputs may be stale, run everything next time
+                    self.reset()
+                    raise
+                self._dirty[i] = False
+                return result
+            self.skipped += 1
+        return skippable_run
@@ -0,0 +1,120 @@
+"""
+Local process pool used to run independent DAKOTA evaluations concurrently.
+
+Workers are forked from the driver's process after the input has been
+configured, so each one holds its own copy of the parent assembly and its
+workflow.  Evaluations are returned in the order they were submitted.
+
+With a time limit, each worker reports when it starts a task, and a worker
+still busy with a task `grace` seconds after the limit (which its own alarm
+could not interrupt, being stuck outside Python code) is killed.  The pool
+replaces it with a fresh fork holding the same driver.
+"""
+import multiprocessing
+import multiprocessing.queues
+import os
+import signal
+import time
+
+from dakota_driver.failures import TIMED_OUT
+
+__all__ = ['EvaluationPool']
+
+# seconds between checks for hung workers
+_POLL = 0.5
+
+# driver being evaluated and where tasks report their start, set in workers
+_DRIVER = None
+_STARTED = None
+
+
+def _init_worker(driver, started):
+    """ Pool initializer, keeps the driver in the worker. """
+    global _DRIVER, _STARTED
+    _DRIVER = driver
+    _STARTED = started
+
+
+def _run_evaluation(args):
+    """ Evaluate one ``(task, cv, asv)`` on the worker's copy of the driver. """
+    task, cv, asv = args
+    if _STARTED is not None:
+        _STARTED.put((task, os.getpid(), time.time()))
+    return _DRIVER._pool_task(cv, asv)
+
+
+def _simple_queue():
+    """ A queue whose ``put`` writes before returning. """
+    if hasattr(multiprocessing, 'SimpleQueue'):
+        return multiprocessing.SimpleQueue()
+    return multiprocessing.queues.SimpleQueue()
+
+
+class EvaluationPool(object):
+    """
+    Pool of `processes` workers evaluating `driver`'s workflow.
+    Each task is run with the driver's ``_pool_task(cv, asv)``, workers
+    busy with a task longer than `timeout` (if not 0) plus `grace` seconds
+    are killed.
+    """
+
+    def __init__(self, driver, processes, timeout=0, grace=5.):
+        self.processes = processes
+        self.timeout = timeout
+        self.grace = grace
+        self._started = _simple_queue() if timeout else None
+        self._running = {}
+        self._next_task = 0
+        self._killed = False
+        self._pool = multiprocessing.Pool(processes, _init_worker,
+                                          (driver, self._started))
+
+    def map(self, cvs, asvs):
+        """ Return ``(fns, fnGrads, status)`` for each row of `cvs`, in order. """
+        first = self._next_task
+        self._next_task += len(cvs)
+        tasks = [(first + i, cv, asv)
+                 for i, (cv, asv) in enumerate(zip(cvs, asvs))]
+        if not self.timeout:
+            return self._pool.map(_run_evaluation, tasks, chunksize=1)
+
+        pending = [self._pool.apply_async(_run_evaluation, (task,))
+                   for task in tasks]
+        results = []
+        for (task, cv, asv), result in zip(tasks, pending):
+            while True:
+                try:
+                    results.append(result.get(_POLL))
+                    break
+                except multiprocessing.TimeoutError:
+                    if self._kill_if_hung(task):
+                        results.append((None, None, TIMED_OUT))
+                        break
+            self._running.pop(task, None)
+        return results
+
+    def _kill_if_hung(self, task):
+        """ Kill the worker running `task` if over time, True if killed. """
+        while not self._started.empty():
+            started, pid, start = self._started.get()
+            self._running[started] = (pid, start)
+        if task not in self._running:
+            return False
+        pid, start = self._running[task]
+        if time.time() - start < self.timeout + self.grace:
+            return False
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self._killed = True
+        return True
+
+    def close(self):
+        """ Stop the workers. """
+        if self._killed:
+            # tasks of killed workers never complete, don't wait for them
+            self._pool.terminate()
+        else:
+            self._pool.close()
+        self._pool.join()
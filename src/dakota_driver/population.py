@@ -0,0 +1,222 @@
+"""
+Concurrent evaluation of a population of design points.
+
+An outer optimizer proposing a population (a genetic algorithm's
+generation, or a batch of a sampling study) can have the inner studies for
+those points run at the same time: each point is evaluated by a forked
+process holding its own copy of the assembly, with its inner drivers, so
+nothing is shared but the files they write.  Each process runs in a
+working directory of its own, which keeps apart the files DAKOTA always
+names the same (its restart file) and the drivers' relative paths.
+
+The workers aren't daemonic, so inner drivers may use evaluation pools of
+their own.  A driver with ``evaluation_processes = 'population'`` runs its
+concurrent evaluations through a :class:`PopulationPool`, and a component
+with ``vectorized = True`` (see ``DakotaBase._vectorized_workflow``) can
+serve a batch callback of an outer driver from
+:meth:`PopulationScheduler.evaluate`.
+"""
+import multiprocessing
+import os
+import time
+import traceback
+
+import numpy as np
+
+from dakota_driver.failures import TIMED_OUT
+from dakota_driver.workdir import WorkDirectories
+
+try:
+    from multiprocessing.connection import wait as _connection_wait
+except ImportError:  # Python 2
+    _connection_wait = None
+
+__all__ = ['PopulationScheduler', 'PopulationPool']
+
+# seconds between polls of the workers, without connection.wait
+_POLL = 0.01
+
+
+def _wait(conns, timeout=None):
+    """
+    Return the connections of `conns` ready to be read, waiting at most
+    `timeout` seconds (if not None) for one.
+    """
+    if _connection_wait is not None:
+        return _connection_wait(conns, timeout)
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        ready = [conn for conn in conns if conn.poll()]
+        if ready or (deadline is not None and time.time() >= deadline):
+            return ready
+        time.sleep(_POLL)
+
+
+class PopulationScheduler(object):
+    """
+    Evaluates `assembly` at points setting `inputs` (variable paths) and
+    returning `outputs` (expressions passed to ``assembly.get``), in up to
+    `processes` worker processes (default the number of CPUs), each in a
+    directory under `root` populated from `template` (see
+    :class:`WorkDirectories`).  Processes still running `timeout` seconds
+    (if not 0) after they started are killed.
+    """
+
+    def __init__(self, assembly, inputs, outputs, processes=None, root='',
+                 cleanup='always', keep=10, template=None, link=False,
+                 timeout=0):
+        self.assembly = assembly
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.root = root
+        self.cleanup = cleanup
+        self.keep = keep
+        self.template = template
+        self.link = link
+        self.timeout = timeout
+
+    def evaluate(self, points):
+        """
+        Return the outputs for the ``(n_points, n_inputs)`` `points`, a row
+        per point with the (flattened) values of each output.  The first
+        failure raises RuntimeError.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        if not len(points):
+            return np.empty((0, len(self.outputs)))
+        return np.array(self.map(self._evaluate, points), dtype=float)
+
+    def map(self, function, points, timed_out=None):
+        """
+        Return ``function(point)`` for each of `points`, each called in a
+        process forked for it, in a directory of its own.  Results are
+        collected as processes finish, whatever their order.  Points whose
+        process is killed at the `timeout` get `timed_out`, or raise
+        RuntimeError if it is None, as does the first failure.
+        """
+        results = [None] * len(points)
+        workdirs = WorkDirectories(self.root, 'population', self.template,
+                                   self.link, self.cleanup, self.keep)
+        # connection -> (point index, process, directory, deadline)
+        running = {}
+        todo = list(range(len(points)))
+        try:
+            while todo or running:
+                while todo and len(running) < self.processes:
+                    i = todo.pop(0)
+                    conn, process, path = self._start(function, points[i],
+                                                      workdirs)
+                    deadline = None
+                    if self.timeout:
+                        deadline = time.time() + self.timeout
+                    running[conn] = i, process, path, deadline
+                for conn in _wait(list(running), self._wait_time(running)):
+                    i, process, path, deadline = running.pop(conn)
+                    try:
+                        ok, value = conn.recv()
+                    except EOFError:
+                        ok, value = False, 'worker died'
+                    conn.close()
+                    process.join()
+                    workdirs.release(path, ok)
+                    if not ok:
+                        raise RuntimeError('evaluation of point %d failed:\n%s'
+                                           % (i, value))
+                    results[i] = value
+                now = time.time()
+                for conn, (i, process, path, deadline) in \
+                        list(running.items()):
+                    if deadline is None or now < deadline:
+                        continue
+                    del running[conn]
+                    conn.close()
+                    process.terminate()
+                    process.join()
+                    workdirs.release(path, False)
+                    if timed_out is None:
+                        raise RuntimeError('evaluation of point %d timed out'
+                                           ' after %g seconds'
+                                           % (i, self.timeout))
+                    results[i] = timed_out
+        finally:
+            # interrupted, not failed: only failures are kept for 'success'
+            for conn, (i, process, path, deadline) in running.items():
+                conn.close()
+                process.terminate()
+                process.join()
+                workdirs.release(path, True)
+            workdirs.close()
+        return results
+
+    @staticmethod
+    def _wait_time(running):
+        """ Seconds until the first deadline of `running`, None if none. """
+        deadlines = [deadline for i, process, path, deadline
+                     in running.values() if deadline is not None]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.time(), 0.)
+
+    def _start(self, function, point, workdirs):
+        """ Fork a process calling `function` at `point` in a directory. """
+        path = workdirs.create()
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=self._run,
+                                          args=(function, point, path, child))
+        process.start()
+        child.close()
+        return parent, process, path
+
+    def _run(self, function, point, path, conn):
+        """ Call `function` in `path`, sending ``(ok, result or error)``. """
+        try:
+            os.chdir(path)
+            result = True, function(point)
+        except Exception:
+            result = False, traceback.format_exc()
+        conn.send(result)
+        conn.close()
+
+    def _evaluate(self, point):
+        """ Return the outputs of the assembly at `point`. """
+        assembly = self.assembly
+        for name, value in zip(self.inputs, point):
+            assembly.set(name, value)
+        assembly.run()
+        values = []
+        for name in self.outputs:
+            values.extend(np.ravel(assembly.get(name)).tolist())
+        return values
+
+
+class PopulationPool(object):
+    """
+    Evaluates `driver`'s workflow like an :class:`EvaluationPool`, but with
+    a :class:`PopulationScheduler` forking a process for each evaluation,
+    so inner drivers may evaluate concurrently themselves.  Directories are
+    made as the driver's `workdir_*` options say.  Processes busy longer
+    than `timeout` (if not 0) plus `grace` seconds are killed, their
+    evaluations time out.
+    """
+
+    def __init__(self, driver, processes, timeout=0, grace=5.):
+        self.driver = driver
+        self.scheduler = PopulationScheduler(
+            None, (), (), processes, driver.workdir_root,
+            driver.workdir_cleanup, driver.workdir_keep,
+            driver.workdir_template, driver.workdir_link,
+            timeout + grace if timeout else 0)
+
+    def map(self, cvs, asvs):
+        """ Return ``(fns, fnGrads, status)`` for each row of `cvs`. """
+        return self.scheduler.map(self._task, list(zip(cvs, asvs)),
+                                  (None, None, TIMED_OUT))
+
+    def _task(self, args):
+        """ Evaluate one ``(cv, asv)`` on the process' copy of the driver. """
+        cv, asv = args
+        return self.driver._pool_task(cv, asv)
+
+    def close(self):
+        """ Nothing to stop, processes end with their evaluation. """
@@ -0,0 +1,120 @@
+"""
+Memory-mapped access to evaluation logs written by
+:class:`~dakota_driver.recorder.EvaluationRecorder`.
+
+Nothing is read until a column is asked for, and the chunked methods only
+touch one chunk at a time, so even a multi-GB sampling history can be
+analysed in a small, fixed amount of memory::
+
+    history = EvaluationHistory('run_log')
+    f = history.response('rose.f', start_id=1000, stop_id=2000)
+    stats = history.reduce('fns', RunningStats, index=0)
+"""
+import json
+import os
+
+import numpy as np
+
+from dakota_driver.recorder import _META, _chunk_file
+
+__all__ = ['EvaluationHistory']
+
+
+class EvaluationHistory(object):
+    """ Lazy, read-only view of the evaluation log in directory `path`. """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, _META)) as inp:
+            meta = json.load(inp)
+        self.columns = [str(column['name']) for column in meta['columns']]
+        self.descriptors = [str(name) for name in meta['descriptors']]
+        self.responses = [str(name) for name in meta['responses']]
+        self.chunk_sizes = list(meta['chunks'])
+        self._offsets = np.concatenate([[0], np.cumsum(self.chunk_sizes)])
+        self._id_ranges = None
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def chunk(self, column, index):
+        """ Return chunk `index` of `column`, memory-mapped. """
+        if column not in self.columns:
+            raise KeyError('%s is not recorded, columns are %s'
+                           % (column, self.columns))
+        return np.load(_chunk_file(self.path, column, index), mmap_mode='r')
+
+    def iter_chunks(self, column, start_id=None, stop_id=None):
+        """
+        Yield the rows of `column` chunk by chunk, limited to evaluation ids
+        in ``[start_id, stop_id)``.  Chunks outside the range aren't opened.
+        """
+        check_ids = start_id is not None or stop_id is not None
+        for index, (low, high) in enumerate(self._chunk_id_ranges()):
+            if start_id is not None and high < start_id:
+                continue
+            if stop_id is not None and low >= stop_id:
+                continue
+            data = self.chunk(column, index)
+            if check_ids:
+                ids = self.chunk('eval_id', index)
+                mask = np.ones(len(ids), dtype=bool)
+                if start_id is not None:
+                    mask &= ids >= start_id
+                if stop_id is not None:
+                    mask &= ids < stop_id
+                if not mask.all():
+                    data = data[mask]
+            yield data
+
+    def column(self, column, start_id=None, stop_id=None, index=None):
+        """
+        Return `column` as one array, limited to evaluation ids in
+        ``[start_id, stop_id)``.  `index` selects within each row, for
+        example ``column('cv', index=0)`` is the first variable.
+        """
+        parts = []
+        for data in self.iter_chunks(column, start_id, stop_id):
+            if index is not None:
+                data = data[(slice(None),) + np.index_exp[index]]
+            parts.append(np.array(data))
+        if parts:
+            return np.concatenate(parts)
+        return np.empty(0)
+
+    def variable(self, name, start_id=None, stop_id=None):
+        """ Return the values of the variable with descriptor `name`. """
+        return self.column('cv', start_id, stop_id,
+                           index=self.descriptors.index(name))
+
+    def response(self, name, start_id=None, stop_id=None):
+        """ Return the values of response `name`. """
+        return self.column('fns', start_id, stop_id,
+                           index=self.responses.index(name))
+
+    def reduce(self, column, accumulator, start_id=None, stop_id=None,
+               index=None):
+        """
+        Feed `column` one chunk at a time into `accumulator`, which is
+        either an object with an ``extend`` method (such as
+        :class:`~dakota_driver.stats.RunningStats`) or a class to create
+        one with.  NaN values (inactive responses) are skipped.
+        """
+        if isinstance(accumulator, type):
+            accumulator = accumulator()
+        for data in self.iter_chunks(column, start_id, stop_id):
+            if index is not None:
+                data = data[(slice(None),) + np.index_exp[index]]
+            data = np.asarray(data).ravel()
+            accumulator.extend(data[~np.isnan(data)])
+        return accumulator
+
+    def _chunk_id_ranges(self):
+        """ Smallest and largest evaluation id in each chunk. """
+        if self._id_ranges is None:
+            ranges = []
+            for index in range(len(self.chunk_sizes)):
+                ids = self.chunk('eval_id', index)
+                ranges.append((int(ids.min()), int(ids.max())))
+            self._id_ranges = ranges
+        return self._id_ranges
@@ -0,0 +1,140 @@
+"""
+Columnar binary log of evaluations.
+
+Evaluations are written into preallocated in-memory chunks, each full chunk
+(or, every `flush_interval` seconds, the rows so far) is saved as one
+``.npy`` file per column, so a log can be loaded without parsing any text
+(see reader.py to memory-map it)::
+
+    <path>/meta.json
+    <path>/eval_id.00000.npy
+    <path>/cv.00000.npy
+    <path>/fns.00000.npy
+    <path>/status.00000.npy     (see failures.py)
+    <path>/fnGrads.00000.npy    (if gradients are recorded)
+
+``meta.json`` lists the columns and the number of rows in each chunk.  It is
+rewritten after every chunk, so a killed run leaves a readable log of all
+saved chunks, losing at most `flush_interval` seconds of evaluations.
+"""
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+__all__ = ['EvaluationRecorder', 'load_evaluations']
+
+_META = 'meta.json'
+
+
+def _chunk_file(path, column, chunk):
+    return os.path.join(path, '%s.%05d.npy' % (column, chunk))
+
+
+class EvaluationRecorder(object):
+    """
+    Records evaluations of `n_vars` continuous variables and `n_fns`
+    functions into the directory `path`, `chunk_size` rows per chunk.
+    Rows are also saved once `flush_interval` seconds (if not 0) have passed
+    since the last save.  Inactive function values are recorded as NaN.
+    """
+
+    def __init__(self, path, n_vars, n_fns, chunk_size=10000,
+                 gradients=False, descriptors=None, responses=None,
+                 flush_interval=0):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.columns = [('eval_id', 'int64', ()),
+                        ('cv', 'float64', (n_vars,)),
+                        ('fns', 'float64', (n_fns,)),
+                        ('status', 'int8', ())]
+        if gradients:
+            self.columns.append(('fnGrads', 'float64', (n_fns, n_vars)))
+        self.descriptors = list(descriptors or [])
+        self.responses = list(responses or [])
+        self.chunks = []
+        self._row = 0
+        self._flushed = time.time()
+        self._buffers = dict((name, np.empty((chunk_size,) + shape, dtype))
+                             for name, dtype, shape in self.columns)
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        for name in glob.glob(os.path.join(path, '*.npy')):
+            os.remove(name)
+        self._write_meta()
+
+    def __len__(self):
+        return sum(self.chunks) + self._row
+
+    def record(self, eval_id, cv, fns, fnGrads=None, status=0):
+        """ Record one evaluation, which ended with `status`. """
+        buffers = self._buffers
+        row = self._row
+        buffers['eval_id'][row] = eval_id
+        buffers['cv'][row] = cv
+        buffers['fns'][row] = fns
+        buffers['status'][row] = status
+        if 'fnGrads' in buffers:
+            grads = buffers['fnGrads'][row]
+            if fnGrads is None:
+                grads.fill(np.nan)
+            else:
+                grads[...] = fnGrads
+        self._row += 1
+        if self._row == self.chunk_size or \
+           (self.flush_interval and
+            time.time() - self._flushed >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """ Save the rows recorded since the last chunk as a new chunk. """
+        self._flushed = time.time()
+        if not self._row:
+            return
+        chunk = len(self.chunks)
+        for name, buf in self._buffers.items():
+            np.save(_chunk_file(self.path, name, chunk), buf[:self._row])
+        self.chunks.append(self._row)
+        self._row = 0
+        self._write_meta()
+
+    def close(self):
+        """ Save any remaining rows. """
+        self.flush()
+
+    def _write_meta(self):
+        meta = dict(columns=[dict(name=name, dtype=dtype, shape=list(shape))
+                             for name, dtype, shape in self.columns],
+                    chunks=self.chunks,
+                    descriptors=self.descriptors,
+                    responses=self.responses)
+        tmp = os.path.join(self.path, _META + '.tmp')
+        with open(tmp, 'w') as out:
+            json.dump(meta, out)
+        os.rename(tmp, os.path.join(self.path, _META))
+
+
+def load_evaluations(path):
+    """
+    Return a dictionary of the columns recorded in `path`, each column is
+    one array with a row per evaluation, read into memory.  For logs too
+    large for that, use the memory-mapped
+    :class:`~dakota_driver.reader.EvaluationHistory`.
+    """
+    with open(os.path.join(path, _META)) as inp:
+        meta = json.load(inp)
+
+    data = {}
+    for column in meta['columns']:
+        name = str(column['name'])
+        chunks = [np.load(_chunk_file(path, name, i))
+                  for i in range(len(meta['chunks']))]
+        if chunks:
+            data[name] = np.concatenate(chunks)
+        else:
+            data[name] = np.empty([0] + column['shape'], column['dtype'])
+    return data
@@ -0,0 +1,176 @@
+"""
+Registry of the variables given probability distributions.
+
+Each variable is a row of a table found by name through a dictionary.  The
+distribution of each row is a small integer code and its parameters a row
+of a float array (NaN where not given), so variables can be added in bulk
+and the DAKOTA variables blocks are generated in one pass per distribution.
+"""
+import collections
+
+import numpy as np
+
+__all__ = ['VariableRegistry', 'DISTRIBUTIONS']
+
+# parameter columns of the table
+PARAMETERS = ('mean', 'std_dev', 'alpha', 'beta',
+              'lower_bounds', 'upper_bounds')
+
+# distribution -> (DAKOTA keyword, ((parameter, DAKOTA keyword, required),)),
+# in the order DAKOTA orders uncertain variables
+DISTRIBUTIONS = collections.OrderedDict([
+    ('normal', ('normal_uncertain',
+                (('mean', 'means', True),
+                 ('std_dev', 'std_deviations', True),
+                 ('lower_bounds', 'lower_bounds', False),
+                 ('upper_bounds', 'upper_bounds', False)))),
+    ('lognormal', ('lognormal_uncertain',
+                   (('mean', 'means', True),
+                    ('std_dev', 'std_deviations', True)))),
+    ('exponential', ('exponential_uncertain',
+                     (('beta', 'betas', True),))),
+    ('beta', ('beta_uncertain',
+              (('alpha', 'alphas', True),
+               ('beta', 'betas', True),
+               ('lower_bounds', 'lower_bounds', True),
+               ('upper_bounds', 'upper_bounds', True)))),
+    ('gamma', ('gamma_uncertain',
+               (('alpha', 'alphas', True),
+                ('beta', 'betas', True)))),
+    ('weibull', ('weibull_uncertain',
+                 (('alpha', 'alphas', True),
+                  ('beta', 'betas', True)))),
+])
+
+_CODES = dict((name, code) for code, name in enumerate(DISTRIBUTIONS))
+_COLUMNS = dict((name, column) for column, name in enumerate(PARAMETERS))
+
+# fills optional bounds missing for some variables of a distribution
+_UNBOUNDED = {'lower_bounds': -np.finfo(float).max,
+              'upper_bounds': np.finfo(float).max}
+
+
+def _format(values):
+    return ' '.join(repr(value) for value in values.tolist())
+
+
+class VariableRegistry(object):
+    """ Table of variable names, distributions and distribution parameters. """
+
+    def __init__(self):
+        self.names = []
+        self._index = {}
+        self._codes = np.empty(0, dtype=np.int8)
+        self._values = np.empty((0, len(PARAMETERS)))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def add(self, name, dist, **parameters):
+        """
+        Add variable `name` with distribution `dist`, `parameters` are the
+        distribution's parameters (see :data:`DISTRIBUTIONS`).
+        """
+        self.add_many([name], dist, **parameters)
+
+    def add_many(self, names, dist, **parameters):
+        """
+        Add each of `names` with distribution `dist`.  Each of `parameters`
+        is either one value for all the variables or a sequence with a value
+        for each.
+        """
+        names = list(names)
+        if dist not in DISTRIBUTIONS:
+            raise ValueError(str(dist) + " is not a defined distribution")
+        for name in parameters:
+            if name not in _COLUMNS:
+                raise ValueError('%s is not a distribution parameter, use'
+                                 ' one of %s' % (name, PARAMETERS))
+        for param, keyword, required in DISTRIBUTIONS[dist][1]:
+            if required and parameters.get(param) is None:
+                raise ValueError("INCOMPLETE DEFINITION FOR VARIABLE %s"
+                                 % (names[0] if len(names) == 1 else names))
+        duplicates = [name for name in names if name in self._index]
+        if duplicates or len(set(names)) != len(names):
+            raise ValueError('%s already registered'
+                             % (duplicates or names))
+
+        start = len(self.names)
+        stop = start + len(names)
+        self._reserve(stop)
+        values = self._values[start:stop]
+        values.fill(np.nan)
+        for param, value in parameters.items():
+            if value is not None:
+                values[:, _COLUMNS[param]] = value
+        self._codes[start:stop] = _CODES[dist]
+        self.names.extend(names)
+        self._index.update(zip(names, range(start, stop)))
+
+    def _reserve(self, size):
+        """ Make room for `size` rows, growing the arrays geometrically. """
+        capacity = len(self._codes)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 16)
+        n_rows = len(self.names)
+        codes = np.empty(capacity, dtype=np.int8)
+        codes[:n_rows] = self._codes[:n_rows]
+        values = np.empty((capacity, len(PARAMETERS)))
+        values[:n_rows] = self._values[:n_rows]
+        self._codes = codes
+        self._values = values
+
+    def clear(self):
+        """ Remove all variables. """
+        self.__init__()
+
+    def distribution(self, name):
+        """ Return the distribution of variable `name`. """
+        return list(DISTRIBUTIONS)[self._codes[self._index[name]]]
+
+    def parameters(self, name):
+        """ Return the distribution parameters of variable `name`. """
+        row = self._values[self._index[name]]
+        return dict((param, row[column]) for param, column in
+                    _COLUMNS.items() if not np.isnan(row[column]))
+
+    def signature(self):
+        """ Hashable summary of the table's contents. """
+        n_rows = len(self.names)
+        return (tuple(self.names), self._codes[:n_rows].tobytes(),
+                self._values[:n_rows].tobytes())
+
+    def block_names(self):
+        """ Names in the order of :meth:`variables_block`. """
+        codes = self._codes[:len(self.names)]
+        return [self.names[row]
+                for row in np.argsort(codes, kind='mergesort').tolist()]
+
+    def variables_block(self):
+        """ Return the lines of the uncertain variables specification. """
+        lines = []
+        codes = self._codes[:len(self.names)]
+        for code, dist in enumerate(DISTRIBUTIONS):
+            rows = np.flatnonzero(codes == code)
+            if not len(rows):
+                continue
+            keyword, params = DISTRIBUTIONS[dist]
+            lines.append('%s = %d' % (keyword, len(rows)))
+            for param, param_keyword, required in params:
+                values = self._values[rows, _COLUMNS[param]]
+                missing = np.isnan(values)
+                if missing.all():
+                    continue
+                if missing.any():
+                    values = np.where(missing, _UNBOUNDED[param], values)
+                lines.append('  %s = %s' % (param_keyword, _format(values)))
+            lines.append('  descriptors = %s'
+                         % ' '.join("'%s'" % self.names[row] for row in rows))
+        return lines
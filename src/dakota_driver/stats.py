@@ -0,0 +1,145 @@
+"""
+Streaming statistics of responses, updated one evaluation at a time.
+
+Mean and variance use Welford's algorithm, percentiles are estimated with
+the P-square algorithm of Jain and Chlamtac, so memory use doesn't grow
+with the number of samples.
+"""
+import collections
+import math
+
+__all__ = ['RunningStats', 'P2Quantile']
+
+
+class P2Quantile(object):
+    """ P-square estimate of the `p` quantile (0 < `p` < 1). """
+
+    def __init__(self, p):
+        self.p = p
+        self.count = 0
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1., 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.]
+        self._increments = [0., p / 2., p, (1 + p) / 2., 1.]
+
+    def add(self, x):
+        """ Add an observation. """
+        self.count += 1
+        q = self._heights
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        n = self._positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired = self._desired
+        for i in range(5):
+            desired[i] += self._increments[i]
+
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or \
+               (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / float(n[i + 1] - n[i - 1]) * \
+                    ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i])
+                     / float(n[i + 1] - n[i]) +
+                     (n[i + 1] - n[i] - d) * (q[i] - q[i - 1])
+                     / float(n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) \
+                                    / float(n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    @property
+    def value(self):
+        """ Current estimate, exact while there are five or fewer values. """
+        q = self._heights
+        if not q:
+            return float('nan')
+        if self.count > 5:
+            return q[2]
+        # linear interpolation, as numpy.percentile
+        pos = self.p * (len(q) - 1)
+        lo = int(math.floor(pos))
+        hi = min(lo + 1, len(q) - 1)
+        return q[lo] + (q[hi] - q[lo]) * (pos - lo)
+
+
+class RunningStats(object):
+    """
+    Count, mean, variance, min, max and percentiles of a stream of values.
+    `percentiles` are given in percent, as for :func:`numpy.percentile`.
+    """
+
+    def __init__(self, percentiles=(5., 50., 95.)):
+        self.count = 0
+        self.mean = 0.
+        self.min = float('inf')
+        self.max = float('-inf')
+        self._m2 = 0.
+        self._quantiles = collections.OrderedDict(
+            (p, P2Quantile(p / 100.)) for p in percentiles)
+
+    def add(self, value):
+        """ Add a value. """
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        for quantile in self._quantiles.values():
+            quantile.add(value)
+
+    def extend(self, values):
+        """ Add each of `values`. """
+        for value in values:
+            self.add(value)
+
+    @property
+    def variance(self):
+        """ Sample variance. """
+        if self.count < 2:
+            return float('nan')
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std_dev(self):
+        """ Sample standard deviation. """
+        return math.sqrt(self.variance)
+
+    def percentile(self, p):
+        """ Estimate of the `p` percentile, `p` must be one being tracked. """
+        try:
+            return self._quantiles[p].value
+        except KeyError:
+            raise KeyError('percentile %s is not tracked, use one of %s'
+                           % (p, list(self._quantiles)))
+
+    @property
+    def percentiles(self):
+        """ Dictionary of percentile estimates. """
+        return collections.OrderedDict((p, q.value)
+                                       for p, q in self._quantiles.items())
+
+    def __repr__(self):
+        return 'RunningStats(count=%d, mean=%g, std_dev=%g, min=%g, max=%g)' \
+               % (self.count, self.mean, self.std_dev if self.count > 1
+                  else float('nan'), self.min, self.max)
@@ -0,0 +1,90 @@
+""" Test the evaluation cache. """
+
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from dakota_driver.cache import EvaluationCache
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`EvaluationCache`. """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'driver.cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_hits(self):
+        cache = EvaluationCache()
+        self.assertEqual(cache.get([1., 2.], [1]), None)
+        cache.put([1., 2.], [1], [3.], [])
+        self.assertEqual(cache.get([1., 2. + 1e-14], [1]), ([3.], []))
+        self.assertEqual(cache.get([1., 2.], [3]), None)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_lru(self):
+        cache = EvaluationCache(max_size=2)
+        cache.put([1.], [1], [1.], [])
+        cache.put([2.], [1], [2.], [])
+        cache.get([1.], [1])
+        cache.put([3.], [1], [3.], [])
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get([2.], [1]), None)
+        self.assertEqual(cache.get([1.], [1]), ([1.], []))
+
+    def test_context(self):
+        cache = EvaluationCache()
+        cache.put([1.], [1], [1.], [])
+        cache.context = b'other'
+        self.assertEqual(cache.get([1.], [1]), None)
+        cache.put([1.], [1], [2.], [])
+        cache.context = b''
+        self.assertEqual(cache.get([1.], [1]), ([1.], []))
+
+    def test_seed(self):
+        cache = EvaluationCache()
+        cache.seed([0.1234567891], [1], [1.], [], 10)
+        self.assertEqual(cache.get([0.12345678912345], [1]), ([1.], []))
+        self.assertEqual(cache.get([0.1234567901], [1]), None)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertRaises(ValueError, cache.seed, [1.], [1], [1.], [], 6)
+
+        # seeded hits are cached within max_size
+        cache = EvaluationCache(max_size=2)
+        for i in range(3):
+            cache.seed([float(i)], [1], [1.], [], 10)
+            cache.get([float(i)], [1])
+        self.assertEqual(len(cache), 2)
+
+    def test_journal(self):
+        cache = EvaluationCache(self.path, max_size=3)
+        for i in range(10):
+            cache.put([float(i)], [1], [i * 2.], [])
+        cache.close()
+
+        # Simulate a run killed while writing a record.
+        with open(self.path, 'ab') as out:
+            out.write(b'\x80\x02')
+
+        cache = EvaluationCache(self.path, max_size=3)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.get([9.], [1]), ([18.], []))
+        self.assertEqual(cache.get([0.], [1]), None)
+        cache.close()
+        cache.open()
+        cache.put([10.], [1], [20.], [])
+        cache.close()
+
+        # Records written after the truncated one are read back.
+        cache = EvaluationCache(self.path, max_size=3)
+        self.assertEqual(cache.get([10.], [1]), ([20.], []))
+        self.assertEqual(cache.get([9.], [1]), ([18.], []))
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
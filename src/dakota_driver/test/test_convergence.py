@@ -0,0 +1,60 @@
+""" Test the convergence of running statistics. """
+
+import math
+import unittest
+
+import numpy as np
+
+from dakota_driver.convergence import ConvergenceMonitor, \
+                                      confidence_interval, normal_quantile
+from dakota_driver.stats import RunningStats
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`ConvergenceMonitor`. """
+
+    def test_quantile(self):
+        self.assertAlmostEqual(normal_quantile(0.975), 1.959964, 5)
+        self.assertAlmostEqual(normal_quantile(0.5), 0., 10)
+        self.assertAlmostEqual(normal_quantile(0.05), -1.644854, 5)
+
+    def test_intervals(self):
+        values = np.random.RandomState(3).normal(2., 0.5, 10000)
+        stats = RunningStats((50.,))
+        stats.extend(values)
+        estimate, half_width = confidence_interval(stats, 'mean', 0.95)
+        self.assertAlmostEqual(estimate, values.mean(), 10)
+        self.assertAlmostEqual(half_width,
+                               1.959964 * values.std(ddof=1) / 100., 5)
+        estimate, half_width = confidence_interval(stats, 'std_dev')
+        self.assertTrue(abs(estimate - 0.5) < half_width)
+        half_width = confidence_interval(stats, 50.)[1]
+        self.assertAlmostEqual(half_width, 1.959964 * values.std(ddof=1) / 100.
+                               * math.sqrt(math.pi / 2.), 5)
+        self.assertRaises(KeyError, confidence_interval, stats, 95.)
+
+    def test_converged(self):
+        monitor = ConvergenceMonitor(('mean', 'std_dev'), rtol=0.05)
+        results = dict(f=RunningStats(), g=RunningStats())
+        self.assertFalse(monitor.converged(results))
+        rng = np.random.RandomState(1)
+        results['f'].extend(rng.normal(10., 1., 100))
+        results['g'].extend([3.] * 100)
+        self.assertFalse(monitor.converged(results))
+        results['f'].extend(rng.normal(10., 1., 2000))
+        self.assertTrue(monitor.converged(results))
+        self.assertEqual(monitor.intervals(results)['g']['mean'], (3., 0.))
+
+    def test_min_samples(self):
+        # Identical early samples don't count as converged.
+        monitor = ConvergenceMonitor(rtol=0.05, min_samples=10)
+        results = dict(f=RunningStats())
+        results['f'].extend([1.] * 9)
+        self.assertEqual(monitor.intervals(results)['f']['mean'], (1., 0.))
+        self.assertFalse(monitor.converged(results))
+        results['f'].extend([1.])
+        self.assertTrue(monitor.converged(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,15 +5,24 @@ import glob
 import logging
 import nose
 import os.path
+import shutil
+import subprocess
 import sys
+import tempfile
 import unittest
 
+import numpy as np
+
 from openmdao.main.api import Component, Assembly, set_as_top
 from openmdao.main.datatypes.api import Array, Float
 from openmdao.util.testutil import assert_rel_error, assert_raises
 
 from dakota_driver import DakotaCONMIN, DakotaMultidimStudy, \
                           DakotaVectorStudy, DakotaGlobalSAStudy
+from dakota_driver.driver import pydakdriver
+from dakota_driver.pool import EvaluationPool
+from dakota_driver.population import PopulationPool
+from dakota_driver.reader import EvaluationHistory
 
 
 class Rosenbrock(Component):
@@ -53,6 +62,39 @@ class Broken(Component):
         raise RuntimeError('Evaluating x1=%s, x2=%s' % (self.x1, self.x2))
 
 
+class VectorTextbook(Component):
+    """ DAKOTA 'text_book' function of arrays of points. """
+
+    vectorized = True
+
+    x1 = Array(np.zeros(1), iotype='in')
+    x2 = Array(np.zeros(1), iotype='in')
+    f  = Array(np.zeros(1), iotype='out')
+
+    def execute(self):
+        """ Evaluate every point at once. """
+        self.f = (self.x1 - 1)**4 + (self.x2 - 1)**4
+
+
+class Counter(Component):
+    """ Counts executions, can be told to fail after some of them. """
+
+    x1 = Float(iotype='in')
+    x2 = Float(iotype='in')
+    f  = Float(iotype='out')
+
+    executions = 0
+    fail_after = None
+
+    def execute(self):
+        """ Evaluate 'text_book', failing if told to. """
+        if Counter.fail_after is not None and \
+           Counter.executions >= Counter.fail_after:
+            raise RuntimeError('Interrupted')
+        Counter.executions += 1
+        self.f = (self.x1 - 1)**4 + (self.x2 - 1)**4
+
+
 class Optimization(Assembly):
     """ Use DAKOTA to perform an optimization. """
 
@@ -155,13 +197,37 @@ class SensitivityStudy(Assembly):
         driver.add_objective('rosenbrock.f')
 
 
+class HotStartStudy(Assembly):
+    """ Use DAKOTA to run a restartable sampling study. """
+
+    def configure(self):
+        """ Configure driver and its workflow. """
+        super(Assembly, self).configure()
+        self.add('counter', Counter())
+
+        driver = pydakdriver(name='hotstart')
+        driver.add_method('sampling',
+                          method_options={'samples': 20, 'sample_type': 'lhs',
+                                          'seed': 52983})
+        driver = self.add('driver', driver)
+        driver.workflow.add('counter')
+        driver.stdout = 'dakota.out'
+        driver.stderr = 'dakota.err'
+        driver.dakota_hotstart = True
+
+        driver.add_parameter('counter.x1', low=-2, high=2)
+        driver.add_parameter('counter.x2', low=-2, high=2)
+        driver.add_objective('counter.f')
+
+
 class TestCase(unittest.TestCase):
     """ Test DAKOTA-based drivers. """
 
     def tearDown(self):
         """ Cleanup files. """
-        for pattern in ('LHS*', 'S4', 'dakota.out', 'dakota.err',
-                        'dakota.rst', 'dakota_tabular.dat', 'driver.in'):
+        for pattern in ('LHS*', 'S4', 'dakota.out*', 'dakota.err*',
+                        'dakota.rst', 'dakota_tabular.dat*', 'driver.in',
+                        'hotstart*'):
             for name in glob.glob(pattern):
                 try:
                     os.remove(name)
@@ -294,6 +360,34 @@ class TestCase(unittest.TestCase):
                 count += 1
         self.assertEqual(count, 101)
 
+    def test_hotstart(self):
+        # Test rerunning an interrupted study with dakota_hotstart.
+        logging.debug('')
+        logging.debug('test_hotstart')
+
+        Counter.executions = 0
+        Counter.fail_after = 8
+        top = set_as_top(HotStartStudy())
+        try:
+            top.run()
+        except RuntimeError as exc:
+            self.assertTrue('Interrupted' in str(exc))
+        else:
+            self.fail('Expected RuntimeError')
+        self.assertEqual(Counter.executions, 8)
+
+        # Only the 12 unfinished samples should be evaluated.
+        Counter.fail_after = None
+        top = set_as_top(HotStartStudy())
+        top.run()
+        self.assertEqual(Counter.executions, 20)
+
+        # Nothing is left to do.
+        top = set_as_top(HotStartStudy())
+        top.run()
+        self.assertEqual(Counter.executions, 20)
+        self.assertEqual(top.driver.cache.misses, 0)
+
     def test_errors(self):
         # Test base error responses.
         logging.debug('')
@@ -309,6 +403,474 @@ class TestCase(unittest.TestCase):
         assert_raises(self, 'top.run()', globals(), locals(), ValueError,
                       'driver: No parameters, run aborted')
 
+    def test_array_parameter(self):
+        # Array parameters are one DAKOTA variable per element.
+        logging.debug('')
+        logging.debug('test_array_parameter')
+
+        top = set_as_top(Assembly())
+        top.add('rosenbrock', Rosenbrock())
+        driver = top.add('driver', pydakdriver(name='test_array_parameter'))
+        driver.workflow.add('rosenbrock')
+        driver.add_method('conmin_frcg')
+        driver.add_parameter('rosenbrock.x', low=-2, high=2, start=(-1.2, 1))
+        driver.add_objective('rosenbrock.f')
+        driver.configure_input()
+
+        variables = '\n'.join(driver._dakota_input.variables)
+        self.assertTrue('continuous_design = 2' in variables)
+        self.assertTrue("'rosenbrock.x[0]' 'rosenbrock.x[1]'" in variables)
+        self.assertTrue('initial_point -1.2 1.0' in variables)
+
+        driver._set_cv(np.array([0.5, 0.25]))
+        self.assertEqual(list(top.rosenbrock.x), [0.5, 0.25])
+
+    def test_gather_plan(self):
+        # Responses are gathered into a preallocated buffer.
+        logging.debug('')
+        logging.debug('test_gather_plan')
+
+        top = set_as_top(Assembly())
+        top.add('textbook', Textbook())
+        driver = top.add('driver', pydakdriver(name='test_gather_plan'))
+        driver.workflow.add('textbook')
+        driver.add_method('sampling', method_options={'samples': 10})
+        driver.add_parameter('textbook.x1', low=-2, high=2)
+        driver.add_parameter('textbook.x2', low=-2, high=2)
+        driver.add_objective('textbook.f')
+        driver.add_objective('textbook.x1 + textbook.x2')
+        driver.configure_input()
+        driver._reset_results()
+        driver._open_run(False)
+        try:
+            plan = driver._gather
+            retval = driver.dakota_callback(cv=np.array([2., 0.]),
+                                            asv=np.array([1, 1]))
+            self.assertEqual(list(retval['fns']), [2., 2.])
+            retval = driver.dakota_callback(cv=np.array([0., 0.]),
+                                            asv=np.array([0, 1]))
+            self.assertEqual(list(retval['fns']), [0.])
+            self.assertTrue(driver._gather is plan)
+        finally:
+            driver._close_run()
+        self.assertTrue(driver._gather is None)
+
+    def test_evaluation_failure(self):
+        # Failed evaluations are retried, then answered with NaN.
+        logging.debug('')
+        logging.debug('test_evaluation_failure')
+
+        Counter.executions = 0
+        Counter.fail_after = 0
+        top = set_as_top(Assembly())
+        top.add('counter', Counter())
+        driver = top.add('driver',
+                         pydakdriver(name='test_evaluation_failure'))
+        driver.workflow.add('counter')
+        driver.add_method('sampling', method_options={'samples': 10})
+        driver.add_parameter('counter.x1', low=-2, high=2)
+        driver.add_parameter('counter.x2', low=-2, high=2)
+        driver.add_objective('counter.f')
+        driver.evaluation_failure = 'fail'
+        driver.evaluation_retries = 1
+        driver.configure_input()
+        driver._reset_results()
+        driver._open_run(False)
+        try:
+            retval = driver.dakota_callback(cv=np.array([2., 0.]),
+                                            asv=np.array([1]))
+            self.assertTrue(np.isnan(retval['fns']).all())
+            self.assertEqual(retval['failure'], 1)
+
+            Counter.fail_after = None
+            retval = driver.dakota_callback(cv=np.array([2., 0.]),
+                                            asv=np.array([1]))
+            self.assertEqual(list(retval['fns']), [2.])
+            self.assertFalse('failure' in retval)
+        finally:
+            driver._close_run()
+            Counter.fail_after = None
+        self.assertEqual(driver.results['counter.f'].count, 1)
+
+        driver.evaluation_failure = 'ignore'
+        assert_raises(self, 'top.run()', globals(), locals(), ValueError,
+                      "driver: evaluation_failure must be 'abort', 'nan'"
+                      " or 'fail'")
+
+    def test_unique_paths(self):
+        # Each run writes files of its own.
+        logging.debug('')
+        logging.debug('test_unique_paths')
+
+        cwd = os.getcwd()
+        top = set_as_top(SensitivityStudy())
+        top.driver.unique_paths = True
+        top.driver.workdir_cleanup = 'keep'
+        top.run()
+        first = top.driver.run_id
+        top.run()
+        self.assertNotEqual(top.driver.run_id, first)
+        self.assertEqual(os.getcwd(), cwd)
+        for run_id in (first, top.driver.run_id):
+            self.assertTrue(os.path.exists('dakota.out.' + run_id))
+            self.assertTrue(os.path.exists('dakota_tabular.dat.' + run_id))
+            # DAKOTA ran in a directory of its own, holding its restart file
+            self.assertTrue(os.path.exists(os.path.join('dakota.' + run_id,
+                                                        'dakota.rst')))
+            shutil.rmtree('dakota.' + run_id)
+        self.assertFalse(os.path.exists('dakota.out'))
+
+        # by default they are removed after their run
+        top.driver.workdir_cleanup = 'always'
+        top.run()
+        self.assertFalse(os.path.exists('dakota.' + top.driver.run_id))
+
+    def test_batch_callback(self):
+        # A block of evaluations with different active set vectors.
+        logging.debug('')
+        logging.debug('test_batch_callback')
+
+        Counter.executions = 0
+        Counter.fail_after = None
+        top = set_as_top(Assembly())
+        top.add('counter', Counter())
+        driver = top.add('driver', pydakdriver(name='test_batch_callback'))
+        driver.workflow.add('counter')
+        driver.add_method('sampling', method_options={'samples': 10})
+        driver.add_parameter('counter.x1', low=-2, high=2)
+        driver.add_parameter('counter.x2', low=-2, high=2)
+        driver.add_objective('counter.f')
+        driver.add_objective('counter.x1 + counter.x2')
+        driver.evaluation_failure = 'fail'
+        driver.configure_input()
+        driver._reset_results()
+        driver._open_run(False)
+        try:
+            retval = driver.dakota_callback(
+                cv=np.array([[1., 1.], [2., 0.], [0., 1.]]),
+                asv=np.array([[0, 1], [1, 1], [1, 0]]), currEvalId=[2, 1, 3])
+            self.assertEqual(list(retval['currEvalId']), [1, 2, 3])
+            self.assertEqual(retval['fns'].shape, (3, 2))
+            self.assertEqual(retval['fns'].tolist(),
+                             [[2., 2.], [0., 2.], [1., 0.]])
+            self.assertFalse('failure' in retval)
+
+            Counter.fail_after = Counter.executions + 1
+            retval = driver.dakota_callback(
+                cv=np.array([[1., 1.], [2., 0.]]),
+                asv=np.array([[1, 1], [1, 0]]), currEvalId=[4, 5])
+            self.assertEqual(retval['fns'][0].tolist(), [0., 2.])
+            self.assertTrue(np.isnan(retval['fns'][1, 0]))
+            self.assertEqual(list(retval['failure']), [0, 1])
+        finally:
+            driver._close_run()
+            Counter.fail_after = None
+        self.assertEqual(driver.results['counter.f'].count, 3)
+
+    def test_vectorized_callback(self):
+        # Vectorized workflows evaluate a block in one run.
+        logging.debug('')
+        logging.debug('test_vectorized_callback')
+
+        top = set_as_top(Assembly())
+        top.add('textbook', VectorTextbook())
+        driver = top.add('driver',
+                         pydakdriver(name='test_vectorized_callback'))
+        driver.workflow.add('textbook')
+        driver.add_method('sampling', method_options={'samples': 10})
+        driver.add_parameter('textbook.x1', low=-2, high=2)
+        driver.add_parameter('textbook.x2', low=-2, high=2)
+        driver.add_objective('textbook.f')
+        driver.configure_input()
+        self.assertTrue(driver._vectorized_workflow())
+        driver._reset_results()
+        driver._open_run(False)
+        try:
+            retval = driver.dakota_callback(
+                cv=np.array([[2., 0.], [1., 1.], [0., 1.]]),
+                asv=np.ones((3, 1), dtype=int), currEvalId=[3, 1, 2])
+        finally:
+            driver._close_run()
+        self.assertEqual(list(retval['currEvalId']), [1, 2, 3])
+        self.assertEqual(retval['fns'].tolist(), [[0.], [1.], [2.]])
+        self.assertEqual(driver.results['textbook.f'].count, 3)
+
+    def test_uq_pool(self):
+        # UQ() sampling studies evaluate their blocks on the process pool.
+        logging.debug('')
+        logging.debug('test_uq_pool')
+
+        top = set_as_top(Assembly())
+        top.add('textbook', Textbook())
+        driver = top.add('driver', pydakdriver(name='test_uq_pool'))
+        driver.workflow.add('textbook')
+        driver.UQ()
+        driver.add_parameter('textbook.x1', low=-2, high=2)
+        driver.add_parameter('textbook.x2', low=-2, high=2)
+        driver.add_objective('textbook.f')
+        driver.evaluation_concurrency = 2
+        driver.configure_input()
+        self.assertTrue(driver._independent_evaluations())
+        self.assertTrue('num_response_functions  1'
+                        in driver._dakota_input.responses)
+
+        driver._reset_results()
+        driver._open_run(True)
+        rows = []
+        try:
+            self.assertTrue(isinstance(driver._pool, EvaluationPool))
+            pool_map = driver._pool.map
+            def counting_map(cvs, asvs):
+                rows.append(len(cvs))
+                return pool_map(cvs, asvs)
+            driver._pool.map = counting_map
+            retval = driver.dakota_callback(
+                cv=np.array([[2., 0.], [1., 1.]]),
+                asv=np.ones((2, 1), dtype=int))
+        finally:
+            driver._close_run()
+        self.assertEqual(rows, [2])
+        self.assertEqual(retval['fns'].tolist(), [[2.], [0.]])
+
+        # or in a process forked for each evaluation
+        driver.evaluation_processes = 'population'
+        driver._reset_results()
+        driver._open_run(True)
+        try:
+            self.assertTrue(isinstance(driver._pool, PopulationPool))
+            retval = driver.dakota_callback(
+                cv=np.array([[2., 0.], [1., 1.]]),
+                asv=np.ones((2, 1), dtype=int))
+        finally:
+            driver._close_run()
+        self.assertEqual(retval['fns'].tolist(), [[2.], [0.]])
+
+    def test_cache_context(self):
+        # Cached results are not reused once other inputs have changed.
+        logging.debug('')
+        logging.debug('test_cache_context')
+
+        top = set_as_top(Assembly())
+        top.add('x2', Float(1., iotype='in'))
+        top.add('textbook', Textbook())
+        top.connect('x2', 'textbook.x2')
+        driver = top.add('driver', pydakdriver(name='test_cache_context'))
+        driver.workflow.add('textbook')
+        driver.add_method('sampling', method_options={'samples': 10})
+        driver.add_parameter('textbook.x1', low=-2, high=2)
+        driver.add_objective('textbook.f')
+        driver.evaluation_cache = True
+        driver.configure_input()
+
+        values = []
+        for x2 in (1., 1., 0.):
+            top.x2 = x2
+            driver._reset_results()
+            driver._open_run(False)
+            try:
+                retval = driver.dakota_callback(cv=np.array([2.]), asv=[1])
+            finally:
+                driver._close_run()
+            values.append(retval['fns'][0])
+        self.assertEqual(values, [1., 1., 2.])
+        self.assertEqual(driver.cache.hits, 1)
+
+    def test_replay_restart(self):
+        # Restart file evaluations are found at tabular precision.
+        logging.debug('')
+        logging.debug('test_replay_restart')
+
+        tempdir = tempfile.mkdtemp()
+        util = os.path.join(tempdir, 'dakota_restart_util')
+        with open(util, 'w') as out:
+            out.write('#!/bin/sh\n'
+                      'echo "%eval_id interface x1 x2 f" > "$3"\n'
+                      'echo "1 NO_ID 0.1234567891 1 42" >> "$3"\n')
+        os.chmod(util, 0o755)
+        restart_file = os.path.join(tempdir, 'dakota.rst')
+        open(restart_file, 'w').close()
+        path = os.environ.get('PATH', '')
+        os.environ['PATH'] = os.pathsep.join((tempdir, path))
+        try:
+            top = set_as_top(Assembly())
+            top.add('textbook', Textbook())
+            driver = top.add('driver',
+                             pydakdriver(name='test_replay_restart'))
+            driver.workflow.add('textbook')
+            driver.add_method('sampling', method_options={'samples': 10})
+            driver.add_parameter('textbook.x1', low=-2, high=2)
+            driver.add_parameter('textbook.x2', low=-2, high=2)
+            driver.add_objective('textbook.f')
+            driver.dakota_hotstart = True
+            driver.restart_file = restart_file
+            driver.cache_file = os.path.join(tempdir, 'driver.cache')
+            driver.configure_input()
+            driver._reset_results()
+            driver._open_run(False)
+            try:
+                retval = driver.dakota_callback(
+                    cv=np.array([0.12345678912345, 1.]), asv=[1])
+            finally:
+                driver._close_run()
+                driver.cache.close()
+        finally:
+            os.environ['PATH'] = path
+            shutil.rmtree(tempdir)
+        self.assertEqual(list(retval['fns']), [42.])
+        self.assertEqual(driver.cache.hits, 1)
+
+    def test_evaluation_log_layout(self):
+        # The log's variables are named in cv order, array elements apart.
+        logging.debug('')
+        logging.debug('test_evaluation_log_layout')
+
+        tempdir = tempfile.mkdtemp()
+        try:
+            top = set_as_top(Assembly())
+            top.add('rosenbrock', Rosenbrock())
+            top.add('textbook', Textbook())
+            driver = top.add('driver',
+                             pydakdriver(name='test_evaluation_log_layout'))
+            driver.workflow.add(['rosenbrock', 'textbook'])
+            driver.add_method('sampling', method_options={'samples': 10},
+                              response_type='r')
+            driver.add_parameter('rosenbrock.x', low=-2, high=2)
+            driver.add_special_distribution('textbook.x1', 'normal',
+                                            mean=0., std_dev=1.)
+            driver.add_objective('rosenbrock.f')
+            driver.evaluation_log = os.path.join(tempdir, 'log')
+            driver.configure_input()
+            driver._reset_results()
+            driver._open_run(False)
+            try:
+                driver.dakota_callback(cv=np.array([0.5, 1., 2.]), asv=[1])
+            finally:
+                driver._close_run()
+
+            history = EvaluationHistory(driver.evaluation_log)
+            self.assertEqual(history.descriptors,
+                             ['textbook.x1', 'rosenbrock.x[0]',
+                              'rosenbrock.x[1]'])
+            self.assertEqual(history.variable('textbook.x1').tolist(), [0.5])
+            self.assertEqual(history.variable('rosenbrock.x[1]').tolist(),
+                             [2.])
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_array_results(self):
+        # Each element of an array response has statistics of its own.
+        logging.debug('')
+        logging.debug('test_array_results')
+
+        top = set_as_top(Assembly())
+        top.add('rosenbrock', Rosenbrock())
+        driver = top.add('driver', pydakdriver(name='test_array_results'))
+        driver.workflow.add('rosenbrock')
+        driver.add_method('conmin_frcg')
+        driver.add_parameter('rosenbrock.x', low=-2, high=2)
+        driver.add_objective('rosenbrock.f')
+        driver.add_constraint('rosenbrock.x <= 1', name='c')
+        driver.add_constraint('rosenbrock.f <= 100', name='d')
+        driver.configure_input()
+        driver._reset_results()
+        self.assertEqual(list(driver.results),
+                         ['rosenbrock.f', 'c[0]', 'c[1]', 'd'])
+        driver._open_run(False)
+        try:
+            driver.dakota_callback(cv=np.array([1., 1.]), asv=[1, 0, 1, 1])
+        finally:
+            driver._close_run()
+        self.assertEqual([stats.count for stats in driver.results.values()],
+                         [1, 0, 1, 1])
+        self.assertEqual(driver.results['d'].mean, -100.)
+
+    def test_fd_evaluate(self):
+        # Driver-side derivatives of the whole stencil at once.
+        logging.debug('')
+        logging.debug('test_fd_evaluate')
+
+        top = set_as_top(Assembly())
+        top.add('textbook', Textbook())
+        driver = top.add('driver', pydakdriver(name='test_fd_evaluate'))
+        driver.workflow.add('textbook')
+        driver.add_method('conmin_frcg', gradients='numerical')
+        driver.add_parameter('textbook.x1', low=-2, high=2)
+        driver.add_parameter('textbook.x2', low=-2, high=2)
+        driver.add_objective('textbook.f')
+        driver.fd_gradients = True
+        driver.interval_type = 'central'
+        driver.configure_input()
+        driver._reset_results()
+        driver._open_run(False)
+        try:
+            fns, fnGrads, fnHessians = \
+                driver._fd_evaluate(np.array([2., 0.]), np.array([7]))
+            # Hessians are differenced even without fd_hessians
+            retval = driver.dakota_callback(cv=np.array([0., 2.]),
+                                            asv=[4])
+        finally:
+            driver._close_run()
+        self.assertEqual(fns, [2.])
+        # d/dx = 4 (x - 1)**3, d2/dx2 = 12 (x - 1)**2
+        np.testing.assert_allclose(fnGrads, [[4., -4.]], rtol=1e-6)
+        np.testing.assert_allclose(fnHessians, [[[12., 0.], [0., 12.]]],
+                                   atol=1e-4)
+        np.testing.assert_allclose(retval['fnHessians'],
+                                   [[[12., 0.], [0., 12.]]], atol=1e-4)
+
+    def test_mean_mapping(self):
+        # Nested models can map design variables onto uncertain means.
+        logging.debug('')
+        logging.debug('test_mean_mapping')
+
+        top = set_as_top(Assembly())
+        top.add('textbook', Textbook())
+        driver = top.add('driver', pydakdriver(name='test_mean_mapping'))
+        driver.workflow.add('textbook')
+        driver.add_method('conmin_frcg', model='nested',
+                          model_options={'secondary_variable_mapping': ''})
+        driver.add_method('sampling', method_options={'samples': 10},
+                          response_type='r')
+        driver.add_parameter('textbook.x1', low=-2, high=2)
+        driver.add_special_distribution('textbook.x2', 'normal',
+                                        mean=0.1, std_dev=0.5)
+        driver.add_objective('textbook.f')
+        driver.configure_input()
+
+        model = '\n'.join(driver._dakota_input.model)
+        self.assertTrue("primary_variable_mapping 'textbook.x1' 'textbook.x2'"
+                        in model)
+        self.assertTrue("secondary_variable_mapping '' 'mean'" in model)
+        variables = '\n'.join(driver._dakota_input.variables)
+        self.assertTrue('continuous_design = 2' in variables)
+        # evaluations get the inner block's variables
+        self.assertEqual(driver._evaluated_layout.descriptors(),
+                         ['textbook.x2', 'textbook.x1'])
+
+    def test_sampling_method(self):
+        # Adaptive sampling batches set samples and seed.
+        method = ["id_method  'meth1'", 'sampling  ', 'samples  5000',
+                  'sample_type  random']
+        self.assertEqual(pydakdriver._sampling_method(method, 100, 7),
+                         ["id_method  'meth1'", 'sampling  ', 'seed  7',
+                          'samples  100', 'sample_type  random'])
+        assert_raises(self, "pydakdriver._sampling_method(['conmin_frcg'],"
+                      " 100, 7)", globals(), locals(), ValueError,
+                      'adaptive_sampling needs a single sampling method')
+        self.assertEqual(pydakdriver._method_option(method, 'samples', int),
+                         5000)
+        self.assertEqual(pydakdriver._method_option(method, 'seed', int, 3),
+                         3)
+
+    def test_lazy_import(self):
+        # Importing or building a driver mustn't start MPI or load pyDAKOTA.
+        code = 'import sys, dakota_driver.driver; ' \
+               'driver = dakota_driver.driver.pydakdriver(); ' \
+               'driver.add_method("sampling"); ' \
+               'print([m for m in ("mpi4py", "dakota") if m in sys.modules])'
+        out = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(out.decode().strip(), '[]')
+
 
 if __name__ == '__main__':
     sys.argv.append('--cover-package=dakota_driver')
@@ -0,0 +1,56 @@
+""" Test the handling of failed evaluations. """
+
+import os
+import time
+import unittest
+
+import numpy as np
+
+from dakota_driver.failures import OK, TIMED_OUT, EvaluationTimeout, \
+                                   time_limit
+from dakota_driver.pool import EvaluationPool
+
+
+class Sleeper(object):
+    """ Stands in for a driver, sleeps `cv[0]` seconds per evaluation. """
+
+    def _pool_task(self, cv, asv):
+        time.sleep(cv[0])
+        return np.array([cv[0]]), [], OK
+
+
+class TestCase(unittest.TestCase):
+    """ Test :func:`time_limit` and the pool's hung worker check. """
+
+    def test_time_limit(self):
+        with time_limit(0):
+            pass
+        with time_limit(1.):
+            pass
+        try:
+            with time_limit(0.05):
+                while True:
+                    pass
+        except EvaluationTimeout:
+            pass
+        else:
+            self.fail('Expected EvaluationTimeout')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_hung_worker(self):
+        pool = EvaluationPool(Sleeper(), 2, timeout=0.1, grace=0.2)
+        try:
+            cvs = np.array([[0.], [60.], [0.]])
+            results = pool.map(cvs, np.ones((3, 1), dtype=int))
+            self.assertEqual([status for fns, grads, status in results],
+                             [OK, TIMED_OUT, OK])
+            # the killed worker is replaced
+            results = pool.map(cvs[[0, 2]], np.ones((2, 1), dtype=int))
+            self.assertEqual([status for fns, grads, status in results],
+                             [OK, OK])
+        finally:
+            pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
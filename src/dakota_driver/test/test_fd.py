@@ -0,0 +1,68 @@
+""" Test the finite difference stencils. """
+
+import unittest
+
+import numpy as np
+
+from dakota_driver.fd import FiniteDifference
+
+
+def _functions(points):
+    """ f1 = x0**2 + 3*x1, f2 = x0*x1 at each row of `points`. """
+    points = np.atleast_2d(points)
+    return np.column_stack((points[:, 0] ** 2 + 3 * points[:, 1],
+                            points[:, 0] * points[:, 1]))
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`FiniteDifference`. """
+
+    x = np.array([2., -0.5])
+    exact = np.array([[4., 3.], [-0.5, 2.]])
+
+    def test_forward(self):
+        fd = FiniteDifference(1e-7)
+        points = fd.stencil(self.x)
+        self.assertEqual(points.shape, (2, 2))
+        grad = fd.gradient(self.x, _functions(self.x)[0], _functions(points))
+        np.testing.assert_allclose(grad, self.exact, rtol=1e-5)
+
+    def test_central(self):
+        fd = FiniteDifference(1e-4, 'central')
+        self.assertFalse(fd.needs_base)
+        points = fd.stencil(self.x)
+        self.assertEqual(points.shape, (4, 2))
+        grad = fd.gradient(self.x, None, _functions(points))
+        np.testing.assert_allclose(grad, self.exact, rtol=1e-7)
+
+    def test_hessian(self):
+        fd = FiniteDifference(1e-4, 'central')
+        points = fd.hessian_stencil(self.x)
+        self.assertEqual(points.shape, (8, 2))
+        values = _functions(points)
+        hess = fd.hessian(self.x, _functions(self.x)[0], values)
+        exact = np.array([[[2., 0.], [0., 0.]], [[0., 1.], [1., 0.]]])
+        np.testing.assert_allclose(hess, exact, atol=1e-4)
+        # the leading points are the gradient stencil
+        grad = fd.gradient(self.x, None, values)
+        np.testing.assert_allclose(grad, self.exact, rtol=1e-7)
+
+    def test_hessian_cross_terms(self):
+        # x0**2 * x1**2 has cross term 4*x0*x1, the error is O(h**2)
+        def function(points):
+            points = np.atleast_2d(points)
+            return (points[:, 0] ** 2 * points[:, 1] ** 2)[:, np.newaxis]
+        x = np.array([1., 2., 3.])
+        fd = FiniteDifference(1e-3, 'central')
+        points = fd.hessian_stencil(x)
+        self.assertEqual(points.shape, (3 + 3 + 4 * 3, 3))
+        hess = fd.hessian(x, function(x)[0], function(points))
+        exact = np.array([[8., 8., 0.], [8., 2., 0.], [0., 0., 0.]])
+        np.testing.assert_allclose(hess[0], exact, atol=1e-5)
+
+    def test_bad_interval(self):
+        self.assertRaises(ValueError, FiniteDifference, 1e-6, 'backward')
+
+
+if __name__ == '__main__':
+    unittest.main()
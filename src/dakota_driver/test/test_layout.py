@@ -0,0 +1,52 @@
+""" Test the continuous variables layout. """
+
+import unittest
+
+import numpy as np
+
+from dakota_driver.layout import VariableLayout, element_names, split_element
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`VariableLayout`. """
+
+    def test_names(self):
+        self.assertEqual(element_names('x', 1), ['x'])
+        self.assertEqual(element_names('comp.x', 2), ['comp.x[0]', 'comp.x[1]'])
+        self.assertEqual(split_element('comp.x[12]'), ('comp.x', 12))
+        self.assertEqual(split_element('x'), ('x', None))
+
+    def test_layout(self):
+        sizes = dict(a=1, b=3, u=2)
+        # uncertain u[1] then u[0], then the state variables a, b
+        elements = [('u', 1), ('u', 0), ('a', None),
+                    ('b', 0), ('b', 1), ('b', 2)]
+        layout = VariableLayout(elements, sizes)
+        self.assertEqual(len(layout), 6)
+        self.assertEqual(layout.owners(), ['u', 'u', 'a', 'b', 'b', 'b'])
+        self.assertEqual(layout.descriptors(),
+                         ['u[1]', 'u[0]', 'a', 'b[0]', 'b[1]', 'b[2]'])
+        self.assertEqual(layout.keys['a'], (2, None))
+        self.assertEqual(layout.keys['b'], (slice(3, 6), None))
+        key, indices = layout.keys['u']
+        self.assertEqual(list(key), [0, 1])
+        self.assertEqual(list(indices), [1, 0])
+
+        cv = np.arange(6.)
+        self.assertTrue(np.may_share_memory(cv[layout.keys['b'][0]], cv))
+        order = layout.permutation(['a', 'b', 'u'], sizes)
+        self.assertEqual(list(order), [5, 4, 0, 1, 2, 3])
+        self.assertEqual(layout.permutation(['u', 'a', 'b'], sizes).tolist(),
+                         [1, 0, 2, 3, 4, 5])
+
+    def test_identity(self):
+        sizes = dict(a=1, b=2)
+        layout = VariableLayout([('a', None), ('b', 0), ('b', 1)], sizes)
+        self.assertTrue(layout.permutation(['a', 'b'], sizes) is None)
+        # a design block without the uncertain b
+        layout = VariableLayout([('a', None)], sizes)
+        self.assertEqual(list(layout.permutation(['b', 'a'], sizes)), [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+""" Test partial re-execution of workflows. """
+
+import unittest
+
+import numpy as np
+
+from dakota_driver.partial import PartialExecution
+
+
+class Component(object):
+    """ Stands in for a workflow component, logging its runs. """
+
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def run(self):
+        self.log.append(self.name)
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`PartialExecution`. """
+
+    def setUp(self):
+        self.log = []
+        self.comps = [Component(name, self.log)
+                      for name in ('geometry', 'load', 'cost')]
+        connections = [('chord', 'geometry.chord'),
+                       ('geometry.area', 'cost.area'),
+                       ('load.force', 'cost.force')]
+        self.partial = PartialExecution(self.comps, connections)
+        self.partial.set_targets([['chord'], ['load.wind[0]'],
+                                  ['load.wind[1]']])
+
+    def evaluate(self, cv, asv=None):
+        del self.log[:]
+        self.partial.update(cv, asv)
+        for comp in self.comps:
+            comp.run()
+        return list(self.log)
+
+    def test_downstream(self):
+        self.assertEqual(list(self.partial.downstream(['chord'])),
+                         [True, False, True])
+        self.assertEqual(list(self.partial.downstream(['load.wind'])),
+                         [False, True, True])
+
+    def test_skip(self):
+        self.partial.instrument()
+        self.assertEqual(self.evaluate([1., 2., 3.]), ['geometry', 'load', 'cost'])
+        self.assertEqual(self.evaluate([1., 2., 4.]), ['load', 'cost'])
+        self.assertEqual(self.evaluate([1., 2., 4.]), [])
+        self.assertEqual(self.evaluate([2., 2., 4.]), ['geometry', 'cost'])
+        self.assertEqual(self.partial.executed, 7)
+        self.assertEqual(self.partial.skipped, 5)
+        self.partial.reset()
+        self.assertEqual(self.evaluate([2., 2., 4.]), ['geometry', 'load', 'cost'])
+        self.partial.restore()
+        self.assertFalse('run' in self.comps[0].__dict__)
+
+    def test_asv(self):
+        # responses: geometry area, total cost and one of unknown inputs
+        self.partial.set_responses([['geometry.area'], ['cost.total'], None])
+        self.assertEqual(list(self.partial.upstream(['cost.total'])),
+                         [True, True, True])
+        self.partial.instrument()
+        self.assertEqual(self.evaluate([1., 2., 3.], [1, 0, 0]),
+                         ['geometry'])
+        self.assertEqual(self.evaluate([1., 2., 3.], [0, 2, 0]),
+                         ['load', 'cost'])
+        self.assertEqual(self.evaluate([1., 5., 3.], [1, 0, 0]), [])
+        self.assertEqual(self.evaluate([1., 5., 3.], [0, 0, 1]),
+                         ['load', 'cost'])
+        self.assertEqual(len(self.partial._needed), 3)
+
+        self.partial.track_changes = False
+        self.assertEqual(self.evaluate([1., 5., 3.], [1, 0, 0]),
+                         ['geometry'])
+
+    def test_unknown_connections(self):
+        self.partial = PartialExecution(self.comps, None)
+        self.partial.set_targets([['chord'], ['load.wind']])
+        self.partial.instrument()
+        self.evaluate(np.array([1., 2.]))
+        self.assertEqual(len(self.evaluate(np.array([1., 3.]))), 3)
+        self.assertEqual(self.evaluate(np.array([1., 3.])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+""" Test the concurrent evaluation of populations. """
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from dakota_driver.failures import OK, TIMED_OUT
+from dakota_driver.population import PopulationPool, PopulationScheduler
+
+
+class Assembly(object):
+    """ Stands in for an assembly writing a scratch file. """
+
+    def __init__(self):
+        self.values = dict(x=0., y=0.)
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def get(self, name):
+        return self.values[name]
+
+    def run(self):
+        if self.values['x'] < 0:
+            raise ValueError('negative x')
+        with open('scratch.txt', 'w') as out:
+            out.write('%s\n' % os.getpid())
+        self.values['y'] = self.values['x'] ** 2
+        self.values['pid'] = os.getpid()
+
+
+def _sleep(point):
+    """ Sleep `point[0]` seconds, returning when it started and ended. """
+    start = time.time()
+    time.sleep(point[0])
+    return start, time.time()
+
+
+class Driver(object):
+    """ Stands in for a driver evaluating in pool workers. """
+
+    workdir_root = ''
+    workdir_template = ''
+    workdir_link = False
+    workdir_cleanup = 'always'
+    workdir_keep = 10
+
+    timeout = 0.
+
+    def _pool_task(self, cv, asv):
+        if cv[0] > 2:
+            time.sleep(self.timeout)
+        return [sum(cv)], [], OK
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`PopulationScheduler`. """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_evaluate(self):
+        assembly = Assembly()
+        scheduler = PopulationScheduler(assembly, ['x'], ['y', 'pid'], 2,
+                                        root=self.tempdir)
+        results = scheduler.evaluate([[1.], [2.], [3.]])
+        self.assertEqual(results[:, 0].tolist(), [1., 4., 9.])
+        self.assertFalse(os.getpid() in results[:, 1])
+        # the parent's copy is untouched, nothing is left behind
+        self.assertEqual(assembly.values['y'], 0.)
+        self.assertEqual(os.listdir(self.tempdir), [])
+        self.assertEqual(scheduler.evaluate(np.empty((0, 1))).shape, (0, 2))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_failure(self):
+        scheduler = PopulationScheduler(Assembly(), ['x'], ['y'], 2,
+                                        root=self.tempdir, cleanup='success')
+        try:
+            scheduler.evaluate([[1.], [-1.]])
+        except RuntimeError as exc:
+            self.assertTrue('point 1 failed' in str(exc))
+            self.assertTrue('negative x' in str(exc))
+        else:
+            self.fail('Expected RuntimeError')
+        run_dir, = os.listdir(self.tempdir)
+        self.assertEqual(len(os.listdir(os.path.join(self.tempdir, run_dir))),
+                         1)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_first_finished(self):
+        # A slow point doesn't hold up the points after it.
+        scheduler = PopulationScheduler(None, (), (), 2, root=self.tempdir)
+        slow, fast, last = scheduler.map(_sleep, [[1.], [0.], [0.]])
+        self.assertTrue(last[0] < slow[1])
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_timeout(self):
+        # Hung points are killed at the deadline.
+        scheduler = PopulationScheduler(None, (), (), 2, root=self.tempdir,
+                                        timeout=0.5)
+        start = time.time()
+        results = scheduler.map(_sleep, [[60.], [0.]], 'timed out')
+        self.assertTrue(time.time() - start < 30.)
+        self.assertEqual(results[0], 'timed out')
+        self.assertEqual(len(results[1]), 2)
+        self.assertRaises(RuntimeError, scheduler.map, _sleep, [[60.]])
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_pool(self):
+        driver = Driver()
+        driver.workdir_root = self.tempdir
+        pool = PopulationPool(driver, 2)
+        results = pool.map(np.array([[1., 2.], [3., 4.]]), np.ones((2, 1)))
+        pool.close()
+        self.assertEqual(results, [([3.], [], OK), ([7.], [], OK)])
+
+        driver.timeout = 60.
+        pool = PopulationPool(driver, 2, 0.5, grace=0.)
+        results = pool.map(np.array([[1., 2.], [3., 4.]]), np.ones((2, 1)))
+        self.assertEqual(results[1], (None, None, TIMED_OUT))
+
+
+if __name__ == '__main__':
+    unittest.main()
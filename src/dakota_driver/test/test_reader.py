@@ -0,0 +1,54 @@
+""" Test reading evaluation logs. """
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from dakota_driver.reader import EvaluationHistory
+from dakota_driver.recorder import EvaluationRecorder
+from dakota_driver.stats import RunningStats
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`EvaluationHistory`. """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        recorder = EvaluationRecorder(self.tempdir, 2, 2, chunk_size=10,
+                                      descriptors=['x1', 'x2'],
+                                      responses=['f', 'g'])
+        for i in range(25):
+            recorder.record(i + 1, [i, 2. * i], [i + 0.5, np.nan])
+        recorder.close()
+        self.history = EvaluationHistory(self.tempdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_columns(self):
+        history = self.history
+        self.assertEqual(len(history), 25)
+        self.assertEqual(history.chunk_sizes, [10, 10, 5])
+        np.testing.assert_array_equal(history.variable('x2'),
+                                      2. * np.arange(25))
+        np.testing.assert_array_equal(history.column('eval_id'),
+                                      np.arange(1, 26))
+
+    def test_id_range(self):
+        f = self.history.response('f', start_id=8, stop_id=13)
+        np.testing.assert_array_equal(f, np.arange(7, 12) + 0.5)
+        chunks = list(self.history.iter_chunks('cv', start_id=21))
+        self.assertEqual(len(chunks), 1)
+
+    def test_reduce(self):
+        stats = self.history.reduce('fns', RunningStats, index=0)
+        self.assertEqual(stats.count, 25)
+        self.assertAlmostEqual(stats.mean, 12.5)
+        stats = self.history.reduce('fns', RunningStats(), index=1)
+        self.assertEqual(stats.count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
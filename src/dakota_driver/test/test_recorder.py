@@ -0,0 +1,63 @@
+""" Test the columnar evaluation log. """
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from dakota_driver.recorder import EvaluationRecorder, load_evaluations
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`EvaluationRecorder`. """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_roundtrip(self):
+        recorder = EvaluationRecorder(self.tempdir, 2, 1, chunk_size=4,
+                                      gradients=True)
+        for i in range(10):
+            recorder.record(i + 1, [i, -i], [i * 2.], [[1., 2.]])
+        self.assertEqual(recorder.chunks, [4, 4])
+        recorder.close()
+        self.assertEqual(len(recorder), 10)
+
+        data = load_evaluations(self.tempdir)
+        np.testing.assert_array_equal(data['eval_id'], np.arange(1, 11))
+        self.assertEqual(data['cv'].shape, (10, 2))
+        np.testing.assert_array_equal(data['fns'][:, 0], np.arange(10) * 2.)
+        self.assertEqual(data['fnGrads'].shape, (10, 1, 2))
+        self.assertFalse(data['status'].any())
+
+    def test_status(self):
+        recorder = EvaluationRecorder(self.tempdir, 1, 1)
+        recorder.record(1, [0.], [1.])
+        recorder.record(2, [1.], [np.nan], status=2)
+        recorder.close()
+        data = load_evaluations(self.tempdir)
+        self.assertEqual(data['status'].tolist(), [0, 2])
+        self.assertEqual(data['cv'][data['status'] != 0].tolist(), [[1.]])
+
+    def test_flush_interval(self):
+        # Rows are saved before their chunk is full.
+        recorder = EvaluationRecorder(self.tempdir, 1, 1, flush_interval=1e-9)
+        recorder.record(1, [0.], [1.])
+        recorder.record(2, [1.], [np.nan], status=2)
+        self.assertEqual(recorder.chunks, [1, 1])
+        data = load_evaluations(self.tempdir)
+        self.assertEqual(data['status'].tolist(), [0, 2])
+
+    def test_empty(self):
+        EvaluationRecorder(self.tempdir, 3, 2)
+        data = load_evaluations(self.tempdir)
+        self.assertEqual(data['cv'].shape, (0, 3))
+        self.assertFalse('fnGrads' in data)
+
+
+if __name__ == '__main__':
+    unittest.main()
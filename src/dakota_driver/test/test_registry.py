@@ -0,0 +1,60 @@
+""" Test the special distribution variable registry. """
+
+import unittest
+
+from dakota_driver.registry import VariableRegistry
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`VariableRegistry`. """
+
+    def test_add(self):
+        registry = VariableRegistry()
+        registry.add('x', 'normal', mean=1., std_dev=.5)
+        registry.add_many(['y[0]', 'y[1]'], 'weibull', alpha=[1., 2.],
+                          beta=3.)
+        self.assertEqual(len(registry), 3)
+        self.assertTrue('y[1]' in registry)
+        self.assertEqual(registry.distribution('y[1]'), 'weibull')
+        self.assertEqual(registry.parameters('y[1]'),
+                         dict(alpha=2., beta=3.))
+        self.assertEqual(registry.variables_block(), [
+            'normal_uncertain = 1',
+            '  means = 1.0',
+            '  std_deviations = 0.5',
+            "  descriptors = 'x'",
+            'weibull_uncertain = 2',
+            '  alphas = 1.0 2.0',
+            '  betas = 3.0 3.0',
+            "  descriptors = 'y[0]' 'y[1]'"])
+        registry.add('z', 'normal', mean=0., std_dev=1.)
+        self.assertEqual(registry.block_names(), ['x', 'z', 'y[0]', 'y[1]'])
+
+    def test_gamma(self):
+        registry = VariableRegistry()
+        registry.add('g', 'gamma', alpha=2., beta=.5)
+        self.assertEqual(registry.variables_block()[0], 'gamma_uncertain = 1')
+
+    def test_errors(self):
+        registry = VariableRegistry()
+        self.assertRaises(ValueError, registry.add, 'x', 'cauchy')
+        self.assertRaises(ValueError, registry.add, 'x', 'beta', alpha=1.)
+        registry.add('x', 'exponential', beta=1.)
+        self.assertRaises(ValueError, registry.add, 'x', 'exponential',
+                          beta=1.)
+
+    def test_bulk(self):
+        registry = VariableRegistry()
+        names = ['u%d' % i for i in range(1000)]
+        for name in names[:500]:
+            registry.add(name, 'normal', mean=0., std_dev=1.)
+        registry.add_many(names[500:], 'normal', mean=0., std_dev=1.)
+        self.assertEqual(list(registry), names)
+        signature = registry.signature()
+        registry.clear()
+        self.assertEqual(len(registry), 0)
+        self.assertNotEqual(registry.signature(), signature)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+""" Test streaming response statistics. """
+
+import unittest
+
+import numpy as np
+
+from dakota_driver.stats import RunningStats
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`RunningStats`. """
+
+    def test_moments(self):
+        values = np.random.RandomState(4).normal(0.1, 0.5, 5000)
+        stats = RunningStats()
+        stats.extend(values)
+        self.assertEqual(stats.count, 5000)
+        self.assertAlmostEqual(stats.mean, values.mean(), places=10)
+        self.assertAlmostEqual(stats.variance, values.var(ddof=1), places=10)
+        self.assertEqual(stats.min, values.min())
+        self.assertEqual(stats.max, values.max())
+
+    def test_percentiles(self):
+        values = np.random.RandomState(4).uniform(0., 1., 5000)
+        stats = RunningStats(percentiles=(5., 50., 95.))
+        stats.extend(values)
+        for p, estimate in stats.percentiles.items():
+            self.assertAlmostEqual(estimate, np.percentile(values, p),
+                                   delta=0.01)
+        self.assertRaises(KeyError, stats.percentile, 25.)
+
+    def test_few_values(self):
+        stats = RunningStats(percentiles=(50.,))
+        stats.extend([3., 1., 2.])
+        self.assertEqual(stats.percentile(50.), 2.)
+        self.assertEqual(stats.std_dev, 1.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+""" Test the evaluation timer. """
+
+import unittest
+
+from dakota_driver.timing import EvaluationTimer, PHASES, STENCIL_PHASES
+
+
+class Clock(object):
+    """ Clock advancing one second per reading. """
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        self.now += 1.
+        return self.now
+
+
+class Component(object):
+    """ Stands in for a workflow component. """
+
+    name = 'comp'
+
+    def run(self, *args, **kwargs):
+        return args, kwargs
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`EvaluationTimer`. """
+
+    def test_callbacks(self):
+        timer = EvaluationTimer(Clock())
+        timer.start()
+        for _ in range(3):
+            timer.enter_callback()
+            timer.add_evaluation(*range(len(PHASES)))
+            timer.leave_callback()
+        self.assertEqual(list(timer.callbacks['dakota']), [1., 1., 1.])
+        self.assertEqual(list(timer.callbacks['callback']), [1., 1., 1.])
+        self.assertEqual(list(timer.evaluations), list(PHASES))
+        self.assertEqual(list(timer.evaluations['total']), [4, 4, 4])
+        self.assertTrue('run_iteration' in timer.summary())
+
+    def test_blocks(self):
+        timer = EvaluationTimer(Clock())
+        timer.add_block(4, *[4.] * len(PHASES))
+        self.assertEqual(list(timer.evaluations['total']), [1.] * 4)
+        timer.add_stencil(2., 1.)
+        self.assertEqual(list(timer.stencils), list(STENCIL_PHASES))
+        self.assertEqual(list(timer.stencils['difference']), [1.])
+        self.assertTrue('evaluate_stencil' in timer.summary())
+
+    def test_components(self):
+        timer = EvaluationTimer(Clock())
+        comp = Component()
+        timer.instrument([comp])
+        self.assertEqual(comp.run(1, a=2), ((1,), {'a': 2}))
+        self.assertEqual(list(timer.components['comp']), [1.])
+        timer.restore()
+        self.assertFalse('run' in comp.__dict__)
+        comp.run()
+        self.assertEqual(len(timer.components['comp']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
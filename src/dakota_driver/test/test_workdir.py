@@ -0,0 +1,85 @@
+""" Test the per-evaluation working directories. """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import six
+
+from dakota_driver.workdir import WorkDirectories
+
+
+class TestCase(unittest.TestCase):
+    """ Test :class:`WorkDirectories`. """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.template = os.path.join(self.tempdir, 'template')
+        os.makedirs(os.path.join(self.template, 'data'))
+        with open(os.path.join(self.template, 'input.txt'), 'w') as out:
+            out.write('x = 1\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def evaluate(self, workdirs, fail=False):
+        """ Write a scratch file in an evaluation directory. """
+        with workdirs.evaluation() as path:
+            self.assertEqual(os.path.realpath(os.getcwd()),
+                             os.path.realpath(path))
+            with open('scratch.txt', 'w') as out:
+                out.write('scratch\n')
+            if fail:
+                raise RuntimeError('failed')
+        return path
+
+    def test_copy(self):
+        cwd = os.getcwd()
+        workdirs = WorkDirectories(self.tempdir, 'test', self.template)
+        path = workdirs.create()
+        self.assertTrue(os.path.isfile(os.path.join(path, 'input.txt')))
+        self.assertTrue(os.path.isdir(os.path.join(path, 'data')))
+        self.assertFalse(os.path.islink(os.path.join(path, 'input.txt')))
+
+        path = self.evaluate(workdirs)
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertFalse(os.path.exists(path))
+        workdirs.close()
+        self.assertFalse(os.path.exists(workdirs.path))
+
+        # A unicode path is a directory too.
+        workdirs = WorkDirectories(self.tempdir, 'test',
+                                   six.text_type(self.template))
+        self.assertEqual(len(workdirs.sources), 2)
+        workdirs.close()
+
+    def test_link(self):
+        template = [os.path.join(self.template, 'input.txt')]
+        workdirs = WorkDirectories(self.tempdir, 'test', template, link=True,
+                                   cleanup='keep', keep=1)
+        path = self.evaluate(workdirs)
+        self.assertTrue(os.path.islink(os.path.join(path, 'input.txt')))
+        self.assertFalse(os.path.exists(os.path.join(path, 'data')))
+
+    def test_cleanup(self):
+        workdirs = WorkDirectories(self.tempdir, 'test', cleanup='success')
+        ok = self.evaluate(workdirs)
+        self.assertRaises(RuntimeError, self.evaluate, workdirs, True)
+        self.assertFalse(os.path.exists(ok))
+        self.assertEqual(len(os.listdir(workdirs.path)), 1)
+        workdirs.close()
+        self.assertTrue(os.path.exists(workdirs.path))
+
+        workdirs = WorkDirectories(self.tempdir, 'test', cleanup='keep',
+                                   keep=2)
+        paths = [self.evaluate(workdirs) for _ in range(3)]
+        self.assertEqual([os.path.exists(path) for path in paths],
+                         [False, True, True])
+
+        self.assertRaises(ValueError, WorkDirectories, self.tempdir,
+                          cleanup='never')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Opt-in timing of the driver's hot path.
+
+When `timing` is set on a driver, each evaluation is split into the time
+spent setting parameters, running the workflow, evaluating responses and
+evaluating gradients.  A block run by a vectorized workflow charges each of
+its evaluations an equal share.  Finite difference stencils evaluated by
+the driver are timed as a whole, split into evaluating the stencil and
+differencing.  The time each workflow component spends running, the time
+spent in each callback and the time DAKOTA spends between callbacks are
+recorded too.  After the run::
+
+    print(driver.timer.summary())
+    driver.timer.evaluations['run_iteration']   # one entry per evaluation
+"""
+import collections
+import time
+
+import numpy as np
+
+__all__ = ['EvaluationTimer']
+
+# timed phases of each evaluation, in order
+PHASES = ('set_parameters', 'run_iteration', 'evaluate', 'gradients', 'total')
+
+# timed phases of each finite difference stencil
+STENCIL_PHASES = ('evaluate_stencil', 'difference')
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class EvaluationTimer(object):
+    """ Collects wall clock times, in seconds, of evaluations and callbacks. """
+
+    def __init__(self, clock=_clock):
+        self.clock = clock
+        self._evaluations = [[] for _ in PHASES]
+        self._stencils = [[] for _ in STENCIL_PHASES]
+        self._dakota = []
+        self._callbacks = []
+        self._components = collections.OrderedDict()
+        self._instrumented = []
+        self._entered = None
+        self._left = None
+
+    def start(self):
+        """ Mark the start of a run, DAKOTA runs until the first callback. """
+        self._left = self.clock()
+
+    def add_evaluation(self, *times):
+        """ Record the times of one evaluation, one for each of `PHASES`. """
+        for column, value in zip(self._evaluations, times):
+            column.append(value)
+
+    def add_block(self, n_evals, *times):
+        """
+        Record the times of a block of `n_evals` evaluations run together,
+        each getting an equal share of each of `times`.
+        """
+        for column, value in zip(self._evaluations, times):
+            column.extend([value / n_evals] * n_evals)
+
+    def add_stencil(self, *times):
+        """ Record the times of a stencil, one for each of `STENCIL_PHASES`. """
+        for column, value in zip(self._stencils, times):
+            column.append(value)
+
+    def enter_callback(self):
+        """ Mark entry into a callback from DAKOTA. """
+        now = self._entered = self.clock()
+        if self._left is not None:
+            self._dakota.append(now - self._left)
+
+    def leave_callback(self):
+        """ Mark return from a callback to DAKOTA. """
+        now = self._left = self.clock()
+        self._callbacks.append(now - self._entered)
+
+    def instrument(self, components):
+        """ Time each run of `components`, until :meth:`restore`. """
+        for comp in components:
+            times = self._components.setdefault(comp.name, [])
+            self._instrumented.append((comp, comp.__dict__.get('run')))
+            comp.run = self._timed(comp.run, times)
+
+    def restore(self):
+        """ Remove the timing added by :meth:`instrument`. """
+        for comp, run in reversed(self._instrumented):
+            if run is None:
+                del comp.run
+            else:
+                comp.run = run
+        self._instrumented = []
+
+    def _timed(self, run, times):
+        clock = self.clock
+
+        def timed_run(*args, **kwargs):
+            start = clock()
+            try:
+                return run(*args, **kwargs)
+            finally:
+                times.append(clock() - start)
+        return timed_run
+
+    @property
+    def evaluations(self):
+        """ Dictionary of arrays of times of each phase of the evaluations. """
+        return collections.OrderedDict(
+            (phase, np.array(column))
+            for phase, column in zip(PHASES, self._evaluations))
+
+    @property
+    def stencils(self):
+        """ Dictionary of arrays of times of each phase of the stencils. """
+        return collections.OrderedDict(
+            (phase, np.array(column))
+            for phase, column in zip(STENCIL_PHASES, self._stencils))
+
+    @property
+    def callbacks(self):
+        """
+        Arrays of the time spent in each callback (``'callback'``) and the
+        time DAKOTA spent before each (``'dakota'``).
+        """
+        return collections.OrderedDict([('dakota', np.array(self._dakota)),
+                                        ('callback',
+                                         np.array(self._callbacks))])
+
+    @property
+    def components(self):
+        """ Dictionary of arrays of the times of each component run. """
+        return collections.OrderedDict((name, np.array(times))
+                                       for name, times in
+                                       self._components.items())
+
+    def summary(self):
+        """ Return a table of count, total, mean, min and max times. """
+        rows = [('%s' % name, times) for name, times in
+                list(self.callbacks.items()) +
+                list(self.evaluations.items()) +
+                list(self.stencils.items())]
+        rows.extend(('  %s' % name, times)
+                    for name, times in self.components.items())
+        lines = ['%-24s %8s %12s %12s %12s %12s'
+                 % ('', 'count', 'total (s)', 'mean (us)', 'min (us)',
+                    'max (us)')]
+        for name, times in rows:
+            if len(times):
+                lines.append('%-24s %8d %12.6f %12.1f %12.1f %12.1f'
+                             % (name, len(times), times.sum(),
+                                times.mean() * 1e6, times.min() * 1e6,
+                                times.max() * 1e6))
+            else:
+                lines.append('%-24s %8d' % (name, 0))
+        return '\n'.join(lines)
@@ -0,0 +1,102 @@
+"""
+Working directories of their own for evaluations.
+
+Components writing scratch files to the current directory can't run
+concurrently, or even leave a clean directory behind.  A
+:class:`WorkDirectories` creates a run directory under `root` (a tmpfs such
+as ``/dev/shm`` keeps the scratch files in memory) and, for each
+evaluation, a directory in it populated from a template and made current
+while the workflow runs.  Each pool worker process evaluates in directories
+of its own.
+"""
+import collections
+import contextlib
+import os
+import shutil
+import tempfile
+
+import six
+
+__all__ = ['WorkDirectories']
+
+_CLEANUP = ('always', 'success', 'keep')
+
+
+class WorkDirectories(object):
+    """
+    Evaluation directories under a new directory in `root` (default the
+    system's temporary directory) named after `prefix`.  Each is populated
+    from `template`, a directory whose entries are copied or a list of
+    files, symlinked instead if `link`.  `cleanup` is ``'always'`` to remove
+    each directory after its evaluation, ``'success'`` to keep those of
+    failed evaluations or ``'keep'`` to keep the `keep` most recent.
+    """
+
+    def __init__(self, root='', prefix='dakota', template=None, link=False,
+                 cleanup='always', keep=10):
+        if cleanup not in _CLEANUP:
+            raise ValueError('cleanup must be one of %s' % ', '.join(_CLEANUP))
+        if root and not os.path.isdir(root):
+            os.makedirs(root)
+        self.path = tempfile.mkdtemp(prefix=prefix + '.', dir=root or None)
+        self.link = link
+        self.cleanup = cleanup
+        self.keep = keep
+        self.kept = collections.deque()
+        self.count = 0
+
+        if not template:
+            self.sources = []
+        elif isinstance(template, six.string_types):
+            self.sources = [os.path.join(template, name)
+                            for name in sorted(os.listdir(template))]
+        else:
+            self.sources = list(template)
+        self.sources = [os.path.abspath(src) for src in self.sources]
+
+    def create(self):
+        """ Return the path of a new directory populated from the template. """
+        self.count += 1
+        path = tempfile.mkdtemp(prefix='%d.%d.' % (os.getpid(), self.count),
+                                dir=self.path)
+        for src in self.sources:
+            dst = os.path.join(path, os.path.basename(src))
+            if self.link:
+                os.symlink(src, dst)
+            elif os.path.isdir(src):
+                shutil.copytree(src, dst, symlinks=True)
+            else:
+                shutil.copy2(src, dst)
+        return path
+
+    def release(self, path, success):
+        """ Apply the cleanup policy to `path`, once its evaluation is done. """
+        if self.cleanup == 'always' or \
+           (self.cleanup == 'success' and success):
+            shutil.rmtree(path, ignore_errors=True)
+        elif self.cleanup == 'keep':
+            self.kept.append(path)
+            while len(self.kept) > self.keep:
+                shutil.rmtree(self.kept.popleft(), ignore_errors=True)
+
+    @contextlib.contextmanager
+    def evaluation(self):
+        """ Run the block in a new directory, released afterwards. """
+        path = self.create()
+        cwd = os.getcwd()
+        os.chdir(path)
+        success = False
+        try:
+            yield path
+            success = True
+        finally:
+            os.chdir(cwd)
+            self.release(path, success)
+
+    def close(self):
+        """ Remove the run directory, unless it holds kept directories. """
+        try:
+            if self.cleanup == 'always' or not os.listdir(self.path):
+                shutil.rmtree(self.path, ignore_errors=True)
+        except OSError:
+            pass
@@ -18,21 +18,8 @@ class get_dak_output(Component):
     def execute(self):
        nam ='rose.f'
 
-       # read data
-       with open(dacout) as dak:
-         daklines = dak.readlines()
-       vals = {}
-       for n, line in enumerate(daklines):
-         if n<49 or n > len(daklines)-45: pass
-         else:
-           split_line = line.split()
-           if len(split_line)==2:
-               if split_line[1] not in vals: vals[split_line[1]] = [float(split_line[0])]
-               else:vals[split_line[1]].append(float(split_line[0]))
-
-       # Get mean value
-       self.objective_vals = vals[nam]
-       self.mean_f = sum(self.objective_vals)/len(self.objective_vals)
+       # Get mean value, collected by the inner driver during its run
+       self.mean_f = self.parent.roseSA.driver.results[nam].mean
 
        rank = comm.Get_rank()
        if rank == 0: print self.x1